@@ -0,0 +1,124 @@
+"""Hierarchical compaction of AgentMemorySummary rows.
+
+main_agent adds a level 0 summary every 10 messages. Past the newest MEMORY_COMPACT_KEEP,
+the oldest MEMORY_COMPACT_FANIN level 0 summaries are merged into one level 1 rollup,
+FANIN level 1 rollups into a level 2 one, and so on up to MEMORY_COMPACT_DEPTH, where
+rollups are merged into themselves. No level keeps FANIN rows or more, so a conversation
+never holds more than KEEP + FANIN - 1 + DEPTH * (FANIN - 1) summaries however long it runs.
+
+A rollup takes the created_at of the newest summary it replaces, which keeps the
+TranscriptService.rehydrate watermark and the chronological order of the levels intact.
+"""
+import os
+from sqlalchemy import delete, func
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from app.agents.memory import MemoryService
+from app.core.metrics import MEMORY_SUMMARIES_MERGED
+from app.core.tracing import span
+from app.models.conversations import AgentMemorySummary, Conversation
+
+load_dotenv()
+
+MEMORY_COMPACT_KEEP = int(os.getenv("MEMORY_COMPACT_KEEP", 8))  # newest window summaries left untouched
+MEMORY_COMPACT_FANIN = max(2, int(os.getenv("MEMORY_COMPACT_FANIN", 4)))
+MEMORY_COMPACT_DEPTH = max(1, int(os.getenv("MEMORY_COMPACT_DEPTH", 3)))
+# LLM calls per conversation and run; a long backlog is finished by the next sweeps
+MEMORY_COMPACT_MAX_MERGES = int(os.getenv("MEMORY_COMPACT_MAX_MERGES", 64))
+
+
+def _default_merge(summaries: list[str]) -> str:
+    from app.agents.main_agent import get_llm, merge_summaries
+    from app.prompts.profiles import PROFILES
+
+    profile = PROFILES["default"]
+    return merge_summaries(summaries, get_llm(profile["model"], profile["temperature"]))
+
+
+class MemoryCompaction:
+    @staticmethod
+    def max_summaries() -> int:
+        return MEMORY_COMPACT_KEEP + MEMORY_COMPACT_FANIN - 1 + MEMORY_COMPACT_DEPTH * (MEMORY_COMPACT_FANIN - 1)
+
+    @staticmethod
+    def next_merge(rows: list) -> tuple[int, list] | None:
+        """(level of the rollup, rows it replaces) for the lowest level over its budget, oldest rows first.
+        rows: (id, level, created_at) of one conversation, ordered by created_at."""
+        levels: dict[int, list] = {}
+        for row in rows:
+            levels.setdefault(min(row.level, MEMORY_COMPACT_DEPTH), []).append(row)
+
+        window = levels.get(0, [])
+        if len(window) - MEMORY_COMPACT_KEEP >= MEMORY_COMPACT_FANIN:
+            return 1, window[:MEMORY_COMPACT_FANIN]
+        for level in range(1, MEMORY_COMPACT_DEPTH + 1):
+            group = levels.get(level, [])
+            if len(group) >= MEMORY_COMPACT_FANIN:
+                return min(level + 1, MEMORY_COMPACT_DEPTH), group[:MEMORY_COMPACT_FANIN]
+        return None
+
+    @staticmethod
+    def pending(db: Session, limit: int = 500) -> list:
+        """Conversations whose window summaries went past KEEP + FANIN - 1 (the only way a level fills up)."""
+        return [
+            row.conversation_id for row in
+            db.query(AgentMemorySummary.conversation_id)
+            .filter(AgentMemorySummary.level == 0)
+            .group_by(AgentMemorySummary.conversation_id)
+            .having(func.count(AgentMemorySummary.id) >= MEMORY_COMPACT_KEEP + MEMORY_COMPACT_FANIN)
+            .limit(limit)
+            .all()
+        ]
+
+    @staticmethod
+    def compact(db: Session, conversation_id, merge=_default_merge) -> int:
+        """Merge until every level is within budget; returns how many rollups were written.
+        merge(list of summary texts) -> text is the LLM call; no transaction is held while it runs."""
+        merges = 0
+        for _ in range(MEMORY_COMPACT_MAX_MERGES):
+            rows = (
+                db.query(AgentMemorySummary.id, AgentMemorySummary.level, AgentMemorySummary.created_at)
+                .filter(AgentMemorySummary.conversation_id == conversation_id)
+                .order_by(AgentMemorySummary.created_at, AgentMemorySummary.id)
+                .all()
+            )
+            plan = MemoryCompaction.next_merge(rows)
+            if plan is None:
+                break
+            level, group = plan
+            ids = [row.id for row in group]
+            texts = dict(
+                db.query(AgentMemorySummary.id, AgentMemorySummary.summary)
+                .filter(AgentMemorySummary.id.in_(ids))
+                .all()
+            )
+            db.rollback()
+
+            with span("llm", "merge_summaries"):
+                summary = merge([texts[summary_id] for summary_id in ids])
+
+            # Serializes compactions of one conversation (no-op on SQLite, where writers are serialized anyway)
+            db.query(Conversation.id).filter(Conversation.id == conversation_id).with_for_update().first()
+            deleted = db.execute(
+                delete(AgentMemorySummary)
+                .where(AgentMemorySummary.id.in_(ids))
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if deleted != len(ids):
+                # Another compactor got there first; plan again from what is left
+                db.rollback()
+                continue
+            db.add(AgentMemorySummary(
+                conversation_id=conversation_id,
+                summary=summary,
+                level=level,
+                created_at=max(row.created_at for row in group),
+            ))
+            db.commit()
+            MEMORY_SUMMARIES_MERGED.inc(len(ids), level=str(group[0].level))
+            merges += 1
+
+        if merges:
+            # Recall indexes of the merged rows are stale; other processes notice through the row count
+            MemoryService.invalidate(conversation_id)
+        return merges
@@ -0,0 +1,115 @@
+import asyncio
+import os
+import socket
+import threading
+import time
+import uuid
+from dotenv import load_dotenv
+from app.core.redis import get_redis
+from app.core.tracing import span
+
+load_dotenv()
+
+# "inline" runs main_agent in the web worker's threadpool; "stream" hands turns to app.agents.worker processes
+AGENT_MODE = os.getenv("AGENT_MODE", "inline")
+AGENT_STREAM = os.getenv("AGENT_STREAM", "agent:turns")
+AGENT_GROUP = os.getenv("AGENT_GROUP", "agent-workers")
+AGENT_REPLY_TIMEOUT = float(os.getenv("AGENT_REPLY_TIMEOUT", 120))
+REPLY_STREAM_PREFIX = "agent:replies:"
+# A reply stream outlives its web worker by this much at most
+REPLY_STREAM_TTL = 3600
+
+
+class AgentJobError(Exception):
+    """The agent worker gave up on a turn (raised in the web worker that submitted it)."""
+
+
+class AgentJobs:
+    """Web side of the agent job protocol.
+
+    A turn is XADDed to AGENT_STREAM with a job id and this worker's reply stream; an agent
+    worker XADDs {job_id, reply | error} to that stream and a listener thread resolves the
+    waiting future. Replies for job ids nobody waits on (timeouts, redeliveries) are dropped.
+    """
+
+    def __init__(self):
+        self.reply_stream: str | None = None
+        self._pending: dict[str, asyncio.Future] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._loop = asyncio.get_running_loop()
+        # Per process: uvicorn/gunicorn workers each get their own reply stream
+        self.reply_stream = f"{REPLY_STREAM_PREFIX}{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="agent-replies", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self.reply_stream:
+            get_redis().delete(self.reply_stream)
+        for future in self._pending.values():
+            if not future.done():
+                future.cancel()
+
+    def submit(self, job_id: str, conversation_id: str, user_id: str, user_input: str) -> str:
+        return get_redis().xadd(AGENT_STREAM, {
+            "job_id": job_id,
+            "conversation_id": conversation_id,
+            "user_id": user_id,
+            "input": user_input,
+            "reply_to": self.reply_stream,
+            # Past this nobody waits for the reply: agent workers drop the job instead of running it
+            "deadline": f"{time.time() + AGENT_REPLY_TIMEOUT:.3f}",
+        })
+
+    async def run(self, conversation_id: str, user_id: str, user_input: str) -> str:
+        """Queue one turn and wait for its reply (same contract as main_agent)."""
+        self.start()
+        job_id = uuid.uuid4().hex
+        future = self._loop.create_future()
+        self._pending[job_id] = future
+        try:
+            with span("agent", "job"):
+                self.submit(job_id, conversation_id, user_id, user_input)
+                return await asyncio.wait_for(future, AGENT_REPLY_TIMEOUT)
+        finally:
+            self._pending.pop(job_id, None)
+
+    def _resolve(self, job_id: str, reply: str | None, error: str | None):
+        future = self._pending.get(job_id)
+        if future is None or future.done():
+            return
+        if error is not None:
+            future.set_exception(AgentJobError(error))
+        else:
+            future.set_result(reply)
+
+    def _run(self):
+        client = get_redis()
+        last_id = "0-0"
+        while not self._stop.is_set():
+            try:
+                streams = client.xread({self.reply_stream: last_id}, block=1000)
+                if not streams:
+                    client.expire(self.reply_stream, REPLY_STREAM_TTL)
+                    continue
+                entries = streams[0][1]
+                for entry_id, fields in entries:
+                    self._loop.call_soon_threadsafe(self._resolve, fields["job_id"], fields.get("reply"), fields.get("error"))
+                last_id = entries[-1][0]
+                client.xdel(self.reply_stream, *(entry_id for entry_id, _ in entries))
+            except Exception as e:
+                print(f"[AGENT ERROR] reply listener: {e}")
+                self._stop.wait(1.0)
+
+
+agent_jobs = AgentJobs()
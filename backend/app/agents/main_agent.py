@@ -2,10 +2,17 @@ from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_community.chat_message_histories import RedisChatMessageHistory
 from sqlalchemy.orm import Session
+from contextlib import contextmanager
+from app.db.database import read_through, session_scope
+from app.core.redis import get_raw_redis
+from app.core.tracing import span
 from app.models.conversations import AgentMemorySummary, Conversation
 from dotenv import load_dotenv
 from app.prompts.profiles import PROFILES
 from app.services.dependencies import DependencyResolver
+from app.services.transcripts import TranscriptService
+from app.agents.memory import MEMORY_ENABLED, MemoryService
+from datetime import datetime, timezone
 import uuid
 import os
 
@@ -44,6 +51,22 @@ def summarize_history(messages, llm):
     return llm.invoke(summary_prompt).content
 
 
+def merge_summaries(summaries, llm):
+    """Resumen de resumenes: lo usa la compactacion de memoria (app.agents.compaction)."""
+    text = "\n".join(f"- {summary}" for summary in summaries)
+
+    merge_prompt = f"""
+    Combina en un solo resumen breve los siguientes resumenes de una misma conversacion, del mas antiguo al mas reciente.
+    Conserva los datos del usuario (preferencias, restricciones, decisiones) y los temas principales; omite los detalles.
+    Menos de 500 caracteres en total.
+
+    Resumenes:
+    {text}
+    """
+
+    return llm.invoke(merge_prompt).content
+
+
 def build_agent(profile_id: str):
     profile = PROFILES.get(profile_id, PROFILES["default"])
     cache_key = f"{profile_id}:{profile['model']}:{profile['temperature']}"
@@ -52,38 +75,59 @@ def build_agent(profile_id: str):
         llm = get_llm(profile["model"], profile["temperature"])
         prompt = ChatPromptTemplate.from_messages([
             ("system", profile["prompt"]),
+            # Top-k long-term summaries for this turn (app.agents.memory), empty when there are none
+            MessagesPlaceholder("memory", optional=True),
             MessagesPlaceholder("messages"),
         ])
         AGENT_POOL[cache_key] = (prompt | llm, llm)
 
     return AGENT_POOL[cache_key]
 
-def clear_redis_session(user_id: str, session_id: str, profile_id: str):
-    """Clear Redis history for a specific session to ensure clean start."""
-    redis_session_key = f"user_{user_id}_session_{session_id}_prof_{profile_id}"
+def get_redis_history(redis_session_key: str) -> RedisChatMessageHistory:
     redis_history = RedisChatMessageHistory(
         session_id=redis_session_key,
         url=REDIS_URL,
         ttl=3600 * 12
     )
+    # Reuse the shared pooled client instead of the one LangChain opens per history
+    redis_history.redis_client = get_raw_redis()
+    return redis_history
+
+
+def clear_redis_session(user_id: str, session_id: str, profile_id: str):
+    """Clear Redis history for a specific session to ensure clean start."""
+    redis_session_key = f"user_{user_id}_session_{session_id}_prof_{profile_id}"
+    redis_history = get_redis_history(redis_session_key)
     redis_history.clear()
     print(f"Cleared Redis history for session: {redis_session_key}")
 
 
-def main_agent(user_input: str, session_id: str, user_id: str, db: Session) -> str:
+@contextmanager
+def _session(db: Session | None):
+    # Without a caller session, each DB step opens its own so none is held across the LLM call
+    if db is not None:
+        yield db
+    else:
+        with session_scope() as scoped:
+            yield scoped
+
+
+def main_agent(user_input: str, session_id: str, user_id: str, db: Session | None = None) -> str:
     """Agente con memoria corta (Redis) y persistencia de resumen en Supabase."""
 
-    profile_id = DependencyResolver._resolve_profile_id(db, session_id)
+    with span("step", "resolve_conversation"):
+        if db is not None:
+            conversation = DependencyResolver._resolve_conversation(db, session_id)
+        else:
+            # Read-only: a replica, or the primary for a conversation created a moment ago
+            conversation = read_through(lambda session: DependencyResolver._resolve_conversation(session, session_id))
+    profile_id = DependencyResolver._profile_id_for(conversation)
 
     agent, llm = build_agent(profile_id)
 
     redis_session_key = f"user_{user_id}_session_{session_id}_prof_{profile_id}"
     
-    redis_history = RedisChatMessageHistory(
-        session_id=redis_session_key,
-        url=REDIS_URL,
-        ttl=3600 * 12
-    )
+    redis_history = get_redis_history(redis_session_key)
     
     # Check if there are any messages that don't belong to this conversation
     # If we detect contamination, clear the history
@@ -96,14 +140,32 @@ def main_agent(user_input: str, session_id: str, user_id: str, db: Session) -> s
             print("\nDetected contamination in Redis history. Clearing...")
             redis_history.clear()
 
+    # Cold cache: rebuild the short-term history from the persisted transcript
+    if conversation and len(redis_history.messages) == 0:
+        with span("step", "rehydrate"), _session(db) as session:
+            TranscriptService.rehydrate(session, conversation.id, redis_history)
+
     # Add user message to history
     redis_history.add_user_message(user_input)
+    if conversation:
+        TranscriptService.record(conversation.id, "human", user_input)
     
     # Get all messages from history
     messages = redis_history.messages
+
+    # Only the summaries related to this message, not the whole long-term memory
+    memory = []
+    if conversation and MEMORY_ENABLED:
+        try:
+            with span("step", "recall"), _session(db) as session:
+                memory = MemoryService.as_messages(MemoryService.recall(session, conversation.id, user_input))
+        except Exception as e:
+            # The turn still works without long-term memory (e.g. embeddings API down)
+            print(f"[MEMORY ERROR] recall for {conversation.id}: {e}")
     
     # Invoke agent with messages
-    response = agent.invoke({"messages": messages})
+    with span("llm", "agent.invoke"):
+        response = agent.invoke({"messages": messages, "memory": memory})
     
     # Extract content from response
     if hasattr(response, 'content'):
@@ -113,19 +175,25 @@ def main_agent(user_input: str, session_id: str, user_id: str, db: Session) -> s
     
     # Add AI response to history
     redis_history.add_ai_message(response_content)
+    if conversation:
+        TranscriptService.record(conversation.id, "ai", response_content)
 
     if len(redis_history.messages) >= 10:
-        summary = summarize_history(redis_history.messages[:10], llm) 
-
-        # Save summary to database
-        conversation = AgentMemorySummary(
-            conversation_id=session_id,
-            summary=summary
-        )
-
-        db.add(conversation)
-        db.commit()
-        db.refresh(conversation)
+        with span("llm", "summarize_history"):
+            summary = summarize_history(redis_history.messages[:10], llm)
+
+        # Save summary to database (only for sessions backed by a real conversation)
+        if conversation:
+            memory_summary = AgentMemorySummary(
+                conversation_id=conversation.id,
+                summary=summary,
+                # Same clock as the transcript rows, so rehydrate can tell what is already summarized
+                created_at=datetime.now(timezone.utc),
+            )
+
+            with span("step", "persist_summary"), _session(db) as session:
+                session.add(memory_summary)
+                session.commit()
 
         # Clear old messages but keep recent ones for context
         messages_to_keep = redis_history.messages[10:]
@@ -0,0 +1,268 @@
+import hashlib
+import math
+import os
+import re
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import lru_cache
+import numpy as np
+from langchain_core.messages import SystemMessage
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from app.models.conversations import AgentMemorySummary
+from app.services.moderation import normalize
+
+load_dotenv()
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+MEMORY_ENABLED = os.getenv("MEMORY_ENABLED", "1") == "1"
+# "openai" or "hashing" (local, deterministic, no network)
+MEMORY_EMBEDDER = os.getenv("MEMORY_EMBEDDER", "openai" if OPENAI_API_KEY else "hashing")
+MEMORY_EMBEDDING_MODEL = os.getenv("MEMORY_EMBEDDING_MODEL", "text-embedding-3-small")
+MEMORY_TOP_K = int(os.getenv("MEMORY_TOP_K", 3))
+MEMORY_MIN_SCORE = float(os.getenv("MEMORY_MIN_SCORE", 0.2))  # cosine similarity
+MEMORY_INDEX_DIR = os.getenv("MEMORY_INDEX_DIR", os.path.join(tempfile.gettempdir(), "onlinex-memory"))
+MEMORY_INDEX_CACHE = int(os.getenv("MEMORY_INDEX_CACHE", 256))  # conversations kept in RAM per process
+# Rewrite the disk cache once this many summaries were added since the last write; a cold
+# process embeds the few newer ones itself
+MEMORY_INDEX_FLUSH = int(os.getenv("MEMORY_INDEX_FLUSH", 32))
+
+_TOKEN = re.compile(r"\w+")
+# Function words carry no topic; left in, every summary ("el usuario pregunto...") looks alike
+STOPWORDS = frozenset("""
+a al algo como con de del el ella en era es esa ese eso esta este esto fue ha hay la las le les lo los mas me mi
+muy no nos o para pero por que se si sin sobre soy su sus te tu un una uno y ya yo
+an and are as at be but by for from has have i in is it its of on or that the this to was were with you
+""".split())
+
+
+@lru_cache(maxsize=100_000)
+def _bucket(feature: str, dim: int) -> tuple[int, float]:
+    # Stable across processes, unlike hash(); the sign keeps colliding features from piling up
+    value = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+    return (value >> 1) % dim, 1.0 if value & 1 else -1.0
+
+
+class HashingEmbedder:
+    """Local embedder: signed feature hashing of content words and their stems, L2-normalized.
+    Deterministic and offline, so tests and benchmarks don't need an API key."""
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        words = [word for word in _TOKEN.findall(normalize(text)) if word not in STOPWORDS]
+        # Word stems (first 5 letters) let "alergia" meet "alergico"
+        features = words + [word[:5] for word in words if len(word) > 5]
+        counts: dict[str, int] = {}
+        for feature in features:
+            counts[feature] = counts.get(feature, 0) + 1
+        for feature, count in counts.items():
+            bucket, sign = _bucket(feature, self.dim)
+            vector[bucket] += sign * (1.0 + math.log(count))
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_documents(self, texts: list[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.vstack([self._embed(text) for text in texts])
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return self._embed(text)
+
+
+class OpenAIEmbedder:
+    """OpenAI embeddings through LangChain; vectors come back unit-length."""
+
+    def __init__(self, model: str = MEMORY_EMBEDDING_MODEL):
+        from langchain_openai import OpenAIEmbeddings
+
+        self._client = OpenAIEmbeddings(model=model, openai_api_key=OPENAI_API_KEY)
+        self.name = f"openai-{model}"
+
+    def embed_documents(self, texts: list[str]) -> np.ndarray:
+        return np.asarray(self._client.embed_documents(texts), dtype=np.float32)
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return np.asarray(self._client.embed_query(text), dtype=np.float32)
+
+
+EMBEDDERS = {"hashing": HashingEmbedder, "openai": OpenAIEmbedder}
+_embedder = None
+
+
+def get_embedder():
+    global _embedder
+    if _embedder is None:
+        _embedder = EMBEDDERS[MEMORY_EMBEDDER]()
+    return _embedder
+
+
+def set_embedder(embedder):
+    """Swap the embedder (anything with name, embed_documents and embed_query); cached indexes are dropped."""
+    global _embedder
+    _embedder = embedder
+    MemoryService.clear()
+
+
+class MemoryIndex:
+    """One conversation's summaries as a float32 matrix of unit vectors and their row ids.
+    Texts stay in the table; only the top-k are read back."""
+
+    __slots__ = ("embedder", "ids", "vectors", "until", "saved")
+
+    def __init__(self, embedder: str, ids=(), vectors=None, until: float = 0.0):
+        self.embedder = embedder
+        self.ids: list[str] = list(ids)
+        self.vectors = vectors
+        self.until = until  # created_at (epoch seconds) of the newest summary indexed
+        self.saved = len(self.ids)  # rows in the disk copy
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, ids: list[str], vectors: np.ndarray, until: float):
+        self.ids += ids
+        self.vectors = vectors if self.vectors is None else np.vstack([self.vectors, vectors])
+        self.until = max(self.until, until)
+
+    def search(self, query: np.ndarray, k: int, min_score: float = -1.0) -> list[tuple[float, str]]:
+        """(score, id) of the k closest summaries, best first."""
+        if not self.ids:
+            return []
+        scores = self.vectors @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), self.ids[i]) for i in top if scores[i] >= min_score]
+
+    @staticmethod
+    def path(conversation_id) -> str:
+        return os.path.join(MEMORY_INDEX_DIR, f"{conversation_id}.npz")
+
+    def save(self, conversation_id):
+        os.makedirs(MEMORY_INDEX_DIR, exist_ok=True)
+        path = MemoryIndex.path(conversation_id)
+        # Write then rename, so a concurrent reader never sees half a file
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+        # float16 on disk halves the file; searches run on float32
+        np.savez(tmp, embedder=np.str_(self.embedder), ids=np.asarray(self.ids, dtype="U36"),
+                 vectors=self.vectors.astype(np.float16), until=np.float64(self.until))
+        os.replace(tmp, path)
+        self.saved = len(self.ids)
+
+    @staticmethod
+    def load(conversation_id, embedder: str) -> "MemoryIndex | None":
+        try:
+            with np.load(MemoryIndex.path(conversation_id)) as data:
+                if str(data["embedder"]) != embedder:
+                    return None
+                return MemoryIndex(embedder, data["ids"].tolist(), data["vectors"].astype(np.float32), float(data["until"]))
+        except (OSError, KeyError, ValueError):
+            return None
+
+
+class MemoryService:
+    """Long-term memory: the summaries most related to the current message, not all of them."""
+
+    _indexes: "OrderedDict[str, MemoryIndex]" = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def clear():
+        with MemoryService._lock:
+            MemoryService._indexes.clear()
+
+    @staticmethod
+    def invalidate(*conversation_ids):
+        """Forget cached indexes (e.g. after summaries were merged or deleted)."""
+        with MemoryService._lock:
+            for conversation_id in conversation_ids:
+                MemoryService._indexes.pop(str(conversation_id), None)
+        for conversation_id in conversation_ids:
+            try:
+                os.remove(MemoryIndex.path(conversation_id))
+            except OSError:
+                pass
+
+    @staticmethod
+    def _since(db: Session, conversation_id, until: float) -> list:
+        query = db.query(AgentMemorySummary.id, AgentMemorySummary.summary, AgentMemorySummary.created_at).filter(
+            AgentMemorySummary.conversation_id == conversation_id
+        )
+        if until:
+            # >= so rows sharing the watermark's timestamp aren't skipped; known ids are filtered out
+            query = query.filter(AgentMemorySummary.created_at >= datetime.fromtimestamp(until, timezone.utc))
+        return query.order_by(AgentMemorySummary.created_at).all()
+
+    @staticmethod
+    def index_for(db: Session, conversation_id) -> MemoryIndex:
+        """RAM, then disk, then the table; only summaries the index hasn't seen are embedded."""
+        embedder = get_embedder()
+        key = str(conversation_id)
+        with MemoryService._lock:
+            index = MemoryService._indexes.get(key)
+        if index is None or index.embedder != embedder.name:
+            index = MemoryIndex.load(key, embedder.name)
+        if index is None:
+            index = MemoryIndex(embedder.name)
+
+        count = (
+            db.query(func.count(AgentMemorySummary.id))
+            .filter(AgentMemorySummary.conversation_id == conversation_id)
+            .scalar()
+        )
+        if count != len(index):
+            fresh = MemoryService._since(db, conversation_id, index.until)
+            if index.ids:
+                known = set(index.ids)
+                fresh = [row for row in fresh if str(row.id) not in known]
+            if len(index) + len(fresh) != count:
+                # Rows were removed or rewritten (compaction): rebuild rather than patch
+                index = MemoryIndex(embedder.name)
+                fresh = MemoryService._since(db, conversation_id, 0.0)
+            if fresh:
+                index.add(
+                    [str(row.id) for row in fresh],
+                    embedder.embed_documents([row.summary for row in fresh]),
+                    max(row.created_at.timestamp() for row in fresh),
+                )
+            if not index.ids:
+                MemoryService.invalidate(key)
+            elif index.saved == 0 or len(index) - index.saved >= MEMORY_INDEX_FLUSH:
+                index.save(key)
+
+        with MemoryService._lock:
+            MemoryService._indexes[key] = index
+            MemoryService._indexes.move_to_end(key)
+            while len(MemoryService._indexes) > MEMORY_INDEX_CACHE:
+                MemoryService._indexes.popitem(last=False)
+        return index
+
+    @staticmethod
+    def recall(db: Session, conversation_id, query: str, k: int = MEMORY_TOP_K) -> list[str]:
+        index = MemoryService.index_for(db, conversation_id)
+        hits = index.search(get_embedder().embed_query(query), k, MEMORY_MIN_SCORE) if len(index) else []
+        if not hits:
+            return []
+        texts = dict(
+            db.query(AgentMemorySummary.id, AgentMemorySummary.summary)
+            .filter(AgentMemorySummary.id.in_([uuid.UUID(summary_id) for _, summary_id in hits]))
+            .all()
+        )
+        return [texts[uuid.UUID(summary_id)] for _, summary_id in hits if uuid.UUID(summary_id) in texts]
+
+    @staticmethod
+    def as_messages(summaries: list[str]) -> list:
+        """What build_agent's "memory" slot receives."""
+        if not summaries:
+            return []
+        lines = "\n".join(f"- {summary}" for summary in summaries)
+        return [SystemMessage(content=f"Resumen de partes anteriores de esta conversacion que pueden ser relevantes:\n{lines}")]
@@ -0,0 +1,207 @@
+"""Agent worker process: consumes chatbot turns from the Redis Stream and answers the owning web worker.
+
+    cd backend && python -m app.agents.worker --concurrency 8
+
+Each thread is a consumer of AGENT_GROUP. A job is acked (and deleted) only after its reply
+is written, so a worker that dies mid-turn leaves it pending; any consumer reclaims pending
+jobs idle for longer than AGENT_CLAIM_IDLE_MS, up to AGENT_MAX_DELIVERIES attempts. Turns in
+flight are renewed while they run, so only a dead worker's turns go idle, however slow the
+LLM. Jobs whose web worker has stopped waiting (past their deadline) are dropped unanswered.
+"""
+import argparse
+import os
+import signal
+import socket
+import threading
+import time
+from redis.exceptions import ResponseError
+from dotenv import load_dotenv
+from app.agents.jobs import AGENT_GROUP, AGENT_STREAM, REPLY_STREAM_TTL
+from app.agents.main_agent import main_agent
+from app.core.redis import get_redis
+from app.services.transcripts import transcript_writer
+
+load_dotenv()
+
+AGENT_WORKER_CONCURRENCY = int(os.getenv("AGENT_WORKER_CONCURRENCY", 4))
+AGENT_CLAIM_IDLE_MS = int(os.getenv("AGENT_CLAIM_IDLE_MS", 60_000))  # a dead worker's turns are redelivered after this
+AGENT_CLAIM_RENEW = AGENT_CLAIM_IDLE_MS / 3000  # seconds between renewals of the turns in flight
+AGENT_CLAIM_INTERVAL = float(os.getenv("AGENT_CLAIM_INTERVAL", 5))
+AGENT_MAX_DELIVERIES = int(os.getenv("AGENT_MAX_DELIVERIES", 3))
+
+
+def ensure_group(client):
+    try:
+        client.xgroup_create(AGENT_STREAM, AGENT_GROUP, id="0", mkstream=True)
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+class Leases:
+    """Turns in flight in this process, kept claimed while they run.
+
+    XCLAIM ... JUSTID with no minimum idle time resets a pending entry's idle time without
+    counting a delivery: renewed every AGENT_CLAIM_RENEW seconds, a turn slower than
+    AGENT_CLAIM_IDLE_MS is not reclaimed (and run twice) by another consumer.
+    """
+
+    def __init__(self):
+        self._held: dict[str, str] = {}  # entry id -> consumer
+        self._lock = threading.Lock()
+
+    def hold(self, entry_id: str, consumer: str):
+        with self._lock:
+            self._held[entry_id] = consumer
+
+    def release(self, entry_id: str):
+        with self._lock:
+            self._held.pop(entry_id, None)
+
+    def renew(self, client):
+        with self._lock:
+            held = list(self._held.items())
+        if not held:
+            return
+        by_consumer: dict[str, list[str]] = {}
+        for entry_id, consumer in held:
+            by_consumer.setdefault(consumer, []).append(entry_id)
+        pipe = client.pipeline(transaction=False)
+        for consumer, entry_ids in by_consumer.items():
+            pipe.xclaim(AGENT_STREAM, AGENT_GROUP, consumer, 0, entry_ids, justid=True)
+        pipe.execute()
+
+    def run(self, stop: threading.Event):
+        client = get_redis()
+        while not stop.wait(AGENT_CLAIM_RENEW):
+            try:
+                self.renew(client)
+            except Exception as e:
+                print(f"[AGENT ERROR] renewing turns in flight: {e}")
+
+
+leases = Leases()
+
+
+def reply(client, entry_id: str, fields: dict, **payload):
+    """Write the reply, then ack and drop the job, in one round trip."""
+    pipe = client.pipeline(transaction=False)
+    pipe.xadd(fields["reply_to"], {"job_id": fields["job_id"], **payload})
+    pipe.expire(fields["reply_to"], REPLY_STREAM_TTL)
+    pipe.xack(AGENT_STREAM, AGENT_GROUP, entry_id)
+    pipe.xdel(AGENT_STREAM, entry_id)
+    pipe.execute()
+
+
+def drop(client, entry_id: str):
+    pipe = client.pipeline(transaction=False)
+    pipe.xack(AGENT_STREAM, AGENT_GROUP, entry_id)
+    pipe.xdel(AGENT_STREAM, entry_id)
+    pipe.execute()
+
+
+def expired(fields: dict) -> bool:
+    """The web worker that submitted the job has given up waiting for it."""
+    deadline = fields.get("deadline")
+    return deadline is not None and time.time() > float(deadline)
+
+
+def handle(client, consumer: str, entry_id: str, fields: dict):
+    if expired(fields):
+        print(f"[AGENT] job {fields.get('job_id')} dropped: its web worker stopped waiting")
+        drop(client, entry_id)
+        return
+    leases.hold(entry_id, consumer)
+    try:
+        response = main_agent(
+            user_input=fields["input"],
+            session_id=fields["conversation_id"],
+            user_id=fields["user_id"],
+        )
+    except Exception as e:
+        print(f"[AGENT ERROR] job {fields.get('job_id')}: {e}")
+        reply(client, entry_id, fields, error=str(e) or e.__class__.__name__)
+        return
+    finally:
+        leases.release(entry_id)
+    reply(client, entry_id, fields, reply=response)
+
+
+def claim_stale(client, consumer: str) -> list:
+    """Jobs left pending by a consumer that died; poison jobs past the delivery cap are answered with an error."""
+    _, entries, _ = client.xautoclaim(AGENT_STREAM, AGENT_GROUP, consumer, AGENT_CLAIM_IDLE_MS, "0-0", count=10)
+    runnable = []
+    for entry_id, fields in entries:
+        if not fields:
+            # Entry deleted from the stream while still pending
+            client.xack(AGENT_STREAM, AGENT_GROUP, entry_id)
+            continue
+        if expired(fields):
+            # handle() drops it; not worth an error reply nobody reads
+            runnable.append((entry_id, fields))
+            continue
+        pending = client.xpending_range(AGENT_STREAM, AGENT_GROUP, min=entry_id, max=entry_id, count=1)
+        if pending and pending[0]["times_delivered"] > AGENT_MAX_DELIVERIES:
+            print(f"[AGENT ERROR] job {fields.get('job_id')} failed {AGENT_MAX_DELIVERIES} deliveries, giving up")
+            reply(client, entry_id, fields, error="agent worker crashed")
+            continue
+        print(f"[AGENT] reclaimed job {fields.get('job_id')} for {consumer}")
+        runnable.append((entry_id, fields))
+    return runnable
+
+
+def consume(consumer: str, stop: threading.Event):
+    client = get_redis()
+    next_claim = 0.0
+    while not stop.is_set():
+        try:
+            entries = []
+            if time.monotonic() >= next_claim:
+                entries = claim_stale(client, consumer)
+                next_claim = time.monotonic() + AGENT_CLAIM_INTERVAL
+            if not entries:
+                streams = client.xreadgroup(AGENT_GROUP, consumer, {AGENT_STREAM: ">"}, count=1, block=1000)
+                entries = streams[0][1] if streams else []
+            for entry_id, fields in entries:
+                handle(client, consumer, entry_id, fields)
+        except Exception as e:
+            print(f"[AGENT ERROR] {consumer}: {e}")
+            stop.wait(1.0)
+
+
+def run(concurrency: int = AGENT_WORKER_CONCURRENCY, stop: threading.Event | None = None):
+    stop = stop or threading.Event()
+    ensure_group(get_redis())
+    name = f"{socket.gethostname()}:{os.getpid()}"
+    threads = [
+        threading.Thread(target=consume, args=(f"{name}:{i}", stop), name=f"agent-{i}", daemon=True)
+        for i in range(concurrency)
+    ]
+    threads.append(threading.Thread(target=leases.run, args=(stop,), name="agent-leases", daemon=True))
+    for thread in threads:
+        thread.start()
+    print(f"[AGENT] {name} consuming {AGENT_STREAM} with {concurrency} threads")
+    try:
+        while not stop.is_set():
+            stop.wait(1.0)
+    finally:
+        stop.set()
+        # Threads finish the turn they are on; its reply is written before the ack
+        for thread in threads:
+            thread.join()
+        transcript_writer.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agent worker")
+    parser.add_argument("--concurrency", type=int, default=AGENT_WORKER_CONCURRENCY)
+    args = parser.parse_args()
+
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+    run(args.concurrency, stop)
+
+
+if __name__ == "__main__":
+    main()
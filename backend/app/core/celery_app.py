@@ -1,17 +1,166 @@
-# from app.core.config import settings
-# from celery import Celery
-# from celery.schedules import crontab
-
-# celery = Celery(
-#     'app',
-#     broker=settings.CELERY_BROKER_URL,
-#     backend=settings.CELERY_RESULT_BACKEND,
-# )
-
-# celery.conf.beat_schedule = {
-#     'cleanup-every-hour': {
-#         'task': 'app.tasks.cleanup_expired_rooms',
-#         'schedule': crontab(minute=0, hour='*'),  # cada hora
-#     },
-# }
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, urlunsplit
+from celery import Celery
+from celery.signals import (
+    before_task_publish, task_failure, task_postrun, task_prerun, worker_process_init, worker_ready,
+)
+from celery.utils.log import current_process_index
+from kombu import Queue
+from dotenv import load_dotenv
+from app.core.metrics import CELERY_QUEUE_WAIT_SECONDS, CELERY_TASK_SECONDS, render as render_metrics
+import os
 
+load_dotenv()
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+ANALYTICS_INTERVAL = float(os.getenv("ANALYTICS_INTERVAL", 300))
+MEMORY_COMPACT_INTERVAL = float(os.getenv("MEMORY_COMPACT_INTERVAL", 900))
+ROOM_MESSAGE_ARCHIVE_INTERVAL = float(os.getenv("ROOM_MESSAGE_ARCHIVE_INTERVAL", 3600))
+
+
+def _redis_db(url: str, db: int = 0) -> str:
+    """The Redis URL on database `db`, unless it already names one."""
+    parts = urlsplit(url)
+    return url if parts.path.strip("/") else urlunsplit(parts._replace(path=f"/{db}"))
+
+
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL") or _redis_db(REDIS_URL)
+# Empty by default: no task result is read anywhere, so nothing is stored
+CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND") or None
+CELERY_TASK_ALWAYS_EAGER = os.getenv("CELERY_TASK_ALWAYS_EAGER", "0") == "1"
+CELERY_PREFETCH_MULTIPLIER = int(os.getenv("CELERY_PREFETCH_MULTIPLIER", 1))
+CELERY_ACKS_LATE = os.getenv("CELERY_ACKS_LATE", "1") == "1"
+CELERY_METRICS_PORT = int(os.getenv("CELERY_METRICS_PORT", 0))
+
+MAINTENANCE_QUEUE = "maintenance"
+SUMMARIZATION_QUEUE = "summarization"
+MODERATION_QUEUE = "moderation"
+
+celery_app = Celery("tasks", broker=CELERY_BROKER_URL, backend=CELERY_RESULT_BACKEND)
+
+celery_app.conf.update(
+    timezone="UTC",
+    task_ignore_result=True,
+    task_store_errors_even_if_ignored=False,
+    task_queues=(
+        Queue(MAINTENANCE_QUEUE),
+        Queue(SUMMARIZATION_QUEUE),
+        Queue(MODERATION_QUEUE),
+    ),
+    task_default_queue=MAINTENANCE_QUEUE,
+    task_routes={
+        "tasks.clean_*": {"queue": MAINTENANCE_QUEUE},
+        "tasks.aggregate_*": {"queue": MAINTENANCE_QUEUE},
+        "tasks.summarize_*": {"queue": SUMMARIZATION_QUEUE},
+        "tasks.compact_memory_sweep": {"queue": SUMMARIZATION_QUEUE},
+        "tasks.compact_conversation_memory": {"queue": SUMMARIZATION_QUEUE},
+        "tasks.moderate_*": {"queue": MODERATION_QUEUE},
+    },
+    # One task in flight per process and ack after it ran: long LLM tasks are not
+    # hoarded by one worker and are redelivered if the worker dies mid-task
+    worker_prefetch_multiplier=CELERY_PREFETCH_MULTIPLIER,
+    task_acks_late=CELERY_ACKS_LATE,
+    task_reject_on_worker_lost=CELERY_ACKS_LATE,
+    task_always_eager=CELERY_TASK_ALWAYS_EAGER,
+    task_eager_propagates=True,
+    broker_connection_retry_on_startup=True,
+)
+
+celery_app.conf.beat_schedule = {
+    "clean-expired-rooms-every-hour": {
+        "task": "tasks.clean_expired_rooms",
+        "schedule": 3600.0,
+    },
+    "aggregate-usage": {
+        "task": "tasks.aggregate_usage",
+        "schedule": ANALYTICS_INTERVAL,
+    },
+    "compact-agent-memory": {
+        "task": "tasks.compact_memory_sweep",
+        "schedule": MEMORY_COMPACT_INTERVAL,
+    },
+    "archive-expired-messages": {
+        "task": "tasks.clean_expired_messages",
+        "schedule": ROOM_MESSAGE_ARCHIVE_INTERVAL,
+    },
+}
+
+# Task modules are listed explicitly: autodiscovery only looks for app/tasks/tasks.py
+celery_app.conf.include = ["app.tasks.del_rooms", "app.tasks.moderation", "app.tasks.analytics", "app.tasks.memory",
+                           "app.tasks.message_archive"]
+
+
+# Per-queue metrics: time spent waiting in the broker and running, by task and outcome
+_started: dict[str, tuple[float, str]] = {}  # task_id -> (perf_counter at start, queue)
+
+
+def _queue_of(task) -> str:
+    delivery_info = getattr(task.request, "delivery_info", None) or {}
+    return delivery_info.get("routing_key") or MAINTENANCE_QUEUE
+
+
+@before_task_publish.connect
+def _stamp_enqueued(headers=None, **kwargs):
+    if headers is not None:
+        headers["enqueued_at"] = time.time()
+
+
+@task_prerun.connect
+def _task_started(task_id=None, task=None, **kwargs):
+    queue = _queue_of(task)
+    enqueued_at = getattr(task.request, "enqueued_at", None)
+    if enqueued_at:
+        CELERY_QUEUE_WAIT_SECONDS.observe(max(0.0, time.time() - enqueued_at), queue=queue)
+    _started[task_id] = (time.perf_counter(), queue)
+
+
+@task_postrun.connect
+def _task_finished(task_id=None, task=None, state=None, **kwargs):
+    started = _started.pop(task_id, None)
+    if started:
+        CELERY_TASK_SECONDS.observe(
+            time.perf_counter() - started[0], queue=started[1], task=task.name, state=state or "UNKNOWN"
+        )
+
+
+@task_failure.connect
+def _task_failed(task_id=None, exception=None, **kwargs):
+    print(f"[CELERY ERROR] {task_id}: {exception!r}")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = render_metrics().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve_metrics(port: int):
+    server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="celery-metrics", daemon=True).start()
+
+
+# Workers have no web server of their own; CELERY_METRICS_PORT exposes the same /metrics text.
+# Metrics live in the process that ran the task: with the solo and threads pools that is the
+# worker itself, with prefork each pool process serves its own on CELERY_METRICS_PORT + its index
+# (0 to concurrency - 1; a replaced process takes over its index and port).
+@worker_ready.connect
+def _serve_worker_metrics(sender=None, **kwargs):
+    from celery.concurrency.prefork import TaskPool as PreforkPool
+
+    if CELERY_METRICS_PORT and not isinstance(getattr(sender, "pool", None), PreforkPool):
+        _serve_metrics(CELERY_METRICS_PORT)
+
+
+@worker_process_init.connect
+def _serve_pool_process_metrics(**kwargs):
+    if CELERY_METRICS_PORT:
+        _serve_metrics(CELERY_METRICS_PORT + (current_process_index(base=0) or 0))
@@ -0,0 +1,123 @@
+import threading
+from bisect import bisect_left
+
+REGISTRY = []
+
+
+class Counter:
+    """Minimal Prometheus-style metric; values are kept per label combination."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labels: tuple = ()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, dict(zip(self.labels, key)), value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Counter):
+    kind = "histogram"
+
+    DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+    def __init__(self, name: str, description: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def value(self, **labels) -> float:
+        entry = self._values.get(self._key(labels))
+        return entry[2] if entry else 0
+
+    def samples(self):
+        with self._lock:
+            items = [(key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items()]
+        for key, (counts, total, count) in items:
+            labels = dict(zip(self.labels, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", {**labels, "le": bound}, cumulative
+            yield f"{self.name}_bucket", {**labels, "le": "+Inf"}, count
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    return "{" + pairs + "}"
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.description}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+WS_OPEN = Gauge("ws_open_connections", "Open websocket connections on this worker", ("endpoint",))
+WS_REAPED = Counter("ws_reaped_total", "Websocket connections closed for being idle", ("endpoint",))
+WS_DROPPED = Counter("ws_dropped_total", "Room sockets closed because their outbound queue filled up")
+SPECTATORS_OPEN = Gauge("spectators_open", "Read-only room streams open on this worker")
+SPECTATOR_FRAMES_SKIPPED = Counter("spectator_frames_skipped_total", "Room frames spectators missed by falling behind the shared buffer")
+HTTP_REQUEST_SECONDS = Histogram("http_request_duration_seconds", "HTTP request latency", ("method", "route", "status"))
+SPAN_SECONDS = Histogram("span_duration_seconds", "Time spent in instrumented operations", ("kind", "name"))
+DB_SESSIONS_OPEN = Gauge("db_sessions_open", "Database sessions currently open through get_db or session_scope")
+DB_READ_SESSIONS = Counter("db_read_sessions_total", "Read-only sessions by where they went: replica, fallback (to the primary) or primary (no replicas)", ("target",))
+DB_REPLICA_LAG = Gauge("db_replica_lag_seconds", "Last measured lag of each read replica, -1 while unreachable", ("replica",))
+ROOM_CACHE_LOOKUPS = Counter("room_cache_lookups_total", "Room metadata cache lookups", ("result",))
+ROOMS_EXPIRED = Counter("rooms_expired_total", "Rooms deactivated by the expiry scheduler")
+CELERY_QUEUE_WAIT_SECONDS = Histogram("celery_queue_wait_seconds", "Time a task waited in the broker before starting", ("queue",))
+CELERY_TASK_SECONDS = Histogram("celery_task_duration_seconds", "Celery task run time", ("queue", "task", "state"))
+MODERATION_ACTIONS = Counter("moderation_actions_total", "Messages masked inline or retracted by the async tier", ("tier", "action"))
+MEMORY_SUMMARIES_MERGED = Counter("memory_summaries_merged_total", "Agent memory summaries folded into rollups by compaction", ("level",))
+SHUTDOWN_SECONDS = Histogram("shutdown_duration_seconds", "Time spent draining this worker on shutdown, by phase", ("phase",),
+                             buckets=(0.1, 0.5, 1, 2.5, 5, 10, 20, 30, 60))
@@ -0,0 +1,37 @@
+import redis
+from dotenv import load_dotenv
+from app.core.tracing import TRACING_ENABLED, instrument_redis
+import os
+
+load_dotenv()
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+
+_client: redis.Redis | None = None
+_raw_client: redis.Redis | None = None
+
+
+def _traced(client: redis.Redis) -> redis.Redis:
+    return instrument_redis(client) if TRACING_ENABLED else client
+
+
+def get_redis() -> redis.Redis:
+    global _client
+    if _client is None:
+        _client = _traced(redis.Redis.from_url(REDIS_URL, decode_responses=True))
+    return _client
+
+
+def get_raw_redis() -> redis.Redis:
+    """Bytes client for LangChain's RedisChatMessageHistory, which decodes entries itself."""
+    global _raw_client
+    if _raw_client is None:
+        _raw_client = _traced(redis.Redis.from_url(REDIS_URL))
+    return _raw_client
+
+
+def set_redis(client: redis.Redis, raw_client: redis.Redis | None = None):
+    """Swap the shared clients, e.g. for fakeredis in local runs."""
+    global _client, _raw_client
+    _client = _traced(client)
+    _raw_client = _traced(raw_client) if raw_client is not None else None
@@ -0,0 +1,200 @@
+import contextvars
+import sys
+import threading
+import time
+from collections import Counter as StackCounter
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from app.core.metrics import HTTP_REQUEST_SECONDS, SPAN_SECONDS
+import os
+
+load_dotenv()
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "1") == "1"
+TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", 2000))
+
+# Spans recorded by the current request or websocket turn: list of (kind, name, seconds)
+_trace: contextvars.ContextVar[list | None] = contextvars.ContextVar("trace", default=None)
+
+
+def start_trace() -> contextvars.Token:
+    return _trace.set([])
+
+
+def end_trace(token: contextvars.Token) -> list:
+    spans = _trace.get() or []
+    _trace.reset(token)
+    return spans
+
+
+def record(kind: str, name: str, seconds: float):
+    SPAN_SECONDS.observe(seconds, kind=kind, name=name)
+    spans = _trace.get()
+    if spans is not None:
+        spans.append((kind, name, seconds))
+
+
+@contextmanager
+def span(kind: str, name: str):
+    if not TRACING_ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(kind, name, time.perf_counter() - started)
+
+
+def summarize(spans: list) -> dict:
+    totals = {}
+    for kind, _, seconds in spans:
+        totals[kind] = totals.get(kind, 0) + seconds
+    return totals
+
+
+def server_timing(spans: list) -> str:
+    return ", ".join(f"{kind};dur={seconds * 1000:.2f}" for kind, seconds in summarize(spans).items())
+
+
+def report_if_slow(label: str, spans: list, seconds: float):
+    if seconds * 1000 < TRACE_SLOW_MS:
+        return
+    breakdown = ", ".join(f"{kind}:{name}={duration * 1000:.0f}ms" for kind, name, duration in spans)
+    print(f"[SLOW] {label} took {seconds * 1000:.0f}ms ({breakdown})")
+
+
+def instrument_engine(engine):
+    """Time every statement sent through the engine as a `db` span named by its SQL verb."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("span_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["span_started"].pop()
+        record("db", statement.lstrip().split(None, 1)[0].upper(), time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        connection = context.connection
+        if connection is not None and connection.info.get("span_started"):
+            connection.info["span_started"].pop()
+
+
+def instrument_redis(client):
+    """Wrap a redis client so each command (or pipeline flush) is recorded as a `redis` span."""
+    execute_command = client.execute_command
+    make_pipeline = client.pipeline
+
+    def traced_execute(*args, **options):
+        with span("redis", str(args[0])):
+            return execute_command(*args, **options)
+
+    def traced_pipeline(*args, **kwargs):
+        pipe = make_pipeline(*args, **kwargs)
+        execute = pipe.execute
+
+        def traced_pipeline_execute(*exec_args, **exec_kwargs):
+            with span("redis", "PIPELINE"):
+                return execute(*exec_args, **exec_kwargs)
+
+        pipe.execute = traced_pipeline_execute
+        return pipe
+
+    client.execute_command = traced_execute
+    client.pipeline = traced_pipeline
+    return client
+
+
+class TimingMiddleware:
+    """Pure ASGI middleware: request histogram plus a Server-Timing header built from the spans."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not TRACING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        token = start_trace()
+        started = time.perf_counter()
+        status = {"code": 500, "stream_at": None}
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                spans = _trace.get() or []
+                total = time.perf_counter() - started
+                headers = list(message.get("headers", []))
+                if any(name == b"content-type" and value.startswith(b"text/event-stream") for name, value in headers):
+                    # An event stream stays open for as long as it is watched; it is timed up to its headers
+                    status["stream_at"] = time.perf_counter()
+                timing = server_timing(spans)
+                timing = f"{timing}, total;dur={total * 1000:.2f}" if timing else f"total;dur={total * 1000:.2f}"
+                headers.append((b"server-timing", timing.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            seconds = (status["stream_at"] or time.perf_counter()) - started
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            HTTP_REQUEST_SECONDS.observe(seconds, method=scope["method"], route=path, status=status["code"])
+            report_if_slow(f"{scope['method']} {path}", end_trace(token), seconds)
+
+
+class SamplingProfiler:
+    """Opt-in wall-clock sampler: snapshots every thread's stack and counts collapsed stacks.
+
+    The output is the folded format consumed by flamegraph.pl and speedscope."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.stacks: StackCounter = StackCounter()
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(names))] += 1
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+    def reset(self):
+        self.stacks.clear()
+
+
+profiler = SamplingProfiler(float(os.getenv("PROFILER_INTERVAL", 0.01)))
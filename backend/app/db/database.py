@@ -1,6 +1,12 @@
+import itertools
+import threading
+import time
+from contextlib import contextmanager
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from dotenv import load_dotenv
+from app.core.metrics import DB_READ_SESSIONS, DB_REPLICA_LAG, DB_SESSIONS_OPEN
+from app.core.tracing import TRACING_ENABLED, instrument_engine
 import os
 
 load_dotenv()
@@ -9,15 +15,154 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable is not set")
 
+# Read replicas: comma-separated URLs; read-only sessions go there while they keep up
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+DB_REPLICA_MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG", 5))  # seconds behind the primary a replica may be
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", 2))  # how often each replica's lag is measured
+DB_REPLICA_LAG_QUERY = os.getenv("DB_REPLICA_LAG_QUERY")  # SQL returning the lag in seconds, overrides the dialect's
 
-engine = create_engine(DATABASE_URL)
+# No query for a dialect: its replicas are taken as caught up
+LAG_QUERIES = {
+    # An idle primary sends nothing to replay, so a replica with everything replayed has no lag
+    "postgresql": (
+        "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+    ),
+}
+
+
+engine_options = {
+    "pool_pre_ping": True,
+    "pool_size": int(os.getenv("DB_POOL_SIZE", 5)),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 10)),
+    "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", 30)),
+}
+
+
+def make_engine(url: str):
+    options = dict(engine_options)
+    if url.startswith("sqlite"):
+        # File-backed SQLite only (local runs); sessions are used from worker threads
+        options["connect_args"] = {"check_same_thread": False, "timeout": 30}
+    created = create_engine(url, **options)
+    if TRACING_ENABLED:
+        instrument_engine(created)
+    return created
+
+
+engine = make_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-def get_db():
-    db = SessionLocal()
+
+class ReadOnlySession(Session):
+    """Session of get_read_db / session_scope(read_only=True): flushing changes from one is a routing bug."""
+
+    def flush(self, objects=None):
+        if self.new or self.dirty or self.deleted:
+            raise RuntimeError("Read-only session: write through get_db or session_scope()")
+        super().flush(objects)
+
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, class_=ReadOnlySession)
+
+
+class ReadRouter:
+    """Picks the engine for read-only sessions: the replicas in turn, skipping any that lag more
+    than the caller tolerates or can't be reached, and the primary when none qualifies.
+
+    Each replica's lag is measured at most every DB_REPLICA_CHECK_INTERVAL seconds, by whichever
+    request gets there first; the others go on with the last measurement meanwhile.
+    """
+
+    def __init__(self, primary, replicas: list):
+        self.primary = primary
+        self.replicas = replicas
+        self._lags: list[float | None] = [None] * len(replicas)  # None: unreachable or not measured yet
+        self._checked = [float("-inf")] * len(replicas)
+        self._locks = [threading.Lock() for _ in replicas]
+        self._turn = itertools.count()
+
+    @staticmethod
+    def measure(replica) -> float:
+        query = DB_REPLICA_LAG_QUERY or LAG_QUERIES.get(replica.dialect.name)
+        if not query:
+            return 0.0
+        with replica.connect() as connection:
+            return float(connection.exec_driver_sql(query).scalar() or 0)
+
+    def lag(self, index: int) -> float | None:
+        lock = self._locks[index]
+        if time.monotonic() - self._checked[index] >= DB_REPLICA_CHECK_INTERVAL and lock.acquire(blocking=False):
+            try:
+                self._checked[index] = time.monotonic()
+                try:
+                    self._lags[index] = ReadRouter.measure(self.replicas[index])
+                except Exception as e:
+                    if self._lags[index] is not None:
+                        print(f"[DB] replica {index} unavailable, reading from the primary: {e}")
+                    self._lags[index] = None
+                DB_REPLICA_LAG.set(-1 if self._lags[index] is None else self._lags[index], replica=index)
+            finally:
+                lock.release()
+        return self._lags[index]
+
+    def pick(self, max_lag: float | None = None):
+        if not self.replicas:
+            DB_READ_SESSIONS.inc(target="primary")
+            return self.primary
+        tolerance = DB_REPLICA_MAX_LAG if max_lag is None else max_lag
+        start = next(self._turn)
+        for offset in range(len(self.replicas)):
+            index = (start + offset) % len(self.replicas)
+            lag = self.lag(index)
+            if lag is not None and lag <= tolerance:
+                DB_READ_SESSIONS.inc(target="replica")
+                return self.replicas[index]
+        DB_READ_SESSIONS.inc(target="fallback")
+        return self.primary
+
+
+read_router = ReadRouter(engine, [make_engine(url) for url in DATABASE_REPLICA_URLS])
+
+
+@contextmanager
+def session_scope(read_only: bool = False, max_lag: float | None = None):
+    """Short-lived session for a single unit of work (websocket handlers, background jobs).
+
+    read_only sessions go to a replica at most max_lag (default DB_REPLICA_MAX_LAG) seconds behind."""
+    db = ReadSessionLocal(bind=read_router.pick(max_lag)) if read_only else SessionLocal()
+    DB_SESSIONS_OPEN.inc()
     try:
         yield db
     finally:
         db.close()
+        DB_SESSIONS_OPEN.dec()
+
+
+def read_through(query):
+    """query(db) on a replica; a miss there (row not replicated yet) is retried on the primary."""
+    with session_scope(read_only=True) as db:
+        result = query(db)
+        if result is not None or db.get_bind() is engine:
+            return result
+    with session_scope() as db:
+        return query(db)
+
+
+def get_db():
+    with session_scope() as db:
+        yield db
+
+
+def get_read_db():
+    """Dependency for routes that only read: a replica session, or the primary when none keeps up."""
+    with session_scope(read_only=True) as db:
+        yield db
 
 
+def read_db(max_lag: float):
+    """get_read_db with its own lag tolerance, e.g. Depends(read_db(300)) for data refreshed every few minutes."""
+    def get_read_db_within():
+        with session_scope(read_only=True, max_lag=max_lag) as db:
+            yield db
+    return get_read_db_within
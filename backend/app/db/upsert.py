@@ -0,0 +1,10 @@
+from sqlalchemy.orm import Session
+
+
+def dialect_insert(db: Session, model):
+    """INSERT construct with on_conflict_* support for the session's backend (Postgres or SQLite)."""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model)
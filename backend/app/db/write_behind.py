@@ -0,0 +1,238 @@
+import queue
+import socket
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+from redis.exceptions import RedisError
+from sqlalchemy import insert
+from sqlalchemy.exc import DisconnectionError, InterfaceError, OperationalError, SQLAlchemyError, TimeoutError
+from app.core.redis import get_redis
+from app.db.database import SessionLocal
+import os
+
+load_dotenv()
+
+# Rows a queue holds at most (new ones and those waiting for the database to come back)
+WRITE_BEHIND_MAX_PENDING = int(os.getenv("WRITE_BEHIND_MAX_PENDING", 100_000))
+RETRY_BACKOFF = 0.5
+RETRY_BACKOFF_MAX = 30.0
+# The database is unreachable, locked or out of connections: nothing wrong with the rows
+UNAVAILABLE = (OperationalError, InterfaceError, DisconnectionError, TimeoutError)
+# write_behind:held:<table>:<process> -> stamp of the oldest row waiting for the database to come back
+HELD_KEY = "write_behind:held"
+# Refreshed on every retry; outlives a process that died holding rows (they are gone with it) only briefly
+HELD_TTL = int(RETRY_BACKOFF_MAX * 4)
+
+
+class WriteBehindQueue:
+    """Buffers rows for a single model and bulk-inserts them from a background thread.
+
+    When the database is unavailable (connection lost, locked, pool exhausted) the batch goes back
+    to the head of the queue and is retried with exponential backoff; while it stays away, rows
+    past max_pending are dropped. A batch refused for its data (IntegrityError, DataError, a value
+    that doesn't bind) is retried row by row and only the offending rows are dropped.
+
+    With a stamp column, the stamp of the oldest row held back meanwhile is kept in Redis
+    (held_since), so readers that scan by that column (the analytics rollups) wait for it.
+    """
+
+    def __init__(self, model, batch_size: int = 100, flush_interval: float = 0.5, session_factory=None, prepare=None,
+                 max_pending: int = WRITE_BEHIND_MAX_PENDING, stamp: str | None = None):
+        self.model = model
+        # prepare(db, rows) -> (insert statement, rows), for inserts that compute columns in SQL
+        self.prepare = prepare
+        # Row key holding when the row was made (a timezone-aware datetime)
+        self.stamp = stamp
+        self._held_key = f"{HELD_KEY}:{model.__tablename__}:{socket.gethostname()}:{os.getpid()}"
+        self._held = False
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.session_factory = session_factory or SessionLocal
+        self.max_pending = max_pending
+        self.written = 0
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue()
+        # Rows of failed batches, written before anything newer
+        self._retry: deque[dict] = deque()
+        self._failures = 0
+        self._retry_at = 0.0
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def put(self, row: dict):
+        self._ensure_started()
+        if self.pending() >= self.max_pending:
+            self.dropped += 1
+            return
+        self._queue.put(row)
+
+    def pending(self) -> int:
+        return self._queue.qsize() + len(self._retry)
+
+    @staticmethod
+    def held_since() -> datetime | None:
+        """Stamp of the oldest row any process is holding back for the database, or None."""
+        client = get_redis()
+        keys = list(client.scan_iter(match=f"{HELD_KEY}:*", count=1000))
+        stamps = [float(stamp) for stamp in client.mget(keys) if stamp is not None] if keys else []
+        return datetime.fromtimestamp(min(stamps), timezone.utc) if stamps else None
+
+    def flush(self) -> int:
+        """Write everything queued so far from the calling thread; stops early if the database is unavailable."""
+        written = 0
+        while True:
+            rows = self._take(self.batch_size)
+            if not rows:
+                return written
+            written += self._write(rows)
+            if self._failures:
+                print(f"[WRITE-BEHIND ERROR] {self.model.__tablename__}: flush stopped, {self.pending()} rows not written")
+                return written
+
+    def stop(self, timeout: float = 5.0) -> int:
+        self._stopped.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        return self.flush()
+
+    def _ensure_started(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(
+                target=self._run,
+                name=f"write-behind-{self.model.__tablename__}",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def _take(self, max_items: int) -> list[dict]:
+        rows = []
+        while len(rows) < max_items:
+            try:
+                rows.append(self._retry.popleft())
+            except IndexError:
+                break
+        while len(rows) < max_items:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return rows
+
+    def _run(self):
+        while not self._stopped.is_set():
+            if self._retry:
+                wait = self._retry_at - time.monotonic()
+                if wait > 0:
+                    self._stopped.wait(wait)
+                else:
+                    rows = self._take(self.batch_size)
+                    if rows:
+                        self._write(rows)
+                continue
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._write(batch)
+
+    def _insert(self, db, rows: list[dict]):
+        if self.prepare:
+            statement, rows = self.prepare(db, rows)
+        else:
+            statement = insert(self.model)
+        db.execute(statement, rows)
+
+    def _commit(self, rows: list[dict]):
+        db = self.session_factory()
+        try:
+            self._insert(db, rows)
+            db.commit()
+        except SQLAlchemyError:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _requeue(self, rows: list[dict], error: Exception):
+        """Put rows back at the head of the queue, to be retried after a growing delay."""
+        room = max(0, self.max_pending - self.pending())
+        if len(rows) > room:
+            self.dropped += len(rows) - room
+            rows = rows[:room]
+        self._retry.extendleft(reversed(rows))
+        self._failures += 1
+        delay = min(RETRY_BACKOFF_MAX, RETRY_BACKOFF * 2 ** (self._failures - 1))
+        self._retry_at = time.monotonic() + delay
+        print(f"[WRITE-BEHIND ERROR] {self.model.__tablename__}: {len(rows)} rows requeued, retry in {delay:.1f}s: {error}")
+        self._publish_held()
+
+    def _publish_held(self):
+        """Keep the oldest held-back stamp in Redis while rows wait for a retry; a no-op otherwise."""
+        if not self.stamp or not (self._retry or self._held):
+            return
+        try:
+            if self._retry:
+                # A row missing its stamp is refused once written; hold from now until then
+                stamp = self._retry[0].get(self.stamp)
+                stamp = stamp.timestamp() if isinstance(stamp, datetime) else time.time()
+                get_redis().set(self._held_key, stamp, ex=HELD_TTL)
+                self._held = True
+            else:
+                get_redis().delete(self._held_key)
+                self._held = False
+        except RedisError as e:
+            print(f"[WRITE-BEHIND ERROR] {self.model.__tablename__}: held rows not published: {e}")
+
+    def _write(self, rows: list[dict]) -> int:
+        with self._write_lock:
+            try:
+                self._commit(rows)
+                self._failures = 0
+                self.written += len(rows)
+                self._publish_held()
+                return len(rows)
+            except UNAVAILABLE as e:
+                self._requeue(rows, e)
+                return 0
+            except SQLAlchemyError as e:
+                print(f"[WRITE-BEHIND ERROR] {self.model.__tablename__}: batch of {len(rows)} failed: {e}")
+
+            # Retry row by row so a single bad row does not sink the whole batch
+            written = 0
+            for index, row in enumerate(rows):
+                try:
+                    self._commit([row])
+                    written += 1
+                except UNAVAILABLE as e:
+                    self._requeue(rows[index:], e)
+                    break
+                except SQLAlchemyError:
+                    self.dropped += 1
+            else:
+                self._failures = 0
+                self._publish_held()
+
+            self.written += written
+            return written
@@ -2,6 +2,7 @@ from app.models.base import Base
 from app.models.user import User
 from app.models.conversations import Conversation, Message
 from app.models.rooms import Room, RoomMember, RoomMessage
+from app.models.analytics import AggregationWatermark, ChatActivityHourly, RoomActivityHourly
 
 
 __all__ = ["Base, User, Conversation, Message,Room, RoomMember, RoomMessage"]
\ No newline at end of file
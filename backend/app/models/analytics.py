@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String
+from .base import Base, UTCDateTime
+
+
+class RoomActivityHourly(Base):
+    """Room traffic rolled up per hour and room language by tasks.aggregate_usage."""
+    __tablename__ = "room_activity_hourly"
+
+    hour = Column(UTCDateTime, primary_key=True)
+    language = Column(String, primary_key=True)
+    rooms_created = Column(Integer, nullable=False, default=0)
+    joins = Column(Integer, nullable=False, default=0)
+    messages = Column(Integer, nullable=False, default=0)
+
+
+class ChatActivityHourly(Base):
+    """Chatbot traffic rolled up per hour and agent profile by tasks.aggregate_usage."""
+    __tablename__ = "chat_activity_hourly"
+
+    hour = Column(UTCDateTime, primary_key=True)
+    profile = Column(String, primary_key=True)
+    conversations_started = Column(Integer, nullable=False, default=0)
+    user_messages = Column(Integer, nullable=False, default=0)
+    agent_messages = Column(Integer, nullable=False, default=0)
+
+
+class AggregationWatermark(Base):
+    """Upper bound (exclusive) of the source timestamps already folded into a rollup."""
+    __tablename__ = "aggregation_watermarks"
+
+    name = Column(String, primary_key=True)
+    processed_until = Column(UTCDateTime, nullable=False)
@@ -1,3 +1,32 @@
+from datetime import timezone
+from sqlalchemy import DateTime
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.types import TypeDecorator
 
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
+
+
+@compiles(UUID, "sqlite")
+def _uuid_on_sqlite(type_, compiler, **kw):
+    # A column declared "UUID" gets NUMERIC affinity in SQLite, which turns hex ids such as
+    # "1386...e31..." into REAL (or inf) and makes them collide; CHAR keeps them as text
+    return "CHAR(32)"
+
+
+class UTCDateTime(TypeDecorator):
+    """DateTime(timezone=True) that also comes back aware from SQLite, which drops the offset."""
+
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is not None and value.tzinfo is not None:
+            return value.astimezone(timezone.utc)
+        return value
+
+    def process_result_value(self, value, dialect):
+        if value is not None and value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value
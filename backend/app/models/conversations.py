@@ -1,6 +1,6 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, String, ForeignKey, Text, Boolean, Index, Integer
 from sqlalchemy.dialects.postgresql import UUID
-from .base import Base
+from .base import Base, UTCDateTime
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
@@ -11,12 +11,17 @@ class Conversation(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     agent_name = Column(String, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(UTCDateTime, server_default=func.now(), index=True)
 
     messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan")
     user = relationship("User", back_populates="conversations")
     summaries = relationship("AgentMemorySummary", back_populates="conversation", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # One conversation per user and agent; also the lookup index for get-or-create
+        Index("uq_conversations_user_agent", "user_id", "agent_name", unique=True),
+    )
+
 
 class Message(Base):
     __tablename__ = "messages"
@@ -25,10 +30,14 @@ class Message(Base):
     conversation_id = Column(UUID(as_uuid=True), ForeignKey("conversations.id", ondelete="CASCADE"))
     sender = Column(String, nullable=False)
     content = Column(Text, nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(UTCDateTime, server_default=func.now(), index=True)
 
     conversation = relationship("Conversation", back_populates="messages")
 
+    __table_args__ = (
+        Index("ix_messages_conversation_created", "conversation_id", "created_at", "id"),
+    )
+
 
 
 class AgentMemorySummary(Base):
@@ -37,8 +46,15 @@ class AgentMemorySummary(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     conversation_id = Column(UUID(as_uuid=True), ForeignKey("conversations.id", ondelete="CASCADE"))
     summary = Column(Text, nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # 0: one chat window; n > 0: a rollup of level n-1 summaries (app.agents.compaction)
+    level = Column(Integer, nullable=False, default=0, server_default="0")
+    created_at = Column(UTCDateTime, server_default=func.now())
+    updated_at = Column(UTCDateTime, onupdate=func.now())
 
     conversation = relationship("Conversation", back_populates="summaries")
 
+    __table_args__ = (
+        # Memory retrieval and compaction read a conversation's summaries
+        Index("ix_agent_memory_summaries_conversation_created", "conversation_id", "created_at"),
+    )
+
@@ -1,7 +1,7 @@
-from sqlalchemy import Column, String, Boolean, Integer, DateTime, ForeignKey, func
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
-from .base import Base
+from sqlalchemy import DDL, Column, String, Boolean, Integer, ForeignKey, Index, Text, event, func
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID
+from sqlalchemy.orm import deferred, relationship
+from .base import Base, UTCDateTime
 import uuid
 
 class Room(Base):
@@ -13,12 +13,20 @@ class Room(Base):
     is_public = Column(Boolean, default=True)
     max_users = Column(Integer, default=2)
     language = Column(String, default="en")
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    expires_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(UTCDateTime, server_default=func.now(), index=True)
+    expires_at = Column(UTCDateTime, nullable=True, index=True)
     is_active = Column(Boolean, default=True)
+    # Users with an active membership, kept with every join and leave (app.services.rooms)
+    seats_taken = Column(Integer, nullable=False, default=0, server_default="0")
 
     members = relationship("RoomMember", back_populates="room", cascade="all, delete-orphan")
-    messages = relationship("RoomMessage", back_populates="room", cascade="all, delete-orphan")
+    # Read-only: messages are not deleted with their room but expire by time (app.services.message_archive)
+    messages = relationship("RoomMessage", primaryjoin="Room.id == foreign(RoomMessage.room_id)", viewonly=True)
+
+    __table_args__ = (
+        # /room/search/: language + is_public + is_active equality, then expires_at range
+        Index("ix_rooms_search", "language", "is_public", "is_active", "expires_at"),
+    )
 
 
 class RoomMember(Base):
@@ -29,18 +37,55 @@ class RoomMember(Base):
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True) #Registered user id
     is_host = Column(Boolean, default=False)
     is_active = Column(Boolean, default=True)
+    joined_at = Column(UTCDateTime, server_default=func.now(), index=True)
 
     room = relationship("Room", back_populates="members")
     user = relationship("User", back_populates="room_members")
 
+    __table_args__ = (
+        Index("ix_room_members_user_active", "user_id", "is_active"),  # "already in another room"
+        Index("ix_room_members_room_active", "room_id", "is_active"),  # members of a room
+    )
+
 
 class RoomMessage(Base):
     __tablename__ = "room_messages"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    room_id = Column(UUID(as_uuid=True), ForeignKey("rooms.id", ondelete="CASCADE"))
+    # No foreign key: messages outlive their room until their time partition expires, and an
+    # archive can be restored after the room is gone
+    room_id = Column(UUID(as_uuid=True))
     sender_name = Column(UUID(as_uuid=True), nullable=False) #Anon user id or registered user id
     content = Column(String, nullable=False)
-    timestamp = Column(DateTime(timezone=True), server_default=func.now())
+    # Part of the key because Postgres partitions room_messages by it (migration 0006)
+    timestamp = Column(UTCDateTime, server_default=func.now(), primary_key=True, index=True)
+    # Postgres: to_tsvector(<room language config>, content), computed by the insert (app.services.message_search).
+    # SQLite keeps it NULL and indexes content in the room_messages_fts FTS5 table instead
+    search_vector = deferred(Column(TSVECTOR().with_variant(Text(), "sqlite"), nullable=True))
+
+    room = relationship("Room", primaryjoin="foreign(RoomMessage.room_id) == Room.id", viewonly=True)
+
+    __table_args__ = (
+        Index("ix_room_messages_room_timestamp", "room_id", "timestamp"),
+        # btree_gin: room equality and the text match from one index
+        Index("ix_room_messages_search", "room_id", "search_vector", postgresql_using="gin",
+              info={"dialect": "postgresql"}).ddl_if(dialect="postgresql"),
+    )
+
 
-    room = relationship("Room", back_populates="messages")
+# Local SQLite runs: external-content FTS5 index over room_messages, kept in sync by triggers
+# (same DDL as migration 0005, for databases made with create_all). room_id is indexed as a
+# term so a room filter is intersected inside FTS instead of after it
+ROOM_MESSAGES_FTS = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS room_messages_fts USING fts5("
+    "content, room_id, content='room_messages', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS room_messages_fts_insert AFTER INSERT ON room_messages BEGIN "
+    "INSERT INTO room_messages_fts(rowid, content, room_id) VALUES (new.rowid, new.content, new.room_id); END",
+    "CREATE TRIGGER IF NOT EXISTS room_messages_fts_delete AFTER DELETE ON room_messages BEGIN "
+    "INSERT INTO room_messages_fts(room_messages_fts, rowid, content, room_id) VALUES ('delete', old.rowid, old.content, old.room_id); END",
+    "CREATE TRIGGER IF NOT EXISTS room_messages_fts_update AFTER UPDATE OF content ON room_messages BEGIN "
+    "INSERT INTO room_messages_fts(room_messages_fts, rowid, content, room_id) VALUES ('delete', old.rowid, old.content, old.room_id); "
+    "INSERT INTO room_messages_fts(rowid, content, room_id) VALUES (new.rowid, new.content, new.room_id); END",
+)
+for _statement in ROOM_MESSAGES_FTS:
+    event.listen(RoomMessage.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
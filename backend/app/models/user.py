@@ -1,9 +1,9 @@
 ##
-from sqlalchemy import Column, Integer, String, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, Boolean
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from uuid import uuid4
-from app.models.base import Base
+from app.models.base import Base, UTCDateTime
 from sqlalchemy.dialects.postgresql import UUID
 from app.models.conversations import Conversation
 
@@ -14,9 +14,9 @@ class User(Base):
     username = Column(String, index=True, nullable=True)
     hashed_password = Column(String, nullable=True)
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(UTCDateTime, server_default=func.now())
     type_user = Column(String, default="temporary")
-    temp_expiration_date = Column(DateTime(timezone=True), nullable=True)
+    temp_expiration_date = Column(UTCDateTime, nullable=True, index=True)
 
     conversations = relationship("Conversation", back_populates="user", cascade="all, delete-orphan")
     room_members = relationship("RoomMember", back_populates="user", cascade="all, delete-orphan")
\ No newline at end of file
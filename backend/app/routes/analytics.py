@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from app.db.database import read_db
+from app.services.analytics import AnalyticsService
+from app.services.auth import AuthService
+from app.schemas.analytics import ChatActivitySeries, RoomActivitySeries
+
+analytics = APIRouter()
+
+# The rollups only move every ANALYTICS_INTERVAL, so a replica minutes behind serves them just as well
+get_stats_db = read_db(max_lag=300)
+
+
+def _since(hours: int) -> datetime:
+    return (datetime.now(timezone.utc) - timedelta(hours=hours)).replace(minute=0, second=0, microsecond=0)
+
+
+# Served from the hourly rollups only; the chat tables are never scanned here
+@analytics.get("/stats/rooms", response_model=RoomActivitySeries)
+def room_stats(
+    hours: int = Query(24, ge=1, le=24 * 90),
+    language: str | None = None,
+    user = Depends(AuthService.get_current_user),
+    db: Session = Depends(get_stats_db),
+):
+    since = _since(hours)
+    return RoomActivitySeries(since=since, points=AnalyticsService.room_series(db, since, language))
+
+
+@analytics.get("/stats/chat", response_model=ChatActivitySeries)
+def chat_stats(
+    hours: int = Query(24, ge=1, le=24 * 90),
+    profile: str | None = None,
+    user = Depends(AuthService.get_current_user),
+    db: Session = Depends(get_stats_db),
+):
+    since = _since(hours)
+    return ChatActivitySeries(since=since, points=AnalyticsService.chat_series(db, since, profile))
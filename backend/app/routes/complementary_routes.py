@@ -1,8 +1,12 @@
-from fastapi import APIRouter, Depends
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from app.services.auth import AuthService
-from app.db.database import get_db
+from app.services.conversations import ConversationService
+from app.services.transcripts import TranscriptService
+from app.db.database import get_db, get_read_db
 from app.models.conversations import Conversation
+from app.schemas.conversations import MessagePage
 
 services = APIRouter()
 
@@ -13,14 +17,24 @@ def create_conversation(
     user = Depends(AuthService.get_current_user),
     db: Session = Depends(get_db)
 ):
-    
-    existing_conversation = db.query(Conversation).filter(Conversation.user_id == user.id, Conversation.agent_name == agent_name).first()
-    if existing_conversation:
-        return {"conversation_id": str(existing_conversation.id)}
-    
-    else:
-        conversation = Conversation(user_id=user.id, agent_name=agent_name)
-        db.add(conversation)
-        db.commit()
-        db.refresh(conversation)
-        return {"conversation_id": str(conversation.id)}
+    return {"conversation_id": str(ConversationService.get_or_create(db, user, agent_name))}
+
+
+@services.get("/conversations/{conversation_id}/messages", response_model=MessagePage)
+def list_conversation_messages(
+    conversation_id: UUID,
+    cursor: str | None = None,
+    limit: int = Query(50, ge=1, le=200),
+    user = Depends(AuthService.get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    conversation = db.query(Conversation).filter(Conversation.id == conversation_id, Conversation.user_id == user.id).first()
+    if not conversation:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+
+    try:
+        items, next_cursor = TranscriptService.get_page(db, conversation.id, cursor, limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return MessagePage(items=items, next_cursor=next_cursor)
@@ -1,9 +1,14 @@
 from datetime import datetime, timezone, timedelta
-from fastapi import APIRouter, HTTPException, Depends
-from app.db.database import get_db
-from app.schemas.rooms import RoomCreate, RoomResponse
+from fastapi import APIRouter, HTTPException, Depends, Query
+from app.db.database import get_db, get_read_db
+from app.schemas.rooms import RoomCreate, RoomResponse, RoomPresenceResponse, RoomMessagePage
 from app.services.rooms import RoomService
+from app.services.message_search import MessageSearch
+from app.services.presence import PresenceService
 from app.services.auth import AuthService
+from app.services.guests import GuestService
+from app.services.room_cache import RoomCache
+from app.services.room_expiry import RoomExpiry
 from app.models.rooms import Room
 from app.models.rooms import RoomMember
 
@@ -33,9 +38,12 @@ async def create_rooms(form_data: RoomCreate, db = Depends(get_db,), User = Depe
         is_active=True
     )    
 
+    GuestService.materialize(db, User)
     db.add(new_room)
     db.commit()
     db.refresh(new_room)
+    RoomCache.store(new_room)
+    RoomExpiry.schedule(new_room.code, new_room.expires_at)
 
 
     RoomService.add_member_to_room(db, new_room.id, user_id=User.id, is_host = True)
@@ -47,20 +55,20 @@ async def create_rooms(form_data: RoomCreate, db = Depends(get_db,), User = Depe
 
 
 @rooms.get("/rooms/join")
-async def join_room(room_code: str, user = Depends(AuthService.get_current_user), db = Depends(get_db)):
+def join_room(room_code: str, user = Depends(AuthService.get_current_user), db = Depends(get_db)):
     
     if not room_code:
         raise HTTPException(status_code=400, detail="Room code is required")
     
-    room = db.query(Room).filter(Room.code == room_code).first()
+    room = RoomCache.get(room_code, db)
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
     
-    if not room.is_active or room.expires_at < datetime.now(timezone.utc):
+    if not RoomCache.is_open(room):
         raise HTTPException(status_code=403, detail="Room is inactive or expired")
     
-    current_users = db.query(RoomMember).filter(RoomMember.room_id == room.id, RoomMember.is_active == True).count()
-    if current_users >= room.max_users:
+    # Capacity counts seats (active memberships), not open sockets: presence is only for display
+    if RoomService.is_room_full(db, room.id, room.max_users):
         raise HTTPException(status_code=403, detail="Room is full")
 
     existing_member = db.query(RoomMember).filter_by(room_id=room.id, user_id=user.id, is_active=True).first()
@@ -71,13 +79,15 @@ async def join_room(room_code: str, user = Depends(AuthService.get_current_user)
     if active_membership:
         raise HTTPException(status_code=400, detail="User already in another room")
 
-    RoomService.add_member_to_room(db, room.id, user.id)
+    GuestService.materialize(db, user)
+    if not RoomService.take_seat(db, room.id, user.id, room.max_users):
+        raise HTTPException(status_code=403, detail="Room is full")
 
     return {"message": f"User {user.username} joined room {room.code}"}
 
 #Ruta para buscar una sala por idioma, capacidad y si está activa para unirse a ella si es pública.
 @rooms.get("/room/search/")
-async def get_room(language: str, db = Depends(get_db), user = Depends(AuthService.get_current_user)):
+def get_room(language: str, db = Depends(get_read_db), user = Depends(AuthService.get_current_user)):
 
     user_active_membership = db.query(RoomMember).filter_by(user_id=user.id, is_active=True).first()
     if user_active_membership:
@@ -90,12 +100,11 @@ async def get_room(language: str, db = Depends(get_db), user = Depends(AuthServi
         Room.expires_at > datetime.now(timezone.utc)
     ).first()
 
-    current_members = db.query(RoomMember).filter(RoomMember.room_id == room.id, RoomMember.is_active == True).count()
-    if current_members >= room.max_users:
-        raise HTTPException(status_code=403, detail="Room is full")
-
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
+
+    if room.seats_taken >= room.max_users:
+        raise HTTPException(status_code=403, detail="Room is full")
     
     if (room.expires_at - datetime.now(timezone.utc)).total_seconds() < 60:
         raise HTTPException(status_code=410, detail="Room about to expire")
@@ -106,36 +115,49 @@ async def get_room(language: str, db = Depends(get_db), user = Depends(AuthServi
     )
     
 
-@rooms.post("/rooms/{room_code}/leave")
-async def leave_room(room_code: str, user = Depends(AuthService.get_current_user), db = Depends(get_db)):
-    room = db.query(Room).filter(Room.code == room_code).first()
+@rooms.get("/rooms/{room_code}/presence", response_model=RoomPresenceResponse)
+def get_room_presence(room_code: str, user = Depends(AuthService.get_current_user)):
+    users = PresenceService.members(room_code)
+    return RoomPresenceResponse(code=room_code, online=len(users), users=users)
+
+
+@rooms.get("/rooms/{room_code}/search", response_model=RoomMessagePage)
+def search_room_messages(
+    room_code: str,
+    q: str = Query(..., min_length=1, max_length=200),
+    cursor: str | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    user = Depends(AuthService.get_current_user),
+    db = Depends(get_read_db),
+):
+    room = RoomCache.get(room_code, db)
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
-    
-    member = db.query(RoomMember).filter_by(room_id=room.id, user_id=user.id).first()
-    if not member:
-        raise HTTPException(status_code=404, detail="User not in the room")
-    
-    member.is_active = False
-    db.commit()
 
-    if member.is_host:
-        new_host = db.query(RoomMember).filter(RoomMember.room_id == room.id).first()
-        if new_host:
-            new_host.is_host = True
-            db.commit()
-        else:
-            room.is_active = False
-            db.commit()
+    # Anyone who has been in the room can search its history
+    if not db.query(RoomMember.id).filter_by(room_id=room.id, user_id=user.id).first():
+        raise HTTPException(status_code=403, detail="User not in the room")
 
-    return {"message": f"User {user.username} left room {room.code}"}
-    
-    
+    try:
+        items, next_cursor = MessageSearch.search(db, room, q, cursor, limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
-    
+    return RoomMessagePage(items=items, next_cursor=next_cursor)
 
-    
 
-    
+@rooms.post("/rooms/{room_code}/leave")
+def leave_room(room_code: str, user = Depends(AuthService.get_current_user), db = Depends(get_db)):
+    room = RoomCache.get(room_code, db)
+    if not room:
+        raise HTTPException(status_code=404, detail="Room not found")
 
+    # One transaction: the member leaves, the host role moves on, an empty room is closed
+    result = RoomService.leave(db, room.id, user.id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="User not in the room")
+    if not result["room_active"]:
+        RoomCache.invalidate(room.code)
 
+    RoomService.publish_event(room.code, RoomService.membership_frame("left", user.id, user.username, result))
+    return {"message": f"User {user.username} left room {room.code}", "host": result["host"], "room_active": result["room_active"]}
@@ -0,0 +1,35 @@
+from pydantic import BaseModel
+from typing import List
+from datetime import datetime
+
+
+class RoomActivityPoint(BaseModel):
+    hour: datetime
+    language: str
+    rooms_created: int
+    joins: int
+    messages: int
+
+    class Config:
+        from_attributes = True
+
+
+class ChatActivityPoint(BaseModel):
+    hour: datetime
+    profile: str
+    conversations_started: int
+    user_messages: int
+    agent_messages: int
+
+    class Config:
+        from_attributes = True
+
+
+class RoomActivitySeries(BaseModel):
+    since: datetime
+    points: List[RoomActivityPoint]
+
+
+class ChatActivitySeries(BaseModel):
+    since: datetime
+    points: List[ChatActivityPoint]
@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from uuid import UUID
+from datetime import datetime
+
+
+class MessageResponse(BaseModel):
+    id: UUID
+    sender: str
+    content: str
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class MessagePage(BaseModel):
+    items: List[MessageResponse]
+    next_cursor: Optional[str] = None
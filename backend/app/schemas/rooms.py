@@ -1,5 +1,7 @@
 from pydantic import BaseModel
 from typing import List, Optional
+from uuid import UUID
+from datetime import datetime
 
 class RoomBase(BaseModel):
     name: str 
@@ -34,3 +36,29 @@ class RoomMemberResponse(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+class PresentUser(BaseModel):
+    user_id: str
+    username: str
+
+
+class RoomPresenceResponse(BaseModel):
+    code: str
+    online: int
+    users: List[PresentUser]
+
+
+class RoomMessageResponse(BaseModel):
+    id: UUID
+    sender_name: UUID
+    content: str
+    timestamp: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class RoomMessagePage(BaseModel):
+    items: List[RoomMessageResponse]
+    next_cursor: Optional[str] = None
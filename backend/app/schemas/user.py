@@ -58,4 +58,5 @@ class TempUserResponse(BaseModel):
 class CurrentUser(BaseModel):
     id: UUID
     username: str
-    type: str
\ No newline at end of file
+    type: str
+    expires_at: Optional[datetime] = None  # guests only, from the token
\ No newline at end of file
@@ -0,0 +1,175 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from app.db.upsert import dialect_insert
+from app.db.write_behind import WriteBehindQueue
+from app.models.analytics import AggregationWatermark, ChatActivityHourly, RoomActivityHourly
+from app.models.conversations import Conversation, Message
+from app.models.rooms import Room, RoomMember, RoomMessage
+import os
+
+load_dotenv()
+
+# Rows younger than this are left for the next run: write-behind queues stamp rows before they land.
+# Rows a queue is holding back for the database to come back keep the window behind them however old they are
+ANALYTICS_LAG_SECONDS = int(os.getenv("ANALYTICS_LAG_SECONDS", 60))
+# First run only looks this far back instead of scanning whole tables
+ANALYTICS_BACKFILL_HOURS = int(os.getenv("ANALYTICS_BACKFILL_HOURS", 24 * 7))
+
+ROOM_KEYS = ("hour", "language")
+CHAT_KEYS = ("hour", "profile")
+
+
+def _hour(db: Session, column):
+    if db.get_bind().dialect.name == "postgresql":
+        return func.date_trunc("hour", column)
+    return func.strftime("%Y-%m-%d %H:00:00", column)
+
+
+def _as_hour(value) -> datetime:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.replace(minute=0, second=0, microsecond=0, tzinfo=value.tzinfo or timezone.utc).astimezone(timezone.utc)
+
+
+def _profile(column):
+    # Same mapping as DependencyResolver._profile_id_for
+    return func.lower(func.coalesce(column, "default"))
+
+
+class AnalyticsService:
+    """Incremental hourly rollups; each run folds in [watermark, now - lag) and moves the watermark.
+
+    The window stops at the oldest row a write-behind queue still holds (WriteBehindQueue.held_since),
+    so messages written late after a database outage are counted by a later run instead of skipped."""
+
+    @staticmethod
+    def _window(db: Session, name: str, until: datetime) -> tuple[datetime, datetime] | None:
+        mark = db.query(AggregationWatermark).filter_by(name=name).with_for_update().first()
+        if mark is None:
+            mark = AggregationWatermark(name=name, processed_until=until - timedelta(hours=ANALYTICS_BACKFILL_HOURS))
+            db.add(mark)
+        start = mark.processed_until
+        if start >= until:
+            return None
+        mark.processed_until = until
+        return start, until
+
+    @staticmethod
+    def _merge(db: Session, model, keys: tuple, rows: list[dict]):
+        """Add counts into existing rollup rows (INSERT .. ON CONFLICT DO UPDATE SET x = x + excluded.x)."""
+        if not rows:
+            return
+        counters = [column.name for column in model.__table__.columns if column.name not in keys]
+        statement = dialect_insert(db, model)
+        statement = statement.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={name: getattr(model, name) + getattr(statement.excluded, name) for name in counters},
+        )
+        db.execute(statement, rows)
+
+    @staticmethod
+    def _counts(query_rows, keys: tuple, counter: str, into: dict):
+        for hour, key, count in query_rows:
+            hour, key = _as_hour(hour), key or "unknown"
+            row = into.setdefault((hour, key), {keys[0]: hour, keys[1]: key})
+            row[counter] = row.get(counter, 0) + count
+
+    @staticmethod
+    def aggregate_rooms(db: Session, until: datetime) -> int:
+        window = AnalyticsService._window(db, "room_activity", until)
+        if window is None:
+            return 0
+        start, end = window
+        rows: dict = {}
+
+        hour = _hour(db, Room.created_at)
+        AnalyticsService._counts((
+            db.query(hour, Room.language, func.count())
+            .filter(Room.created_at >= start, Room.created_at < end)
+            .group_by(hour, Room.language)
+        ), ROOM_KEYS, "rooms_created", rows)
+
+        hour = _hour(db, RoomMember.joined_at)
+        AnalyticsService._counts((
+            db.query(hour, Room.language, func.count())
+            .join(Room, Room.id == RoomMember.room_id)
+            .filter(RoomMember.joined_at >= start, RoomMember.joined_at < end)
+            .group_by(hour, Room.language)
+        ), ROOM_KEYS, "joins", rows)
+
+        hour = _hour(db, RoomMessage.timestamp)
+        AnalyticsService._counts((
+            db.query(hour, Room.language, func.count())
+            .join(Room, Room.id == RoomMessage.room_id)
+            .filter(RoomMessage.timestamp >= start, RoomMessage.timestamp < end)
+            .group_by(hour, Room.language)
+        ), ROOM_KEYS, "messages", rows)
+
+        merged = [
+            {"rooms_created": 0, "joins": 0, "messages": 0, **row}
+            for row in rows.values()
+        ]
+        AnalyticsService._merge(db, RoomActivityHourly, ROOM_KEYS, merged)
+        return len(merged)
+
+    @staticmethod
+    def aggregate_chat(db: Session, until: datetime) -> int:
+        window = AnalyticsService._window(db, "chat_activity", until)
+        if window is None:
+            return 0
+        start, end = window
+        rows: dict = {}
+        profile = _profile(Conversation.agent_name)
+
+        hour = _hour(db, Conversation.created_at)
+        AnalyticsService._counts((
+            db.query(hour, profile, func.count())
+            .filter(Conversation.created_at >= start, Conversation.created_at < end)
+            .group_by(hour, profile)
+        ), CHAT_KEYS, "conversations_started", rows)
+
+        hour = _hour(db, Message.created_at)
+        for sender, counter in (("human", "user_messages"), ("ai", "agent_messages")):
+            AnalyticsService._counts((
+                db.query(hour, profile, func.count())
+                .join(Conversation, Conversation.id == Message.conversation_id)
+                .filter(Message.created_at >= start, Message.created_at < end, Message.sender == sender)
+                .group_by(hour, profile)
+            ), CHAT_KEYS, counter, rows)
+
+        merged = [
+            {"conversations_started": 0, "user_messages": 0, "agent_messages": 0, **row}
+            for row in rows.values()
+        ]
+        AnalyticsService._merge(db, ChatActivityHourly, CHAT_KEYS, merged)
+        return len(merged)
+
+    @staticmethod
+    def aggregate(db: Session, now: datetime | None = None) -> dict:
+        """One run of both rollups in a single transaction, so counts and watermarks move together."""
+        until = (now or datetime.now(timezone.utc)) - timedelta(seconds=ANALYTICS_LAG_SECONDS)
+        held = WriteBehindQueue.held_since()
+        if held is not None:
+            until = min(until, held)
+        result = {
+            "room_activity": AnalyticsService.aggregate_rooms(db, until),
+            "chat_activity": AnalyticsService.aggregate_chat(db, until),
+        }
+        db.commit()
+        return result
+
+    @staticmethod
+    def room_series(db: Session, since: datetime, language: str | None = None):
+        query = db.query(RoomActivityHourly).filter(RoomActivityHourly.hour >= since)
+        if language:
+            query = query.filter(RoomActivityHourly.language == language)
+        return query.order_by(RoomActivityHourly.hour, RoomActivityHourly.language).all()
+
+    @staticmethod
+    def chat_series(db: Session, since: datetime, profile: str | None = None):
+        query = db.query(ChatActivityHourly).filter(ChatActivityHourly.hour >= since)
+        if profile:
+            query = query.filter(ChatActivityHourly.profile == profile.lower())
+        return query.order_by(ChatActivityHourly.hour, ChatActivityHourly.profile).all()
@@ -1,12 +1,16 @@
 import jwt
+import uuid
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from jose import JWTError
 from app.models.user import User
 from sqlalchemy.orm import Session
 from app.services.Hash import HashService
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.services.jwt import JWTService
+from app.services.guests import GuestService
 from datetime import datetime, timezone
-from app.db.database import get_db
+from app.db.database import get_db, session_scope
 from app.schemas.user import CurrentUser
 from typing import Annotated
 from fastapi import Depends, Query, WebSocketException, status
@@ -33,14 +37,23 @@ class AuthService():
         token = credentials.credentials
         payload = JWTService.decode_token(token)
 
-        user_id = payload.get("id")
         user_type = payload.get("type_user")
+        try:
+            user_id = uuid.UUID(str(payload.get("id")))
+        except ValueError:
+            raise HTTPException(status_code=401, detail="Could not validate credentials")
 
         if user_type == "temporary":
-            temp_user = db.query(User).filter(User.id == user_id).first()
-            if not temp_user or temp_user.temp_expiration_date < datetime.now(timezone.utc):
-                raise HTTPException(status_code=401, detail="Temporary user expired")
-            return CurrentUser(id=str(temp_user.id), username=temp_user.username, type="temporary")
+            # Guests are trusted from the signed token alone (its exp is the guest expiry), no DB hit
+            guest = GuestService.from_payload(payload)
+            if not guest.username:
+                raise HTTPException(status_code=401, detail="Could not validate credentials")
+            return CurrentUser(
+                id=guest.id,
+                username=guest.username,
+                type="temporary",
+                expires_at=guest.temp_expiration_date,
+            )
         
         if user_type == "register":
             user = db.query(User).filter(User.id == user_id).first()
@@ -58,7 +71,12 @@ class AuthService():
         if not user_id or not user_type:
             raise AuthService.InvalidTokenError("Invalid token payload")
 
-        user = db.query(User).filter(User.id == user_id).first()
+        try:
+            user_uuid = uuid.UUID(str(user_id))
+        except ValueError:
+            raise AuthService.InvalidTokenError("Invalid token payload")
+
+        user = db.query(User).filter(User.id == user_uuid).first()
         if not user:
             raise AuthService.InvalidTokenError("User not found")
 
@@ -72,17 +90,28 @@ class AuthService():
         return user
     
     
+    @staticmethod
+    def _resolve_ws_user(token: str) -> User:
+        payload = JWTService.decode_token_ws(token)
+        if payload.get("type_user") == "temporary":
+            try:
+                return GuestService.from_payload(payload)
+            except ValueError:
+                raise AuthService.InvalidTokenError("Invalid token payload")
+        with session_scope() as db:
+            return AuthService.resolve_user(payload, db)
+
+
     @staticmethod
     async def get_ws_current_user(
         websocket: WebSocket,
         token: Annotated[str | None, Query(alias="token")] = None,
-        db: Session = Depends(get_db),
     ) -> User:
+        # The session is released before the socket is accepted, not held for its lifetime
         if not token:
             raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION)
 
         try:
-            payload = JWTService.decode_token_ws(token)
-            return AuthService.resolve_user(payload, db)
-        except AuthService.InvalidTokenError:
+            return await run_in_threadpool(AuthService._resolve_ws_user, token)
+        except (AuthService.InvalidTokenError, JWTError):
             raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION)
\ No newline at end of file
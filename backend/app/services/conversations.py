@@ -0,0 +1,76 @@
+import uuid
+from datetime import datetime, timezone
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from app.core.redis import get_redis
+from app.db.database import read_through
+from app.db.upsert import dialect_insert
+from app.models.conversations import Conversation
+from app.services.guests import GuestService
+import os
+
+load_dotenv()
+
+CONVERSATION_CACHE_TTL = int(os.getenv("CONVERSATION_CACHE_TTL", 3600 * 24))
+
+
+class ConversationService:
+
+    @staticmethod
+    def _key(user_id, agent_name: str) -> str:
+        return f"conversation:{user_id}:{agent_name}"
+
+    @staticmethod
+    def get_or_create(db: Session, user, agent_name: str) -> uuid.UUID:
+        """Race-free get-or-create on (user_id, agent_name), fronted by a Redis mapping."""
+        key = ConversationService._key(user.id, agent_name)
+        cached = get_redis().get(key)
+        if cached:
+            return uuid.UUID(cached)
+
+        GuestService.materialize(db, user)
+        statement = (
+            dialect_insert(db, Conversation)
+            .values(
+                id=uuid.uuid4(),
+                user_id=user.id,
+                agent_name=agent_name,
+                created_at=datetime.now(timezone.utc),
+            )
+            .on_conflict_do_nothing(index_elements=["user_id", "agent_name"])
+            .returning(Conversation.id)
+        )
+        conversation_id = db.execute(statement).scalar()
+        if conversation_id is None:
+            # Lost the race (or it already existed): the row is there now
+            conversation_id = (
+                db.query(Conversation.id)
+                .filter(Conversation.user_id == user.id, Conversation.agent_name == agent_name)
+                .scalar()
+            )
+        db.commit()
+
+        get_redis().set(key, str(conversation_id), ex=CONVERSATION_CACHE_TTL)
+        return conversation_id
+
+
+    @staticmethod
+    def owner(conversation_id: str) -> str | None:
+        """User id owning the conversation, None if there is no such conversation. A conversation
+        never changes hands, so the answer is cached like the get-or-create mapping."""
+        try:
+            conversation_uuid = uuid.UUID(conversation_id)
+        except ValueError:
+            return None
+        key = f"conversation:owner:{conversation_uuid}"
+        cached = get_redis().get(key)
+        if cached:
+            return cached
+
+        user_id = read_through(
+            lambda db: db.query(Conversation.user_id).filter(Conversation.id == conversation_uuid).scalar()
+        )
+        if user_id is None:
+            return None
+        get_redis().set(key, str(user_id), ex=CONVERSATION_CACHE_TTL)
+        return str(user_id)
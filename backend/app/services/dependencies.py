@@ -3,20 +3,28 @@ from sqlalchemy.orm import Session
 from app.models.conversations import Conversation
 
 class DependencyResolver:
-    
+
     @staticmethod
-    def _resolve_profile_id(db: Session, session_id: str) -> str:
+    def _resolve_conversation(db: Session, session_id: str) -> Conversation | None:
         try:
             conversation_uuid = uuid.UUID(session_id)
         except (ValueError, TypeError):
-            return "default"
+            return None
 
-        conversation = (
+        return (
             db.query(Conversation)
             .filter(Conversation.id == conversation_uuid)
             .first()
         )
+
+    @staticmethod
+    def _profile_id_for(conversation: Conversation | None) -> str:
         if conversation and conversation.agent_name:
             return conversation.agent_name.lower()
 
         return "default"
+
+    @staticmethod
+    def _resolve_profile_id(db: Session, session_id: str) -> str:
+        conversation = DependencyResolver._resolve_conversation(db, session_id)
+        return DependencyResolver._profile_id_for(conversation)
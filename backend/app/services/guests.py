@@ -0,0 +1,66 @@
+import uuid
+from datetime import datetime, timezone, timedelta
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from app.models.user import User
+from app.services.jwt import JWTService
+import os
+
+load_dotenv()
+
+GUEST_EXPIRATION_HOURS = int(os.getenv("TEMP_USER_EXPIRATION_HOURS", 6))
+
+
+class GuestService:
+    """Guests live in their JWT; a users row is only written once they need one (FK targets)."""
+
+    @staticmethod
+    def issue(username: str) -> tuple[str, datetime]:
+        expires_at = datetime.now(timezone.utc) + timedelta(hours=GUEST_EXPIRATION_HOURS)
+        token = JWTService.create_access_token(
+            {
+                "id": str(uuid.uuid4()),
+                "temp_username": username,
+                "type_user": "temporary",
+            },
+            expires_in=GUEST_EXPIRATION_HOURS,
+        )
+        return token, expires_at
+
+    @staticmethod
+    def from_payload(payload: dict) -> User:
+        """Transient (never added to a session) User built from a guest token."""
+        try:
+            user_id = uuid.UUID(str(payload.get("id")))
+        except ValueError:
+            raise ValueError("Invalid guest id")
+
+        exp = payload.get("exp")
+        return User(
+            id=user_id,
+            username=payload.get("temp_username") or payload.get("username"),
+            type_user="temporary",
+            temp_expiration_date=datetime.fromtimestamp(exp, timezone.utc) if exp else None,
+        )
+
+    @staticmethod
+    def materialize(db: Session, user) -> None:
+        """Make sure a guest has a users row before something references it. Idempotent."""
+        if getattr(user, "type", "temporary") != "temporary":
+            return
+        if db.get(User, user.id) is not None:
+            return
+
+        try:
+            # Savepoint: a concurrent request creating the same guest must not roll back the caller
+            with db.begin_nested():
+                db.add(User(
+                    id=user.id,
+                    username=user.username,
+                    type_user="temporary",
+                    created_at=datetime.now(timezone.utc),
+                    temp_expiration_date=getattr(user, "expires_at", None),
+                ))
+        except IntegrityError:
+            pass
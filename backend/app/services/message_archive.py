@@ -0,0 +1,314 @@
+"""Time-partitioned room_messages: partition upkeep, cold archival and restore.
+
+    cd backend && python -m app.services.message_archive expire
+    cd backend && python -m app.services.message_archive restore archive/room_messages_20261001T0000Z_20261002T0000Z.ndjson.gz
+
+Postgres (migration 0006) partitions room_messages by RANGE (timestamp), one partition per
+ROOM_MESSAGE_PARTITION period. Once a period is older than ROOM_MESSAGE_RETENTION_DAYS its
+rows are streamed to a gzipped NDJSON file under ROOM_MESSAGE_ARCHIVE_DIR and the partition
+is dropped. Unpartitioned databases (local SQLite) get the same files, then a range DELETE.
+"""
+import argparse
+import gzip
+import json
+import os
+import re
+import uuid
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from sqlalchemy import Text, bindparam, cast, delete, func, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from app.models.rooms import RoomMessage
+
+load_dotenv()
+
+ROOM_MESSAGE_PARTITION = os.getenv("ROOM_MESSAGE_PARTITION", "day")  # "day" or "week"
+ROOM_MESSAGE_RETENTION_DAYS = int(os.getenv("ROOM_MESSAGE_RETENTION_DAYS", 7))
+ROOM_MESSAGE_PARTITIONS_AHEAD = int(os.getenv("ROOM_MESSAGE_PARTITIONS_AHEAD", 3))
+ROOM_MESSAGE_ARCHIVE_DIR = os.getenv("ROOM_MESSAGE_ARCHIVE_DIR", "archive")
+ROOM_MESSAGE_ARCHIVE_BATCH = int(os.getenv("ROOM_MESSAGE_ARCHIVE_BATCH", 5000))  # rows per fetch and per insert
+
+PERIODS = {"day": timedelta(days=1), "week": timedelta(days=7)}
+DEFAULT_PARTITION = "room_messages_default"
+
+# pg_get_expr(relpartbound): FOR VALUES FROM ('2026-10-19 00:00:00+00') TO ('2026-10-20 00:00:00+00')
+_BOUNDS = re.compile(r"FROM \((.+?)\) TO \((.+?)\)")
+_EPOCH = datetime.min.replace(tzinfo=timezone.utc)
+
+
+def _bound(value: str) -> datetime | None:
+    if value in ("MINVALUE", "MAXVALUE"):
+        return None
+    return datetime.fromisoformat(value.strip("'")).astimezone(timezone.utc)
+
+
+def _stamp(moment: datetime | None) -> str:
+    return moment.strftime("%Y%m%dT%H%MZ") if moment else "min"
+
+
+class MessagePartitions:
+    """Range partitions of room_messages on Postgres, one per ROOM_MESSAGE_PARTITION period.
+
+    Rows no partition covers land in the DEFAULT partition; the partition later created for
+    their period takes them over."""
+
+    @staticmethod
+    def length() -> timedelta:
+        return PERIODS[ROOM_MESSAGE_PARTITION]
+
+    @staticmethod
+    def period(moment: datetime) -> tuple[datetime, datetime]:
+        """[start, end) of the period holding moment: UTC days, or weeks starting on Monday."""
+        start = moment.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        if ROOM_MESSAGE_PARTITION == "week":
+            start -= timedelta(days=start.weekday())
+        return start, start + MessagePartitions.length()
+
+    @staticmethod
+    def cutoff(now: datetime) -> datetime:
+        """Messages before this are past retention: the start of the oldest period kept."""
+        return MessagePartitions.period(now - timedelta(days=ROOM_MESSAGE_RETENTION_DAYS))[0]
+
+    @staticmethod
+    def name(start: datetime) -> str:
+        return f"room_messages_p{start:%Y%m%d}"
+
+    @staticmethod
+    def enabled(db: Session) -> bool:
+        if db.get_bind().dialect.name != "postgresql":
+            return False
+        return bool(db.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('room_messages'))"
+        )).scalar())
+
+    @staticmethod
+    def partitions(db: Session) -> list[tuple[str, datetime | None, datetime | None]]:
+        """(name, start, end) of the range partitions, oldest first; None stands for MINVALUE/MAXVALUE."""
+        rows = db.execute(text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits AS i "
+            "JOIN pg_class AS c ON c.oid = i.inhrelid WHERE i.inhparent = 'room_messages'::regclass"
+        )).all()
+        partitions = []
+        for name, bound in rows:
+            match = _BOUNDS.search(bound)
+            if match:  # DEFAULT has no bounds
+                partitions.append((name, _bound(match.group(1)), _bound(match.group(2))))
+        return sorted(partitions, key=lambda partition: partition[1] or _EPOCH)
+
+    @staticmethod
+    def create(db: Session, start: datetime, end: datetime) -> str:
+        """Partition for [start, end), taking over any rows the DEFAULT partition holds for it."""
+        name = MessagePartitions.name(start)
+        bounds = f"FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        params = {"start": start, "end": end}
+        in_range = f'FROM {DEFAULT_PARTITION} WHERE "timestamp" >= :start AND "timestamp" < :end'
+        if not db.execute(text(f"SELECT EXISTS (SELECT 1 {in_range})"), params).scalar():
+            db.execute(text(f"CREATE TABLE {name} PARTITION OF room_messages FOR VALUES {bounds}"))
+        else:
+            # A partition can't be created over rows still in DEFAULT: move them into a plain table, then attach it
+            db.execute(text(f"CREATE TABLE {name} (LIKE room_messages INCLUDING DEFAULTS)"))
+            db.execute(text(f"WITH moved AS (DELETE {in_range} RETURNING *) INSERT INTO {name} SELECT * FROM moved"), params)
+            db.execute(text(f"ALTER TABLE room_messages ATTACH PARTITION {name} FOR VALUES {bounds}"))
+        db.commit()
+        print(f"[PARTITIONS] created {name} for {start:%Y-%m-%d} .. {end:%Y-%m-%d}")
+        return name
+
+    @staticmethod
+    def ensure(db: Session, now: datetime | None = None, ahead: int = ROOM_MESSAGE_PARTITIONS_AHEAD) -> list[str]:
+        """Create partitions up to `ahead` periods past the current one, continuing from the newest."""
+        now = now or datetime.now(timezone.utc)
+        ends = [end for _, _, end in MessagePartitions.partitions(db) if end]
+        start = max(ends) if ends else MessagePartitions.period(now)[0]
+        horizon = MessagePartitions.period(now)[1] + MessagePartitions.length() * ahead
+        created = []
+        while start < horizon:
+            # The first one may be short if ROOM_MESSAGE_PARTITION changed: it ends on a period boundary
+            end = MessagePartitions.period(start)[1]
+            created.append(MessagePartitions.create(db, start, end))
+            start = end
+        return created
+
+    @staticmethod
+    def cover(db: Session, start: datetime, end: datetime):
+        """Partitions for the periods in [start, end) that no partition overlaps yet (restoring old rows)."""
+        partitions = MessagePartitions.partitions(db)
+        moment = MessagePartitions.period(start)[0]
+        while moment < end:
+            period_end = MessagePartitions.period(moment)[1]
+            if not any((low is None or low < period_end) and (high is None or moment < high) for _, low, high in partitions):
+                MessagePartitions.create(db, moment, period_end)
+            moment = period_end
+
+    @staticmethod
+    def expired(db: Session, cutoff: datetime) -> list[tuple[str, datetime | None, datetime]]:
+        return [partition for partition in MessagePartitions.partitions(db) if partition[2] and partition[2] <= cutoff]
+
+    @staticmethod
+    def drop(db: Session, name: str):
+        # Metadata only, whatever the partition holds; takes a brief exclusive lock on room_messages
+        db.execute(text(f"DROP TABLE IF EXISTS {name}"))
+        db.commit()
+
+
+class MessageArchive:
+    """Messages past retention as gzipped NDJSON, one file per period.
+
+    Archiving is a generator pipeline (rows from a server-side cursor -> JSON lines -> gzip)
+    that holds one fetch batch at a time, so memory stays flat whatever the partition size.
+    A file is fsynced and renamed into place before its rows are dropped."""
+
+    @staticmethod
+    def path(start: datetime | None, end: datetime) -> str:
+        return os.path.join(ROOM_MESSAGE_ARCHIVE_DIR, f"room_messages_{_stamp(start)}_{_stamp(end)}.ndjson.gz")
+
+    @staticmethod
+    def rows(db: Session, start: datetime | None, end: datetime, batch: int = ROOM_MESSAGE_ARCHIVE_BATCH):
+        """Messages with start <= timestamp < end (no lower bound when start is None); on Postgres
+        the range is one partition, and the tsvector is kept so a restore needn't recompute it."""
+        columns = [RoomMessage.id, RoomMessage.room_id, RoomMessage.sender_name, RoomMessage.content, RoomMessage.timestamp]
+        if db.get_bind().dialect.name == "postgresql":
+            columns.append(cast(RoomMessage.search_vector, Text).label("search_vector"))
+        query = select(*columns).where(RoomMessage.timestamp < end)
+        if start is not None:
+            query = query.where(RoomMessage.timestamp >= start)
+        yield from db.execute(query.execution_options(yield_per=batch))
+
+    @staticmethod
+    def lines(rows):
+        for row in rows:
+            yield json.dumps(dict(row._mapping), default=str, ensure_ascii=False, separators=(",", ":")).encode() + b"\n"
+
+    @staticmethod
+    def write(lines, path: str) -> int:
+        """Gzip lines into path (written aside, fsynced, then renamed); returns the line count.
+        Nothing is left behind when there are no lines."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        lines = iter(lines)
+        count = 0
+        with open(tmp, "wb") as raw:
+            with gzip.GzipFile(filename="", mode="wb", fileobj=raw, compresslevel=6) as out:
+                while chunk := list(islice(lines, 1000)):
+                    out.write(b"".join(chunk))
+                    count += len(chunk)
+            raw.flush()
+            os.fsync(raw.fileno())
+        if not count:
+            os.remove(tmp)
+            return 0
+        os.replace(tmp, path)
+        return count
+
+    @staticmethod
+    def archive(db: Session, start: datetime | None, end: datetime) -> tuple[str | None, int]:
+        path = MessageArchive.path(start, end)
+        count = MessageArchive.write(MessageArchive.lines(MessageArchive.rows(db, start, end)), path)
+        db.rollback()  # ends the read transaction and its cursor
+        return (path if count else None), count
+
+    @staticmethod
+    def delete_range(db: Session, start: datetime | None, end: datetime) -> int:
+        """Unpartitioned fallback for a partition drop."""
+        statement = delete(RoomMessage).where(RoomMessage.timestamp < end)
+        if start is not None:
+            statement = statement.where(RoomMessage.timestamp >= start)
+        deleted = db.execute(statement.execution_options(synchronize_session=False)).rowcount
+        db.commit()
+        return deleted
+
+    @staticmethod
+    def expire(db: Session, now: datetime | None = None) -> list[tuple[str | None, int]]:
+        """Archive and remove every period past retention; returns (archive path, rows) per period.
+        On Postgres this also creates the partitions ahead."""
+        now = now or datetime.now(timezone.utc)
+        cutoff = MessagePartitions.cutoff(now)
+        archived = []
+        if MessagePartitions.enabled(db):
+            MessagePartitions.ensure(db, now)
+            for name, start, end in MessagePartitions.expired(db, cutoff):
+                archived.append(MessageArchive.archive(db, start, end))
+                MessagePartitions.drop(db, name)
+            return archived
+
+        oldest = db.query(func.min(RoomMessage.timestamp)).scalar()
+        if oldest is None:
+            return archived
+        start = MessagePartitions.period(oldest)[0]
+        while start < cutoff:
+            end = MessagePartitions.period(start)[1]
+            path, count = MessageArchive.archive(db, start, end)
+            if count:
+                MessageArchive.delete_range(db, start, end)
+                archived.append((path, count))
+            start = end
+        return archived
+
+    @staticmethod
+    def read(path: str):
+        with gzip.open(path, "rt", encoding="utf-8") as lines:
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line)
+
+    @staticmethod
+    def restore(db: Session, path: str, batch: int = ROOM_MESSAGE_ARCHIVE_BATCH) -> int:
+        """Load an archive back into room_messages. Rows already there are skipped, so a restore
+        can be re-run; rows still past retention go again with the next expire()."""
+        postgres = db.get_bind().dialect.name == "postgresql"
+        partitioned = MessagePartitions.enabled(db)
+        if postgres:
+            statement = postgresql.insert(RoomMessage.__table__).values(
+                search_vector=cast(bindparam("archived_vector"), TSVECTOR)
+            ).on_conflict_do_nothing()
+        else:
+            statement = sqlite.insert(RoomMessage.__table__).on_conflict_do_nothing()
+
+        records = MessageArchive.read(path)
+        restored = 0
+        while chunk := list(islice(records, batch)):
+            rows = [{
+                "id": uuid.UUID(record["id"]),
+                "room_id": uuid.UUID(record["room_id"]) if record["room_id"] else None,
+                "sender_name": uuid.UUID(record["sender_name"]),
+                "content": record["content"],
+                "timestamp": datetime.fromisoformat(record["timestamp"]),
+            } for record in chunk]
+            if postgres:
+                for row, record in zip(rows, chunk):
+                    row["archived_vector"] = record.get("search_vector")
+            if partitioned:
+                timestamps = [row["timestamp"] for row in rows]
+                MessagePartitions.cover(db, min(timestamps), max(timestamps) + timedelta(microseconds=1))
+            db.execute(statement, rows)
+            db.commit()
+            restored += len(rows)
+        return restored
+
+
+def main():
+    from app.db.database import session_scope
+
+    parser = argparse.ArgumentParser(description="room_messages partitions and archives")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("ensure", help="create the partitions ahead (Postgres)")
+    commands.add_parser("expire", help="archive and drop the periods past retention")
+    restore = commands.add_parser("restore", help="load archive files back into room_messages")
+    restore.add_argument("paths", nargs="+")
+    args = parser.parse_args()
+
+    with session_scope() as db:
+        if args.command == "ensure":
+            print(f"{len(MessagePartitions.ensure(db))} partitions created")
+        elif args.command == "expire":
+            for path, count in MessageArchive.expire(db):
+                print(f"{count} messages -> {path}")
+        else:
+            for path in args.paths:
+                print(f"{MessageArchive.restore(db, path)} messages restored from {path}")
+
+
+if __name__ == "__main__":
+    main()
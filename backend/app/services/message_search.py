@@ -0,0 +1,102 @@
+import base64
+import re
+import uuid
+from datetime import datetime
+from sqlalchemy import Text, and_, bindparam, cast, func, insert, literal_column, or_, select, table
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.orm import Session
+from app.models.rooms import Room, RoomMessage
+
+# Room.language -> Postgres text search configuration (stemming, stop words); anything else uses "simple"
+SEARCH_CONFIGS = {
+    "da": "danish", "de": "german", "en": "english", "es": "spanish", "fi": "finnish", "fr": "french",
+    "hu": "hungarian", "it": "italian", "nl": "dutch", "no": "norwegian", "pt": "portuguese",
+    "ro": "romanian", "ru": "russian", "sv": "swedish", "tr": "turkish",
+}
+SEARCH_MAX_TERMS = 8
+
+_TERM = re.compile(r"\w+")
+_fts = table("room_messages_fts")
+
+
+class MessageSearch:
+    """Full-text search over a room's messages.
+
+    Postgres: search_vector is computed by the INSERT itself with the room language's config
+    and served by the (room_id, search_vector) GIN index. SQLite: the room_messages_fts FTS5
+    table, filled by triggers. Both are written in the same transaction as the message.
+    """
+
+    @staticmethod
+    def config_for(language: str | None) -> str:
+        return SEARCH_CONFIGS.get((language or "").lower()[:2], "simple")
+
+    @staticmethod
+    def prepare(db: Session, rows: list[dict]):
+        """room_message_writer hook: the insert statement and rows for this backend."""
+        if db.get_bind().dialect.name != "postgresql":
+            return insert(RoomMessage), rows
+        statement = insert(RoomMessage.__table__).values(
+            search_vector=func.to_tsvector(cast(bindparam("search_config"), REGCONFIG), cast(bindparam("search_text"), Text))
+        )
+        return statement, [
+            {**row, "search_config": row.get("search_config") or "simple", "search_text": row["content"]}
+            for row in rows
+        ]
+
+    @staticmethod
+    def fts_query(room_id: uuid.UUID, text: str) -> str | None:
+        """FTS5 MATCH expression: every word of text (AND), within the room. Quoting each term
+        keeps user input from being read as FTS5 syntax."""
+        terms = _TERM.findall(text.lower())[:SEARCH_MAX_TERMS]
+        if not terms:
+            return None
+        words = " ".join(f'"{term}"' for term in terms)
+        return f'room_id : "{room_id.hex}" AND content : ({words})'
+
+    @staticmethod
+    def encode_cursor(row) -> str:
+        raw = f"{row.timestamp.isoformat()}|{row.id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+        try:
+            timestamp, message_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+            return datetime.fromisoformat(timestamp), uuid.UUID(message_id)
+        except (ValueError, UnicodeDecodeError):
+            raise ValueError("Invalid cursor")
+
+    @staticmethod
+    def search(db: Session, room: Room, text: str, cursor: str | None = None, limit: int = 20):
+        """Newest-first page of the room's messages matching text; pass the returned cursor to go further back.
+        Postgres reads text with websearch_to_tsquery ("quoted phrases", or, -excluded)."""
+        query = db.query(RoomMessage.id, RoomMessage.sender_name, RoomMessage.content, RoomMessage.timestamp)
+
+        if db.get_bind().dialect.name == "postgresql":
+            tsquery = func.websearch_to_tsquery(cast(MessageSearch.config_for(room.language), REGCONFIG), text)
+            query = query.filter(RoomMessage.room_id == room.id, RoomMessage.search_vector.op("@@")(tsquery))
+        else:
+            match = MessageSearch.fts_query(room.id, text)
+            if match is None:
+                return [], None
+            # The room is part of the MATCH; a room_id filter here would make SQLite walk the
+            # room's whole index and probe the matches, instead of reading just the matches
+            matches = select(literal_column("rowid")).select_from(_fts).where(literal_column("room_messages_fts").op("MATCH")(match))
+            query = query.filter(literal_column("room_messages.rowid").in_(matches))
+
+        if cursor:
+            timestamp, message_id = MessageSearch.decode_cursor(cursor)
+            query = query.filter(or_(
+                RoomMessage.timestamp < timestamp,
+                and_(RoomMessage.timestamp == timestamp, RoomMessage.id < message_id),
+            ))
+
+        rows = (
+            query.order_by(RoomMessage.timestamp.desc(), RoomMessage.id.desc())
+            .limit(limit + 1)
+            .all()
+        )
+
+        next_cursor = MessageSearch.encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+        return rows[:limit], next_cursor
@@ -0,0 +1,148 @@
+import json
+from collections import deque
+from dotenv import load_dotenv
+from app.core.metrics import MODERATION_ACTIONS
+from app.core.redis import get_redis
+import os
+
+load_dotenv()
+
+MODERATION_WORDLIST_DIR = os.getenv(
+    "MODERATION_WORDLIST_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "moderation"),
+)
+# Second, slower tier in Celery that can retract a message after it was delivered
+MODERATION_ASYNC = os.getenv("MODERATION_ASYNC", "0") == "1"
+RETRACT_CHANNEL = "moderation:retract"
+
+# Lowercase + accent folding that keeps a 1:1 character mapping, so match offsets stay valid
+_FOLD = str.maketrans("áàâäãéèêëíìîïóòôöõúùûüñç", "aaaaaeeeeiiiiooooouuuunc")
+
+
+def normalize(text: str) -> str:
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        # Some characters lowercase to several ("İ" -> "i̇"): fold one at a time, keeping the first
+        lowered = "".join([char.lower()[:1] for char in text])
+    return lowered.translate(_FOLD)
+
+
+class AhoCorasick:
+    """Multi-pattern matcher: one pass over the text whatever the number of words."""
+
+    def __init__(self, words):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[tuple[int, ...]] = [()]  # lengths of the words ending at each state
+
+        for word in words:
+            state = 0
+            for char in word:
+                following = self._goto[state].get(char)
+                if following is None:
+                    following = len(self._goto)
+                    self._goto[state][char] = following
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = following
+            self._out[state] += (len(word),)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, following in self._goto[state].items():
+                queue.append(following)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[following] = self._goto[fallback].get(char, 0)
+                self._out[following] += self._out[self._fail[following]]
+
+    def find(self, text: str) -> list[tuple[int, int]]:
+        """(start, end) spans of the words found on word boundaries."""
+        goto, fail, out = self._goto, self._fail, self._out
+        spans = []
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                end = index + 1
+                for length in out[state]:
+                    start = end - length
+                    if (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum()):
+                        spans.append((start, end))
+        return spans
+
+
+def load_wordlist(language: str) -> list[str]:
+    path = os.path.join(MODERATION_WORDLIST_DIR, f"{language}.txt")
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [normalize(line.strip()) for line in f if line.strip() and not line.startswith("#")]
+
+
+MATCHER_POOL: dict[str, AhoCorasick] = {}
+
+
+class ModerationService:
+
+    @staticmethod
+    def matcher(language: str | None) -> AhoCorasick:
+        language = (language or "").lower()
+        if language not in MATCHER_POOL:
+            words = load_wordlist(language)
+            if not words:
+                # Unknown language: check against every list we have
+                words = [
+                    word
+                    for name in sorted(os.listdir(MODERATION_WORDLIST_DIR))
+                    if name.endswith(".txt")
+                    for word in load_wordlist(name[:-4])
+                ]
+            MATCHER_POOL[language] = AhoCorasick(words)
+        return MATCHER_POOL[language]
+
+    @staticmethod
+    def mask(language: str | None, text: str) -> tuple[str, int]:
+        """Inline tier: star out listed words. Returns the text to deliver and the hit count."""
+        spans = ModerationService.matcher(language).find(normalize(text))
+        if not spans:
+            return text, 0
+
+        chars = list(text)
+        for start, end in spans:
+            for index in range(start, end):
+                if not chars[index].isspace():
+                    chars[index] = "*"
+        MODERATION_ACTIONS.inc(tier="inline", action="masked")
+        return "".join(chars), len(spans)
+
+    @staticmethod
+    def submit(room_code: str, message_id, line: str, text: str):
+        """Queue the message for the slower Celery tier (no-op unless MODERATION_ASYNC=1)."""
+        if not MODERATION_ASYNC:
+            return
+        # Imported here so the web process only pulls in Celery when the tier is on
+        from app.tasks.moderation import moderate_room_message
+        try:
+            moderate_room_message.delay(room_code, str(message_id), line, text)
+        except Exception as e:
+            # Moderation must never take the chat down with it
+            print(f"[MODERATION ERROR] {room_code}/{message_id}: {e}")
+
+    @staticmethod
+    def retract_frame(message_id, line: str) -> str:
+        return json.dumps({"type": "retract", "id": str(message_id), "line": line})
+
+    @staticmethod
+    def publish_retraction(room_code: str, message_id, line: str):
+        """Tell every web worker to pull a delivered message from the room's sockets."""
+        get_redis().publish(RETRACT_CHANNEL, json.dumps({
+            "room_code": room_code,
+            "frame": ModerationService.retract_frame(message_id, line),
+        }))
+        MODERATION_ACTIONS.inc(tier="async", action="retracted")
@@ -0,0 +1,118 @@
+import json
+import time
+from dotenv import load_dotenv
+from app.core.redis import get_redis
+import os
+
+load_dotenv()
+
+PRESENCE_TTL = int(os.getenv("PRESENCE_TTL", 60))
+
+
+class PresenceService:
+    """Cross-worker room presence: one Redis hash per room, one field per open socket."""
+
+    @staticmethod
+    def _key(room_code: str) -> str:
+        return f"presence:room:{room_code}"
+
+    @staticmethod
+    def _entry(user_id, username: str) -> str:
+        return f"{user_id}|{time.time()}|{username}"
+
+    @staticmethod
+    def join(room_code: str, connection_id: str, user_id, username: str) -> int:
+        key = PresenceService._key(room_code)
+        pipe = get_redis().pipeline()
+        pipe.hset(key, connection_id, PresenceService._entry(user_id, username))
+        pipe.expire(key, PRESENCE_TTL)
+        pipe.hlen(key)
+        return pipe.execute()[-1]
+
+    @staticmethod
+    def touch_many(sockets: list[tuple[str, str, object, str]]) -> dict[str, int]:
+        """Refresh the liveness of many (room_code, connection_id, user_id, username) sockets and
+        drop the sockets of their rooms whose worker stopped refreshing them, in one or two round trips.
+
+        Returns the online count of the rooms where stale sockets were pruned."""
+        client = get_redis()
+        rooms = list({room_code for room_code, _, _, _ in sockets})
+        pipe = client.pipeline(transaction=False)
+        for room_code, connection_id, user_id, username in sockets:
+            pipe.hset(PresenceService._key(room_code), connection_id, PresenceService._entry(user_id, username))
+        for room_code in rooms:
+            pipe.expire(PresenceService._key(room_code), PRESENCE_TTL)
+            pipe.hgetall(PresenceService._key(room_code))
+        results = pipe.execute()[len(sockets):]
+
+        deadline = time.time() - PRESENCE_TTL
+        stale = {}
+        for room_code, entries in zip(rooms, results[1::2]):
+            expired = [
+                connection_id
+                for connection_id, entry in entries.items()
+                if float(entry.split("|", 2)[1]) < deadline
+            ]
+            if expired:
+                stale[room_code] = expired
+        if not stale:
+            return {}
+        pipe = client.pipeline(transaction=False)
+        for room_code, expired in stale.items():
+            pipe.hdel(PresenceService._key(room_code), *expired)
+            pipe.hlen(PresenceService._key(room_code))
+        return dict(zip(stale, pipe.execute()[1::2]))
+
+    @staticmethod
+    def leave(room_code: str, connection_id: str) -> int:
+        key = PresenceService._key(room_code)
+        pipe = get_redis().pipeline()
+        pipe.hdel(key, connection_id)
+        pipe.hlen(key)
+        return pipe.execute()[-1]
+
+    @staticmethod
+    def leave_many(connections: list[tuple[str, str]]) -> int:
+        """Remove many (room_code, connection_id) sockets in one round trip (a worker shutting down)."""
+        if not connections:
+            return 0
+        pipe = get_redis().pipeline(transaction=False)
+        for room_code, connection_id in connections:
+            pipe.hdel(PresenceService._key(room_code), connection_id)
+        return sum(pipe.execute())
+
+    @staticmethod
+    def prune(room_code: str) -> int:
+        key = PresenceService._key(room_code)
+        deadline = time.time() - PRESENCE_TTL
+        stale = [
+            connection_id
+            for connection_id, entry in get_redis().hgetall(key).items()
+            if float(entry.split("|", 2)[1]) < deadline
+        ]
+        if stale:
+            get_redis().hdel(key, *stale)
+        return len(stale)
+
+    @staticmethod
+    def online_count(room_code: str) -> int:
+        return get_redis().hlen(PresenceService._key(room_code))
+
+    @staticmethod
+    def has_user(room_code: str, user_id) -> bool:
+        """Whether the user still has a socket in the room (another tab, another worker)."""
+        prefix = f"{user_id}|"
+        return any(entry.startswith(prefix) for entry in get_redis().hvals(PresenceService._key(room_code)))
+
+    @staticmethod
+    def members(room_code: str) -> list[dict]:
+        PresenceService.prune(room_code)
+        users = {}
+        for entry in get_redis().hgetall(PresenceService._key(room_code)).values():
+            user_id, _, username = entry.split("|", 2)
+            users[user_id] = username
+        return [{"user_id": user_id, "username": username} for user_id, username in users.items()]
+
+    @staticmethod
+    def event(online: int) -> str:
+        return json.dumps({"type": "presence", "online": online})
@@ -0,0 +1,102 @@
+import uuid
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+from app.core.metrics import ROOM_CACHE_LOOKUPS
+from app.core.redis import get_redis
+from app.db.database import read_through
+from app.models.rooms import Room
+import os
+
+load_dotenv()
+
+ROOM_CACHE_TTL = int(os.getenv("ROOM_CACHE_TTL", 300))
+ROOM_CACHE_NEGATIVE_TTL = int(os.getenv("ROOM_CACHE_NEGATIVE_TTL", 30))
+
+
+class RoomCache:
+    """Room admission metadata in Redis so connect storms and room routes skip Postgres.
+
+    Hits come back as transient Room objects (never attached to a session); anything that
+    mutates a room must load the real row and then call store() or invalidate()."""
+
+    @staticmethod
+    def _key(room_code: str) -> str:
+        return f"room:meta:{room_code}"
+
+    @staticmethod
+    def _from_hash(room_code: str, data: dict) -> Room:
+        return Room(
+            id=uuid.UUID(data["id"]),
+            code=room_code,
+            name=data.get("name") or None,
+            language=data.get("language") or None,
+            max_users=int(data["max_users"]),
+            expires_at=datetime.fromisoformat(data["expires_at"]) if data.get("expires_at") else None,
+            is_active=data["is_active"] == "1",
+            # Entries cached before the field existed: every room created so far is public
+            is_public=data.get("is_public", "1") == "1",
+        )
+
+    @staticmethod
+    def get(room_code: str, db=None) -> Room | None:
+        """Read-through lookup; unknown codes are remembered briefly as misses."""
+        data = get_redis().hgetall(RoomCache._key(room_code))
+        if data.get("missing"):
+            ROOM_CACHE_LOOKUPS.inc(result="negative")
+            return None
+        if data:
+            ROOM_CACHE_LOOKUPS.inc(result="hit")
+            return RoomCache._from_hash(room_code, data)
+
+        ROOM_CACHE_LOOKUPS.inc(result="miss")
+        if db is not None:
+            room = db.query(Room).filter(Room.code == room_code).first()
+        else:
+            # A replica may not have a room created a moment ago yet; then the primary answers
+            room = read_through(lambda scoped: scoped.query(Room).filter(Room.code == room_code).first())
+
+        if room is None:
+            RoomCache.store_missing(room_code)
+        else:
+            RoomCache.store(room)
+        return room
+
+    @staticmethod
+    def store(room: Room):
+        ttl = ROOM_CACHE_TTL
+        if room.expires_at:
+            # Never serve a room from cache past its expiry
+            remaining = int((room.expires_at - datetime.now(timezone.utc)).total_seconds())
+            ttl = max(1, min(ttl, remaining))
+
+        key = RoomCache._key(room.code)
+        pipe = get_redis().pipeline()
+        pipe.delete(key)
+        pipe.hset(key, mapping={
+            "id": str(room.id),
+            "name": room.name or "",
+            "language": room.language or "",
+            "max_users": room.max_users,
+            "expires_at": room.expires_at.isoformat() if room.expires_at else "",
+            "is_active": "1" if room.is_active else "0",
+            "is_public": "0" if room.is_public is False else "1",
+        })
+        pipe.expire(key, ttl)
+        pipe.execute()
+
+    @staticmethod
+    def store_missing(room_code: str):
+        key = RoomCache._key(room_code)
+        pipe = get_redis().pipeline()
+        pipe.hset(key, "missing", "1")
+        pipe.expire(key, ROOM_CACHE_NEGATIVE_TTL)
+        pipe.execute()
+
+    @staticmethod
+    def invalidate(*room_codes: str):
+        if room_codes:
+            get_redis().delete(*(RoomCache._key(code) for code in room_codes))
+
+    @staticmethod
+    def is_open(room: Room) -> bool:
+        return bool(room.is_active) and (room.expires_at is None or room.expires_at > datetime.now(timezone.utc))
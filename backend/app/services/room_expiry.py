@@ -0,0 +1,92 @@
+from datetime import datetime, timezone
+from sqlalchemy import select, update
+from dotenv import load_dotenv
+from app.core.redis import get_redis
+from app.db.database import session_scope
+from app.models.rooms import Room, RoomMember
+from app.services.room_cache import RoomCache
+import os
+
+load_dotenv()
+
+ROOM_EXPIRY_KEY = "rooms:expiry"
+ROOM_EXPIRY_BATCH = int(os.getenv("ROOM_EXPIRY_BATCH", 500))
+
+
+class RoomExpiry:
+    """Cluster-wide expiry schedule: a Redis sorted set of room codes scored by expires_at.
+
+    Any worker may claim due rooms; ZREM decides the winner, so each room is
+    deactivated exactly once no matter how many workers poll."""
+
+    @staticmethod
+    def schedule(room_code: str, expires_at: datetime):
+        get_redis().zadd(ROOM_EXPIRY_KEY, {room_code: expires_at.timestamp()})
+
+    @staticmethod
+    def schedule_many(rooms: list[tuple[str, datetime]]):
+        client = get_redis()
+        for start in range(0, len(rooms), ROOM_EXPIRY_BATCH):
+            chunk = rooms[start:start + ROOM_EXPIRY_BATCH]
+            client.zadd(ROOM_EXPIRY_KEY, {code: expires_at.timestamp() for code, expires_at in chunk})
+
+    @staticmethod
+    def cancel(*room_codes: str):
+        if room_codes:
+            get_redis().zrem(ROOM_EXPIRY_KEY, *room_codes)
+
+    @staticmethod
+    def next_due() -> float | None:
+        first = get_redis().zrange(ROOM_EXPIRY_KEY, 0, 0, withscores=True)
+        return first[0][1] if first else None
+
+    @staticmethod
+    def claim_due(now: float | None = None, limit: int = ROOM_EXPIRY_BATCH) -> list[str]:
+        now = now if now is not None else datetime.now(timezone.utc).timestamp()
+        client = get_redis()
+        due = client.zrangebyscore(ROOM_EXPIRY_KEY, "-inf", now, start=0, num=limit)
+        if not due:
+            return []
+
+        pipe = client.pipeline()
+        for code in due:
+            pipe.zrem(ROOM_EXPIRY_KEY, code)
+        # Another worker may have claimed some of them between the two calls
+        return [code for code, removed in zip(due, pipe.execute()) if removed]
+
+    @staticmethod
+    def deactivate(room_codes: list[str]) -> int:
+        """Mark a batch of rooms and their memberships inactive in two statements."""
+        if not room_codes:
+            return 0
+        with session_scope() as db:
+            room_ids = select(Room.id).where(Room.code.in_(room_codes))
+            db.execute(
+                update(RoomMember)
+                .where(RoomMember.room_id.in_(room_ids), RoomMember.is_active == True)
+                .values(is_active=False),
+                execution_options={"synchronize_session": False},
+            )
+            result = db.execute(
+                update(Room)
+                .where(Room.code.in_(room_codes), Room.is_active == True)
+                .values(is_active=False, seats_taken=0),
+                execution_options={"synchronize_session": False},
+            )
+            db.commit()
+        RoomCache.invalidate(*room_codes)
+        return result.rowcount
+
+    @staticmethod
+    def backfill() -> int:
+        """Schedule active rooms that predate the sorted set (no-op once it exists)."""
+        if get_redis().exists(ROOM_EXPIRY_KEY):
+            return 0
+        with session_scope() as db:
+            rooms = (
+                db.query(Room.code, Room.expires_at)
+                .filter(Room.is_active == True, Room.expires_at.isnot(None))
+                .all()
+            )
+        RoomExpiry.schedule_many([(code, expires_at) for code, expires_at in rooms])
+        return len(rooms)
@@ -1,14 +1,79 @@
+import json
 import string
 import secrets
-from app.models.rooms import RoomMember
+import uuid
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+from app.core.redis import get_redis
+from sqlalchemy import select, update
+from app.db.write_behind import WriteBehindQueue
+from app.models.rooms import Room, RoomMember, RoomMessage
+from app.services.message_search import MessageSearch
+import os
+
+load_dotenv()
+
+# Room frames for the sockets of every web worker, relayed by app.sockets.retractions
+ROOM_EVENTS_CHANNEL = "rooms:events"
+
+room_message_writer = WriteBehindQueue(
+    RoomMessage,
+    batch_size=int(os.getenv("ROOM_MESSAGE_BATCH_SIZE", 200)),
+    flush_interval=float(os.getenv("ROOM_MESSAGE_FLUSH_INTERVAL", 0.5)),
+    # Search indexing rides on the same insert
+    prepare=MessageSearch.prepare,
+    stamp="timestamp",
+)
 
 class RoomService():
 
 
+    @staticmethod
+    def seats_taken(db, room_id) -> int:
+        """Users with an active membership of the room: one seat each, however many tabs they have open."""
+        return db.execute(select(Room.seats_taken).where(Room.id == room_id)).scalar_one()
+
     @staticmethod
     def is_room_full(db, room_id: int, max_users: int) -> bool:
-        current_members_count = db.query(RoomMember).filter(RoomMember.room_id == room_id).count()
-        return current_members_count >= max_users
+        return RoomService.seats_taken(db, room_id) >= max_users
+
+    @staticmethod
+    def is_member(db, room_id, user_id) -> bool:
+        return db.execute(
+            select(RoomMember.id)
+            .where(RoomMember.room_id == room_id, RoomMember.user_id == user_id, RoomMember.is_active == True)
+            .limit(1)
+        ).first() is not None
+
+    @staticmethod
+    def take_seat(db, room_id, user_id, max_users: int) -> bool:
+        """Add the user as an active member if the room has a free seat; False when it is full.
+
+        The seat is taken by a conditional UPDATE of the room's count, which locks the row (the
+        database on SQLite) until commit, so concurrent joins can't both take the last seat.
+        """
+        taken = db.execute(
+            update(Room)
+            .where(Room.id == room_id, Room.seats_taken < max_users)
+            .values(seats_taken=Room.seats_taken + 1),
+            execution_options={"synchronize_session": False},
+        ).rowcount
+        if not taken:
+            db.rollback()
+            return False
+        # Checked under the lock: a second join of the same user doesn't take a second seat
+        if RoomService.is_member(db, room_id, user_id):
+            db.rollback()
+            return True
+        db.add(RoomMember(
+            room_id=room_id,
+            user_id=user_id,
+            is_host=False,
+            is_active=True,
+            joined_at=datetime.now(timezone.utc),
+        ))
+        db.commit()
+        return True
 
     @staticmethod
     def generate_room_code(length: int = 8) -> str:
@@ -23,17 +88,96 @@ class RoomService():
             room_id=room_id,
             user_id=user_id,
             is_host=is_host,
-            is_active=True
+            is_active=True,
+            joined_at=datetime.now(timezone.utc),
         )
         db.add(new_member)
+        db.execute(
+            update(Room).where(Room.id == room_id).values(seats_taken=Room.seats_taken + 1),
+            execution_options={"synchronize_session": False},
+        )
         db.commit()
         db.refresh(new_member)
 
 
     @staticmethod
-    def remove_member_from_room(db, room_id: int, user_id: str):
-        member = db.query(RoomMember).filter_by(room_id=room_id, user_id=user_id).first()
-        if member:
-            member.is_active = False
-            db.commit()
+    def record_message(room_id, user_id, content: str, language: str | None = None) -> uuid.UUID:
+        """Queue a chat message; it is bulk-inserted off the websocket path."""
+        message_id = uuid.uuid4()
+        room_message_writer.put({
+            "id": message_id,
+            "room_id": room_id,
+            "sender_name": user_id,
+            "content": content,
+            "timestamp": datetime.now(timezone.utc),
+            "search_config": MessageSearch.config_for(language),
+        })
+        return message_id
 
+
+    @staticmethod
+    def leave(db, room_id, user_id) -> dict | None:
+        """Take a member out of a room in one transaction: the host role passes to the longest-standing
+        active member, and the room is deactivated when nobody is left.
+
+        Returns None when the user wasn't an active member, else {"was_host", "host", "room_active"}.
+        """
+        # Writing first locks the member's row (and takes SQLite's write lock) before anything is read
+        left = db.execute(
+            update(RoomMember)
+            .where(RoomMember.room_id == room_id, RoomMember.user_id == user_id, RoomMember.is_active == True)
+            .values(is_active=False)
+            .returning(RoomMember.id, RoomMember.is_host),
+            execution_options={"synchronize_session": False},
+        ).all()
+        if not left:
+            db.rollback()
+            return None
+
+        # The seat goes back in the same transaction; leaves and joins of one room run one at a
+        # time, as both update the room row
+        db.execute(
+            update(Room).where(Room.id == room_id).values(seats_taken=Room.seats_taken - 1),
+            execution_options={"synchronize_session": False},
+        )
+        # Members locked by another transaction are on their way out too (a leave, a socket release)
+        successor = db.execute(
+            select(RoomMember.id, RoomMember.user_id, RoomMember.is_host)
+            .where(RoomMember.room_id == room_id, RoomMember.is_active == True)
+            .order_by(RoomMember.is_host.desc(), RoomMember.joined_at, RoomMember.id)
+            .limit(1)
+            .with_for_update(skip_locked=True, key_share=True)
+        ).first()
+
+        was_host = any(is_host for _, is_host in left)
+        if was_host:
+            db.execute(update(RoomMember).where(RoomMember.id.in_([member_id for member_id, _ in left])).values(is_host=False))
+            if successor is not None and not successor.is_host:
+                db.execute(update(RoomMember).where(RoomMember.id == successor.id).values(is_host=True))
+        if successor is None:
+            db.execute(update(Room).where(Room.id == room_id).values(is_active=False, seats_taken=0))
+        db.commit()
+
+        return {
+            "was_host": was_host,
+            "host": str(successor.user_id) if successor is not None and (was_host or successor.is_host) else None,
+            "room_active": successor is not None,
+        }
+
+
+    @staticmethod
+    def membership_frame(event: str, user_id, username: str, result: dict) -> str:
+        return json.dumps({
+            "type": "membership",
+            "event": event,
+            "user_id": str(user_id),
+            "username": username,
+            "host": result["host"],
+            "room_active": result["room_active"],
+        })
+
+
+    @staticmethod
+    def publish_event(room_code: str, frame: str):
+        """Send a frame to the room's sockets on every web worker."""
+        get_redis().publish(ROOM_EVENTS_CHANNEL, json.dumps({"room_code": room_code, "frame": frame}))
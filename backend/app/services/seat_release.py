@@ -0,0 +1,96 @@
+import time
+import uuid
+from sqlalchemy import select
+from dotenv import load_dotenv
+from app.core.redis import get_redis
+from app.db.database import session_scope
+from app.models.user import User
+from app.services.presence import PresenceService
+from app.services.room_cache import RoomCache
+from app.services.rooms import RoomService
+import os
+
+load_dotenv()
+
+SEAT_RELEASE_KEY = "rooms:seat_release"
+ROOM_SEAT_GRACE = float(os.getenv("ROOM_SEAT_GRACE", 30))
+SEAT_RELEASE_BATCH = int(os.getenv("SEAT_RELEASE_BATCH", 500))
+
+
+class SeatRelease:
+    """Seats of members whose room socket closed, held for ROOM_SEAT_GRACE seconds.
+
+    A Redis sorted set of room_code|user_id scored by when to let go. A member who
+    is back in the room by then (a network blip, another tab, another worker after a drain)
+    keeps the seat and the host role; otherwise they leave as through the leave route. Any
+    worker may claim due entries; ZREM decides the winner, like the room expiry schedule."""
+
+    @staticmethod
+    def _entry(room_code: str, user_id) -> str:
+        return f"{room_code}|{user_id}"
+
+    @staticmethod
+    def schedule(room_code: str, user_id):
+        SeatRelease.schedule_many([(room_code, user_id)])
+
+    @staticmethod
+    def schedule_many(members: list[tuple[str, object]], grace: float = ROOM_SEAT_GRACE):
+        """Hold many (room_code, user_id) seats; a member scheduled again gets the later deadline."""
+        if not members:
+            return
+        due = time.time() + grace
+        client = get_redis()
+        for start in range(0, len(members), SEAT_RELEASE_BATCH):
+            chunk = members[start:start + SEAT_RELEASE_BATCH]
+            client.zadd(SEAT_RELEASE_KEY, {SeatRelease._entry(*member): due for member in chunk})
+
+    @staticmethod
+    def claim_due(now: float | None = None, limit: int = SEAT_RELEASE_BATCH) -> list[tuple[str, str]]:
+        now = now if now is not None else time.time()
+        client = get_redis()
+        due = client.zrangebyscore(SEAT_RELEASE_KEY, "-inf", now, start=0, num=limit)
+        if not due:
+            return []
+
+        pipe = client.pipeline()
+        for entry in due:
+            pipe.zrem(SEAT_RELEASE_KEY, entry)
+        # Another worker may have claimed some of them between the two calls
+        return [tuple(entry.split("|", 1)) for entry, removed in zip(due, pipe.execute()) if removed]
+
+    @staticmethod
+    def release(room_code: str, user_id: str) -> dict | None:
+        """Take the seat of a member with no socket left in the room.
+
+        Returns the RoomService.leave result, or None when the member came back or had already left."""
+        # Sockets of a worker that died without draining stop being refreshed; they don't hold the seat
+        PresenceService.prune(room_code)
+        if PresenceService.has_user(room_code, user_id):
+            return None
+        room = RoomCache.get(room_code)
+        if room is None:
+            return None
+
+        with session_scope() as db:
+            result = RoomService.leave(db, room.id, uuid.UUID(user_id))
+            if result is None:
+                return None
+            username = db.execute(select(User.username).where(User.id == uuid.UUID(user_id))).scalar()
+        if not result["room_active"]:
+            RoomCache.invalidate(room_code)
+        RoomService.publish_event(room_code, RoomService.membership_frame("left", user_id, username, result))
+        return result
+
+    @staticmethod
+    def release_due(now: float | None = None) -> int:
+        """Claim due seats in batches and release them; returns how many members left."""
+        released = 0
+        while True:
+            claimed = SeatRelease.claim_due(now)
+            if not claimed:
+                return released
+            for member in claimed:
+                try:
+                    released += SeatRelease.release(*member) is not None
+                except Exception as e:
+                    print(f"[SEAT RELEASE ERROR] {member[0]} {member[1]}: {e}")
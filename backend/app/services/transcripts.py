@@ -0,0 +1,103 @@
+import base64
+import uuid
+from datetime import datetime, timezone
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from app.db.write_behind import WriteBehindQueue
+from app.models.conversations import AgentMemorySummary, Message
+import os
+
+load_dotenv()
+
+TRANSCRIPT_BATCH_SIZE = int(os.getenv("TRANSCRIPT_BATCH_SIZE", 100))
+TRANSCRIPT_FLUSH_INTERVAL = float(os.getenv("TRANSCRIPT_FLUSH_INTERVAL", 0.5))
+REHYDRATE_LIMIT = 9  # Below the 10-message summary window in main_agent
+
+transcript_writer = WriteBehindQueue(
+    Message,
+    batch_size=TRANSCRIPT_BATCH_SIZE,
+    flush_interval=TRANSCRIPT_FLUSH_INTERVAL,
+    stamp="created_at",
+)
+
+
+class TranscriptService:
+
+    @staticmethod
+    def record(conversation_id, sender: str, content: str):
+        """Queue a chatbot message for durable storage without blocking the reply."""
+        transcript_writer.put({
+            "id": uuid.uuid4(),
+            "conversation_id": conversation_id,
+            "sender": sender,
+            "content": content,
+            "created_at": datetime.now(timezone.utc),
+        })
+
+    @staticmethod
+    def encode_cursor(message: Message) -> str:
+        raw = f"{message.created_at.isoformat()}|{message.id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+        try:
+            created_at, message_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+            return datetime.fromisoformat(created_at), uuid.UUID(message_id)
+        except (ValueError, UnicodeDecodeError):
+            raise ValueError("Invalid cursor")
+
+    @staticmethod
+    def get_page(db: Session, conversation_id, cursor: str | None = None, limit: int = 50):
+        """Newest-first page of messages; pass the returned cursor to go further back."""
+        query = db.query(Message).filter(Message.conversation_id == conversation_id)
+
+        if cursor:
+            created_at, message_id = TranscriptService.decode_cursor(cursor)
+            query = query.filter(or_(
+                Message.created_at < created_at,
+                and_(Message.created_at == created_at, Message.id < message_id),
+            ))
+
+        rows = (
+            query.order_by(Message.created_at.desc(), Message.id.desc())
+            .limit(limit + 1)
+            .all()
+        )
+
+        next_cursor = TranscriptService.encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+        return rows[:limit], next_cursor
+
+    @staticmethod
+    def rehydrate(db: Session, conversation_id, redis_history) -> int:
+        """Refill an empty Redis history with the messages not yet covered by a summary."""
+        last_summary = (
+            db.query(AgentMemorySummary.created_at)
+            .filter(AgentMemorySummary.conversation_id == conversation_id)
+            .order_by(AgentMemorySummary.created_at.desc())
+            .first()
+        )
+
+        query = db.query(Message).filter(Message.conversation_id == conversation_id)
+        if last_summary and last_summary.created_at:
+            query = query.filter(Message.created_at > last_summary.created_at)
+
+        recent = (
+            query.order_by(Message.created_at.desc(), Message.id.desc())
+            .limit(REHYDRATE_LIMIT)
+            .all()
+        )
+        recent.reverse()
+
+        # The history must start with a human turn, otherwise main_agent treats it as contaminated
+        while recent and recent[0].sender != "human":
+            recent.pop(0)
+
+        for message in recent:
+            if message.sender == "human":
+                redis_history.add_user_message(message.content)
+            elif message.sender == "ai":
+                redis_history.add_ai_message(message.content)
+
+        return len(recent)
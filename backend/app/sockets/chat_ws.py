@@ -1,40 +1,52 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from app.agents.main_agent import main_agent
-from app.db.database import get_db
+import uuid
+from fastapi import APIRouter, Header, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response
+from fastapi.concurrency import run_in_threadpool
+from app.db.database import session_scope
 from app.models.rooms import Room
 from fastapi import Depends, status
 from app.services.auth import AuthService
-from app.models.rooms import RoomMessage
 from app.models.user import User
-from sqlalchemy.orm import Session
 from app.services.rooms import RoomService
+from app.services.presence import PresenceService
+from app.services.room_cache import RoomCache
+from app.services.seat_release import SeatRelease
+from app.services.moderation import MODERATION_ASYNC, ModerationService
+from app.sockets.heartbeat import tracker
+from app.sockets.expiry import room_timers
+from app.sockets.connections import ConnectionManager
+from app.sockets.spectators import SpectatorStream, spectators
+from app.sockets.drain import DRAIN_RETRY_AFTER, drain
 
 
 ws_chat = APIRouter()
 
 
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: dict[str, list[WebSocket]] = {}  # room_code -> conexiones
+manager = ConnectionManager(feed=spectators)
 
-    async def connect(self, websocket: WebSocket, room_code: str):
-        await websocket.accept()
-        if room_code not in self.active_connections:
-            self.active_connections[room_code] = []
-        self.active_connections[room_code].append(websocket)
 
-    def disconnect(self, websocket: WebSocket, room_code: str):
-        self.active_connections[room_code].remove(websocket)
-        if not self.active_connections[room_code]:
-            del self.active_connections[room_code]
+async def announce_presence(room_code: str, online: int):
+    # Through the room events channel, so the room's sockets on every worker get the count
+    await run_in_threadpool(RoomService.publish_event, room_code, PresenceService.event(online))
 
-    async def broadcast(self, message: str, room_code: str):
-        if room_code in self.active_connections:
-            for connection in self.active_connections[room_code]:
-                await connection.send_text(message)
 
+# The heartbeat refreshes every room socket's presence in one batch and reports pruned rooms here
+tracker.on_presence = announce_presence
 
-manager = ConnectionManager()
+
+def load_room(room_code: str) -> Room | None:
+    # Served from Redis; only a cold cache opens a (short) session
+    room = RoomCache.get(room_code)
+    return room if room and RoomCache.is_open(room) else None
+
+
+def admit(room_code: str, user_id) -> Room | None:
+    """The room, if it is open and the user holds a seat in it (created it or joined through /rooms/join)."""
+    room = load_room(room_code)
+    if room is None:
+        return None
+    with session_scope() as db:
+        return room if RoomService.is_member(db, room.id, user_id) else None
 
 
 @ws_chat.get("/")
@@ -43,31 +55,67 @@ async def get():
 
 
 
+@ws_chat.get("/spectate/{room_code}")
+async def spectate(room_code: str, last_event_id: str | None = Header(None)):
+    """Read-only server-sent events of a public room: the frames its sockets get, no login,
+    no membership (so no seat taken) and no database session held."""
+    if drain.draining:
+        return Response(status_code=503, headers={"Retry-After": str(max(1, round(DRAIN_RETRY_AFTER)))})
+
+    room = await run_in_threadpool(load_room, room_code)
+    if not room or not room.is_public:
+        raise HTTPException(status_code=404, detail="Room not found")
+    room_timers.watch(room_code, room.expires_at)
+    return SpectatorStream(room_code, last_event_id)
+
+
 @ws_chat.websocket("/ws/chat/{room_code}")
 async def websocket_endpoint(
     websocket: WebSocket,
     room_code: str,
     user: User = Depends(AuthService.get_ws_current_user),
-    db: Session = Depends(get_db),
 ):
-    room = db.query(Room).filter(Room.code == room_code).first()
+    if drain.draining:
+        await drain.refuse(websocket)
+        return
+
+    # Auth, room state and the seat are resolved up front; no session is held while the socket is open
+    room = await run_in_threadpool(admit, room_code, user.id)
     if not room:
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
         return
 
-    await manager.connect(websocket, room_code)
+    connection_id = uuid.uuid4().hex
+    connection = await manager.connect(websocket, room_code, connection_id, user.id)
+    room_timers.watch(room_code, room.expires_at)
+
+    online = PresenceService.join(room_code, connection_id, user.id, user.username)
+    await announce_presence(room_code, online)
+    tracker.register(connection, "room", presence=(user.id, user.username))
 
     try:
         while True:
             text = await websocket.receive_text()
-
-            message = RoomMessage(room_id=room.id, sender_name=user.id, content=text)
-            db.add(message)
-            db.commit()
-            db.refresh(message)
-
-            await manager.broadcast(f"{user.username}: {text}", room_code)
+            tracker.seen(websocket)
+            if tracker.is_pong(text):
+                continue
+
+            # Inline tier masks listed words in microseconds; the Celery tier may retract later
+            text, _ = ModerationService.mask(room.language, text)
+            message_id = RoomService.record_message(room.id, user.id, text, room.language)
+            line = f"{user.username}: {text}"
+            await manager.broadcast(line, room_code)
+            if MODERATION_ASYNC:
+                await run_in_threadpool(ModerationService.submit, room_code, message_id, line, text)
     except WebSocketDisconnect:
-        
-        RoomService.remove_member_from_room(db, room.id, user.id)
-        manager.disconnect(websocket, room_code)
\ No newline at end of file
+        pass
+    finally:
+        # Runs on every exit path so presence never outlives the socket
+        tracker.unregister(websocket)
+        await manager.disconnect(connection)
+        if not drain.draining:
+            # A draining worker releases the presence of all its sockets in one go
+            online = PresenceService.leave(room_code, connection_id)
+            await announce_presence(room_code, online)
+            # The seat is held for a while: a reconnect keeps it (and the host role), a member gone for good leaves
+            await run_in_threadpool(SeatRelease.schedule, room_code, user.id)
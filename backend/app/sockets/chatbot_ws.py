@@ -1,33 +1,77 @@
-from fastapi import APIRouter, WebSocket
-from app.agents.main_agent import main_agent
-from app.db.database import get_db
-from sqlalchemy.orm import Session
-from fastapi import APIRouter, WebSocket, Depends
-from sqlalchemy.orm import Session
-from app.db.database import get_db
+import asyncio
+import json
+import uuid
+import weakref
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, status
+from fastapi.concurrency import run_in_threadpool
 from app.agents.main_agent import main_agent
+from app.agents.jobs import AGENT_MODE, AgentJobError, agent_jobs
 from app.models.user import User
 from app.services.auth import AuthService
+from app.services.conversations import ConversationService
+from app.sockets.heartbeat import tracker
+from app.sockets.connections import ConnectionManager
+from app.sockets.drain import drain, reconnect_frame
+from app.core.tracing import end_trace, report_if_slow, span, start_trace
+import time
 
 chatbot_ws = APIRouter()
 
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: dict[str, WebSocket] = {}  # conversation_id -> socket
+# conversation_id -> {connection_id: Connection}: every tab of a conversation keeps its own socket
+manager = ConnectionManager()
+# One turn at a time per conversation, so tabs don't interleave the shared history; entries go away with their last user
+turn_locks: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+# Sent instead of a reply when an agent worker failed or didn't answer within AGENT_REPLY_TIMEOUT
+AGENT_UNAVAILABLE = "No pude responder en este momento, intenta de nuevo en unos segundos."
 
-    async def connect(self, websocket: WebSocket, conversation_id: str):
-        await websocket.accept()
-        self.active_connections[conversation_id] = websocket
 
-    def disconnect(self, conversation_id: str):
-        self.active_connections.pop(conversation_id, None)
+def turn_lock(conversation_id: str) -> asyncio.Lock:
+    lock = turn_locks.get(conversation_id)
+    if lock is None:
+        lock = turn_locks[conversation_id] = asyncio.Lock()
+    return lock
 
-    async def send_messages(self, message: str, conversation_id: str):
-        websocket = self.active_connections.get(conversation_id)
-        if websocket:
-            await websocket.send_text(message)
 
-manager = ConnectionManager()
+def parse_request(text: str) -> tuple[str | None, str, bool]:
+    """(request id, prompt, fan out). Plain text is an untagged prompt answered only to its socket;
+    {"type": "message", "id": ..., "text": ..., "fanout": bool} gets a tagged "reply" frame."""
+    if text.startswith("{"):
+        try:
+            frame = json.loads(text)
+        except ValueError:
+            frame = None
+        if isinstance(frame, dict) and frame.get("type") == "message" and isinstance(frame.get("text"), str):
+            return str(frame.get("id") or uuid.uuid4().hex), frame["text"], bool(frame.get("fanout"))
+    return None, text, False
+
+
+def reply_frame(request_id: str, response: str, prompt: str | None = None) -> str:
+    frame = {"type": "reply", "id": request_id, "text": response}
+    if prompt is not None:
+        # Other tabs never saw the prompt, so fanned-out replies carry it
+        frame["prompt"] = prompt
+    return json.dumps(frame)
+
+
+async def run_turn(conversation_id: str, user_id: str, user_input: str) -> str:
+    if AGENT_MODE != "stream":
+        return await run_in_threadpool(
+            main_agent,
+            user_input=user_input,
+            session_id=conversation_id,
+            user_id=user_id,
+        )
+    # Agent worker processes run the turn; this worker only waits for the reply
+    try:
+        return await agent_jobs.run(conversation_id, user_id, user_input)
+    except (AgentJobError, asyncio.TimeoutError) as e:
+        print(f"[AGENT ERROR] turn {conversation_id}: {e!r}")
+        return AGENT_UNAVAILABLE
+
+
+async def locked_turn(conversation_id: str, user_id: str, user_input: str) -> str:
+    async with turn_lock(conversation_id):
+        return await run_turn(conversation_id, user_id, user_input)
 
 
 @chatbot_ws.websocket("/ws/chat/{conversation_id}")
@@ -35,21 +79,57 @@ async def websocket_chat(
     websocket: WebSocket,
     conversation_id: str,
     user = Depends(AuthService.get_ws_current_user),
-    db: Session = Depends(get_db)
 ):
-    await manager.connect(websocket, conversation_id)
+    if drain.draining:
+        await drain.refuse(websocket)
+        return
+
+    # Only the owner's tabs join the conversation: they get its replies and run turns on its history
+    owner = await run_in_threadpool(ConversationService.owner, conversation_id)
+    if owner is None or owner != str(user.id):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    connection = await manager.connect(websocket, conversation_id, uuid.uuid4().hex, user.id)
+    tracker.register(connection, "chatbot")
     try:
         while True:
-            user_input = await websocket.receive_text()
+            text = await websocket.receive_text()
+            tracker.seen(websocket)
+            if tracker.is_pong(text):
+                continue
+            request_id, user_input, fanout = parse_request(text)
+            if drain.draining:
+                # Not started here: the tab resends it once reconnected to another worker
+                manager.send(connection, reconnect_frame(request_id))
+                continue
 
-            response = main_agent(
-                user_input=user_input,
-                session_id=conversation_id,
-                user_id=str(user.id),
-                db=db
-            )
+            # Each turn gets its own trace; the threadpool copies the context, so spans land here
+            token = start_trace()
+            started = time.perf_counter()
+            try:
+                with span("turn", "chatbot"):
+                    # main_agent opens a short session per DB step and runs off the event loop;
+                    # a draining worker waits for the turn up to DRAIN_TURN_TIMEOUT. Pongs aren't
+                    # read meanwhile, so the heartbeat leaves the socket alone until the turn is over
+                    with tracker.busy(websocket):
+                        response = await drain.turn(locked_turn(conversation_id, str(user.id), user_input))
+                    if response is None:
+                        response = AGENT_UNAVAILABLE
 
-            await manager.send_messages(response, conversation_id)
+                    with span("ws", "send"):
+                        if request_id is None:
+                            manager.send(connection, response)
+                        elif fanout:
+                            await manager.broadcast(reply_frame(request_id, response, user_input), conversation_id)
+                        else:
+                            manager.send(connection, reply_frame(request_id, response))
+            finally:
+                report_if_slow(f"chatbot turn {conversation_id}", end_trace(token), time.perf_counter() - started)
+    except WebSocketDisconnect:
+        pass
     except Exception as e:
-        manager.disconnect(conversation_id)
         print(f"WebSocket cerrado ({conversation_id}): {e}")
+    finally:
+        tracker.unregister(websocket)
+        await manager.disconnect(connection)
@@ -0,0 +1,156 @@
+import asyncio
+from collections import deque
+from fastapi import WebSocket, status
+from dotenv import load_dotenv
+from app.core.metrics import WS_DROPPED
+from app.core.tracing import span
+from app.sockets.expiry import EXPIRED_FRAME, ROOM_EXPIRED_CLOSE
+import os
+
+load_dotenv()
+
+# Frames a socket may have pending before it is treated as a slow consumer and dropped
+WS_SEND_QUEUE = int(os.getenv("WS_SEND_QUEUE", 256))
+
+
+class Connection:
+    """One open socket: who it belongs to and the frames waiting to be written to it.
+
+    The outbound queue and its writer task only exist while there is something to send,
+    so an idle socket costs just this record.
+    """
+
+    __slots__ = ("id", "room_code", "user_id", "websocket", "queue", "writer")
+
+    def __init__(self, connection_id: str, room_code: str, user_id, websocket: WebSocket):
+        self.id = connection_id
+        self.room_code = room_code
+        self.user_id = user_id
+        self.websocket = websocket
+        self.queue: deque | None = None
+        self.writer: asyncio.Task | None = None
+
+    def push(self, frame) -> bool:
+        """Queue a text frame, or a (code, reason) close; False when the peer fell too far behind."""
+        if self.queue is None:
+            self.queue = deque()
+        elif len(self.queue) >= WS_SEND_QUEUE:
+            return False
+        self.queue.append(frame)
+        if self.writer is None or self.writer.done():
+            self.writer = asyncio.create_task(self.write())
+        return True
+
+    async def write(self):
+        """Single writer per socket: frames go out in order and a stalled peer only stalls itself."""
+        websocket, queue = self.websocket, self.queue
+        try:
+            while queue:
+                frame = queue.popleft()
+                if isinstance(frame, str):
+                    await websocket.send_text(frame)
+                else:
+                    # Close after everything queued before it was sent
+                    queue.clear()
+                    await websocket.close(code=frame[0], reason=frame[1])
+        except Exception:
+            # Peer gone mid-send; the receive loop of that socket handles its own cleanup
+            queue.clear()
+        finally:
+            if self.queue is queue and not queue:
+                self.queue = None
+                self.writer = None
+
+
+class ConnectionManager:
+    """Sockets of this worker by room: room_code -> {connection_id: Connection}.
+    The chatbot uses one as well, with the conversation id as the room.
+
+    Add and remove are dict operations, so a socket disconnecting twice is a no-op.
+    Broadcast only enqueues (no await while iterating), so sockets joining or leaving
+    mid-broadcast can't break the loop; each socket's writer task does the sending.
+    Broadcasts and room closes are also handed to `feed` (the spectator streams), if any.
+    """
+
+    def __init__(self, feed=None):
+        self.rooms: dict[str, dict[str, Connection]] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        self.feed = feed
+
+    def _lock(self, room_code: str) -> asyncio.Lock:
+        lock = self._locks.get(room_code)
+        if lock is None:
+            lock = self._locks[room_code] = asyncio.Lock()
+        return lock
+
+    def __len__(self) -> int:
+        return sum(len(connections) for connections in self.rooms.values())
+
+    def connections(self, room_code: str) -> tuple[Connection, ...]:
+        return tuple(self.rooms.get(room_code, {}).values())
+
+    async def connect(self, websocket: WebSocket, room_code: str, connection_id: str, user_id=None) -> Connection:
+        await websocket.accept()
+        connection = Connection(connection_id, room_code, user_id, websocket)
+        async with self._lock(room_code):
+            self.rooms.setdefault(room_code, {})[connection_id] = connection
+        return connection
+
+    async def disconnect(self, connection: Connection):
+        room_code = connection.room_code
+        lock = self._lock(room_code)
+        async with lock:
+            connections = self.rooms.get(room_code)
+            removed = connections is not None and connections.pop(connection.id, None) is not None
+            if removed and not connections:
+                del self.rooms[room_code]
+        if room_code not in self.rooms and not lock.locked():
+            self._locks.pop(room_code, None)
+        if connection.writer and not connection.writer.done():
+            connection.writer.cancel()
+
+    def drop(self, connection: Connection):
+        """Slow consumer: take it out of the room now and close it; its receive loop then finishes the cleanup."""
+        connections = self.rooms.get(connection.room_code)
+        if connections is None or connections.pop(connection.id, None) is None:
+            return
+        if not connections:
+            del self.rooms[connection.room_code]
+        WS_DROPPED.inc()
+        if connection.writer and not connection.writer.done():
+            connection.writer.cancel()
+        asyncio.create_task(self._close(connection.websocket, status.WS_1013_TRY_AGAIN_LATER, "Too slow"))
+
+    @staticmethod
+    async def _close(websocket: WebSocket, code: int, reason: str):
+        try:
+            await websocket.close(code=code, reason=reason)
+        except Exception:
+            pass
+
+    def send(self, connection: Connection, message: str):
+        """Queue a frame for one socket only; a no-op once that socket disconnected."""
+        if self.rooms.get(connection.room_code, {}).get(connection.id) is not connection:
+            return
+        if not connection.push(message):
+            self.drop(connection)
+
+    async def broadcast(self, message: str, room_code: str):
+        if self.feed is not None:
+            self.feed.publish(room_code, message)
+        connections = self.rooms.get(room_code)
+        if not connections:
+            return
+        with span("ws", "broadcast"):
+            for connection in tuple(connections.values()):
+                if not connection.push(message):
+                    self.drop(connection)
+
+    async def close_room(self, room_code: str, frame: str = EXPIRED_FRAME, code: int = ROOM_EXPIRED_CLOSE, reason: str = "Room expired"):
+        """Queue a last frame and a close for every local socket of the room; receive loops clean up."""
+        if self.feed is not None:
+            self.feed.close(room_code, frame)
+        async with self._lock(room_code):
+            for connection in self.connections(room_code):
+                if not (connection.push(frame) and connection.push((code, reason))):
+                    self.drop(connection)
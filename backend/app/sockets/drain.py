@@ -0,0 +1,184 @@
+import asyncio
+import json
+import signal
+import threading
+import time
+from fastapi import WebSocket
+from fastapi.concurrency import run_in_threadpool
+from dotenv import load_dotenv
+from app.core.metrics import SHUTDOWN_SECONDS
+from app.services.presence import PresenceService
+from app.services.rooms import room_message_writer
+from app.services.seat_release import SeatRelease
+from app.services.transcripts import transcript_writer
+import os
+
+load_dotenv()
+
+DRAIN_TURN_TIMEOUT = float(os.getenv("DRAIN_TURN_TIMEOUT", 20))  # in-flight agent turns get this long to finish
+DRAIN_CLOSE_TIMEOUT = float(os.getenv("DRAIN_CLOSE_TIMEOUT", 5))  # then peers get this long to acknowledge the close
+DRAIN_RETRY_AFTER = float(os.getenv("DRAIN_RETRY_AFTER", 1))  # hint: seconds before reconnecting
+RECONNECT_CLOSE = 1012  # Service Restart
+RECONNECT_REASON = "Server restarting"
+
+
+def reconnect_frame(request_id: str | None = None) -> str:
+    frame = {"type": "reconnect", "retry_after": DRAIN_RETRY_AFTER}
+    if request_id is not None:
+        # A prompt that was not run: the tab resends it after reconnecting
+        frame["id"] = request_id
+    return json.dumps(frame)
+
+
+class Drain:
+    """Graceful shutdown of this worker's sockets.
+
+    On SIGTERM/SIGINT (before uvicorn cuts the sockets, which it does ahead of the lifespan
+    shutdown) or at lifespan shutdown: new sockets are refused with a reconnect hint, room
+    presence is released in bulk and room sockets and spectator streams closed (memberships
+    stay, their seats held for the clients to reconnect elsewhere),
+    agent turns in flight get DRAIN_TURN_TIMEOUT to finish (then get the fallback reply), chatbot
+    sockets are closed after their replies, and the write-behind queues are flushed.
+    """
+
+    def __init__(self):
+        self.draining = False
+        self.turns: set[asyncio.Task] = set()
+        self.rooms = None  # ConnectionManager of chat_ws
+        self.chatbots = None  # ConnectionManager of chatbot_ws
+        self._task: asyncio.Task | None = None
+        self._abandon: asyncio.Future | None = None  # resolved when in-flight turns are given up
+
+    def start(self, rooms, chatbots):
+        self.rooms, self.chatbots = rooms, chatbots
+        self.draining = False
+        self._task = None
+        self._abandon = asyncio.get_running_loop().create_future()
+        self._install_signal_handlers()
+
+    def _install_signal_handlers(self):
+        # Chained in front of the server's own handlers (uvicorn uses signal.signal), which run once the drain is done
+        if threading.current_thread() is not threading.main_thread():
+            return
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            previous = signal.getsignal(sig)
+            if not callable(previous):
+                continue
+
+            def handler(signum, frame, previous=previous):
+                if self.draining:
+                    # Second signal: the server handles it right away (uvicorn force-exits on a second Ctrl+C)
+                    previous(signum, frame)
+                    return
+                loop.call_soon_threadsafe(self._begin, lambda: previous(signum, None))
+
+            signal.signal(sig, handler)
+
+    def _begin(self, then):
+        if self._task is None:
+            self._task = asyncio.create_task(self._drain())
+        self._task.add_done_callback(lambda _: then())
+
+    async def drain(self):
+        """Run the drain once; later calls wait for the same one."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._drain())
+        await asyncio.shield(self._task)
+
+    async def refuse(self, websocket: WebSocket):
+        """A socket arriving mid-drain is accepted only to be told to reconnect elsewhere."""
+        await websocket.accept()
+        await websocket.send_text(reconnect_frame())
+        await websocket.close(code=RECONNECT_CLOSE, reason=RECONNECT_REASON)
+
+    async def turn(self, coro):
+        """Run an agent turn the drain waits for; None when the drain gave up on it."""
+        if self._abandon is None:
+            self._abandon = asyncio.get_running_loop().create_future()
+        task = asyncio.ensure_future(coro)
+        self.turns.add(task)
+        try:
+            # Waiting on the task without awaiting it: an inline turn sits in a worker thread,
+            # which cancelling would have to wait for
+            await asyncio.wait({task, self._abandon}, return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        finally:
+            self.turns.discard(task)
+        if task.done():
+            return task.result()
+        task.cancel()  # best effort; a thread runs on and its reply goes nowhere
+        return None
+
+    @staticmethod
+    def release(connections: list) -> int:
+        """Presence of every room socket in one Redis round trip; the seats are held like after any
+        close, so members who don't reconnect leave the room (host hand-off, empty room closed)."""
+        PresenceService.leave_many([(connection.room_code, connection.id) for connection in connections])
+        members = {(connection.room_code, connection.user_id) for connection in connections}
+        SeatRelease.schedule_many(list(members))
+        return len(members)
+
+    @staticmethod
+    def flush():
+        room_message_writer.stop()
+        transcript_writer.stop()
+
+    async def _wait_closed(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        while (len(self.rooms) or len(self.chatbots)) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+    async def _drain(self):
+        started = time.perf_counter()
+        # Flag and snapshot together: every room socket is either in the snapshot or refused
+        self.draining = True
+        connections = [connection for room in self.rooms.rooms.values() for connection in room.values()]
+        print(f"[DRAIN] {len(self.rooms)} room sockets, {len(self.chatbots)} chatbot sockets, "
+              f"{len(self.turns)} agent turns in flight")
+
+        phase = time.perf_counter()
+        try:
+            released = await run_in_threadpool(Drain.release, connections)
+        except Exception as e:
+            released = 0
+            print(f"[DRAIN ERROR] releasing presence and holding seats: {e}")
+        for room_code in list(self.rooms.rooms):
+            await self.rooms.close_room(room_code, reconnect_frame(), RECONNECT_CLOSE, RECONNECT_REASON)
+        if self.rooms.feed is not None:
+            # Rooms watched here with no socket of their own
+            self.rooms.feed.close_all(reconnect_frame())
+        SHUTDOWN_SECONDS.observe(time.perf_counter() - phase, phase="rooms")
+
+        phase = time.perf_counter()
+        cancelled = 0
+        if self.turns:
+            _, pending = await asyncio.wait(set(self.turns), timeout=DRAIN_TURN_TIMEOUT)
+            cancelled = len(pending)
+            if pending:
+                self._abandon.set_result(None)
+                # Each handler sends its fallback reply as its turn() returns, before the close is queued
+                deadline = time.monotonic() + 1.0
+                while self.turns and time.monotonic() < deadline:
+                    await asyncio.sleep(0.01)
+        for conversation_id in list(self.chatbots.rooms):
+            await self.chatbots.close_room(conversation_id, reconnect_frame(), RECONNECT_CLOSE, RECONNECT_REASON)
+        SHUTDOWN_SECONDS.observe(time.perf_counter() - phase, phase="turns")
+
+        phase = time.perf_counter()
+        await self._wait_closed(DRAIN_CLOSE_TIMEOUT)
+        SHUTDOWN_SECONDS.observe(time.perf_counter() - phase, phase="sockets")
+
+        phase = time.perf_counter()
+        await run_in_threadpool(Drain.flush)
+        SHUTDOWN_SECONDS.observe(time.perf_counter() - phase, phase="flush")
+
+        elapsed = time.perf_counter() - started
+        SHUTDOWN_SECONDS.observe(elapsed, phase="total")
+        print(f"[DRAIN] done in {elapsed:.2f}s: {released} seats held for reconnects, {cancelled} agent turns cancelled, "
+              f"{len(self.rooms) + len(self.chatbots)} sockets still open")
+
+
+drain = Drain()
@@ -0,0 +1,99 @@
+import asyncio
+import heapq
+import json
+import time
+from datetime import datetime
+from fastapi.concurrency import run_in_threadpool
+from dotenv import load_dotenv
+from app.core.metrics import ROOMS_EXPIRED
+from app.services.room_expiry import RoomExpiry
+from app.services.seat_release import SeatRelease
+import os
+
+load_dotenv()
+
+ROOM_EXPIRY_POLL = float(os.getenv("ROOM_EXPIRY_POLL", 1.0))
+ROOM_EXPIRED_CLOSE = 4000
+EXPIRED_FRAME = json.dumps({"type": "room_expired"})
+
+
+class RoomTimers:
+    """Per-worker expiry timer: one task, one heap.
+
+    Each tick fires the local handler for rooms of this worker whose time has come
+    (closing their sockets), claims a batch of due rooms from the shared sorted
+    set to deactivate them in the database, and releases the held seats of members
+    who didn't come back (app.services.seat_release)."""
+
+    def __init__(self):
+        self.deadlines: dict[str, float] = {}  # room_code -> expires_at timestamp
+        self._heap: list[tuple[float, str]] = []
+        self._on_expire = None
+        self._task: asyncio.Task | None = None
+
+    def start(self, on_expire=None):
+        if on_expire is not None:
+            self._on_expire = on_expire
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def watch(self, room_code: str, expires_at: datetime | None):
+        if expires_at is None:
+            return
+        deadline = expires_at.timestamp()
+        if self.deadlines.get(room_code) == deadline:
+            return
+        self.deadlines[room_code] = deadline
+        heapq.heappush(self._heap, (deadline, room_code))
+
+    def pop_due(self, now: float) -> list[str]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, room_code = heapq.heappop(self._heap)
+            # Stale heap entries (rescheduled rooms) are skipped
+            if self.deadlines.get(room_code) == deadline:
+                del self.deadlines[room_code]
+                due.append(room_code)
+        return due
+
+    async def tick(self) -> int:
+        now = time.time()
+        for room_code in self.pop_due(now):
+            if self._on_expire:
+                await self._on_expire(room_code)
+
+        expired = 0
+        while True:
+            claimed = await run_in_threadpool(RoomExpiry.claim_due, now)
+            if not claimed:
+                break
+            expired += await run_in_threadpool(RoomExpiry.deactivate, claimed)
+            ROOMS_EXPIRED.inc(len(claimed))
+
+        await run_in_threadpool(SeatRelease.release_due, now)
+        return expired
+
+    async def _run(self):
+        try:
+            await run_in_threadpool(RoomExpiry.backfill)
+        except Exception as e:
+            print(f"[EXPIRY ERROR] backfill: {e}")
+
+        while True:
+            try:
+                await self.tick()
+            except Exception as e:
+                print(f"[EXPIRY ERROR] {e}")
+            await asyncio.sleep(ROOM_EXPIRY_POLL)
+
+
+room_timers = RoomTimers()
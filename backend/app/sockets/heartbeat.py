@@ -0,0 +1,128 @@
+import asyncio
+import json
+import time
+from contextlib import contextmanager
+from fastapi import WebSocket, status
+from fastapi.concurrency import run_in_threadpool
+from dotenv import load_dotenv
+from app.core.metrics import WS_OPEN, WS_REAPED
+from app.services.presence import PresenceService
+import os
+
+load_dotenv()
+
+HEARTBEAT_INTERVAL = float(os.getenv("WS_HEARTBEAT_INTERVAL", 20))
+IDLE_TIMEOUT = float(os.getenv("WS_IDLE_TIMEOUT", 60))
+CLOSE_TIMEOUT = 5.0
+PING_FRAME = json.dumps({"type": "ping"})
+
+
+class Tracked:
+    """What the tracker keeps per socket."""
+
+    __slots__ = ("connection", "endpoint", "last_seen", "presence", "turns")
+
+    def __init__(self, connection, endpoint: str, presence: tuple | None):
+        self.connection = connection
+        self.endpoint = endpoint
+        self.last_seen = time.monotonic()
+        self.presence = presence  # (user_id, username) of a room socket, refreshed every sweep
+        self.turns = 0  # turns in flight: the handler isn't reading, so pongs wait in the buffer
+
+
+class ConnectionTracker:
+    """Pings every socket of this worker from a single task and closes the ones that went quiet.
+
+    Pings go through each socket's outbound queue, so a stalled peer never holds up the sweep;
+    the room presence of all sockets is refreshed in one Redis round trip, off the event loop.
+    `on_presence(room_code, online)` is awaited for rooms whose count changed when sockets
+    another worker stopped refreshing were pruned.
+    """
+
+    def __init__(self):
+        self.connections: dict[WebSocket, Tracked] = {}
+        self.on_presence = None
+        self._task: asyncio.Task | None = None
+
+    def register(self, connection, endpoint: str, presence: tuple | None = None):
+        self.connections[connection.websocket] = Tracked(connection, endpoint, presence)
+        WS_OPEN.inc(endpoint=endpoint)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def unregister(self, websocket: WebSocket):
+        entry = self.connections.pop(websocket, None)
+        if entry:
+            WS_OPEN.dec(endpoint=entry.endpoint)
+
+    def seen(self, websocket: WebSocket):
+        entry = self.connections.get(websocket)
+        if entry:
+            entry.last_seen = time.monotonic()
+
+    @contextmanager
+    def busy(self, websocket: WebSocket):
+        """A turn is running (or waiting for the conversation's lock): the socket isn't idle meanwhile."""
+        entry = self.connections.get(websocket)
+        if entry is None:
+            yield
+            return
+        entry.turns += 1
+        try:
+            yield
+        finally:
+            entry.turns -= 1
+            entry.last_seen = time.monotonic()
+
+    @staticmethod
+    def is_pong(text: str) -> bool:
+        if not text.startswith("{") or "pong" not in text:
+            return False
+        try:
+            return json.loads(text).get("type") == "pong"
+        except (ValueError, AttributeError):
+            return False
+
+    async def _run(self):
+        while self.connections:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            try:
+                await self.sweep()
+            except Exception as e:
+                print(f"[HEARTBEAT ERROR] {e}")
+
+    async def sweep(self) -> int:
+        now = time.monotonic()
+        idle, presence = [], []
+        for websocket, entry in list(self.connections.items()):
+            if entry.turns == 0 and now - entry.last_seen > IDLE_TIMEOUT:
+                idle.append(websocket)
+                continue
+            # A full queue means a slow consumer; the next broadcast drops it
+            entry.connection.push(PING_FRAME)
+            if entry.presence:
+                connection = entry.connection
+                presence.append((connection.room_code, connection.id, *entry.presence))
+        if idle:
+            await asyncio.gather(*(self.reap(websocket) for websocket in idle))
+        if presence:
+            changed = await run_in_threadpool(PresenceService.touch_many, presence)
+            if self.on_presence:
+                for room_code, online in changed.items():
+                    await self.on_presence(room_code, online)
+        return len(idle)
+
+    async def reap(self, websocket: WebSocket):
+        entry = self.connections.get(websocket)
+        if not entry:
+            return
+        self.unregister(websocket)
+        WS_REAPED.inc(endpoint=entry.endpoint)
+        try:
+            # The handler's pending receive returns a disconnect once the close completes
+            await asyncio.wait_for(websocket.close(code=status.WS_1001_GOING_AWAY), CLOSE_TIMEOUT)
+        except Exception:
+            pass
+
+
+tracker = ConnectionTracker()
@@ -0,0 +1,52 @@
+import asyncio
+import json
+import threading
+from app.core.redis import get_redis
+from app.services.moderation import RETRACT_CHANNEL
+from app.services.rooms import ROOM_EVENTS_CHANNEL
+
+
+class RetractionListener:
+    """Relays room frames published elsewhere to this worker's room sockets: retractions from the
+    Celery moderation tier, membership changes and online counts from any web worker."""
+
+    def __init__(self):
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def start(self, on_retract):
+        if self._thread and self._thread.is_alive():
+            return
+        loop = asyncio.get_running_loop()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(loop, on_retract), name="moderation-retractions", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self, loop, on_retract):
+        pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(RETRACT_CHANNEL, ROOM_EVENTS_CHANNEL)
+        try:
+            while not self._stop.is_set():
+                try:
+                    message = pubsub.get_message(timeout=1.0)
+                except Exception as e:
+                    print(f"[MODERATION ERROR] retraction listener: {e}")
+                    self._stop.wait(1.0)
+                    continue
+                if not message:
+                    continue
+                payload = json.loads(message["data"])
+                asyncio.run_coroutine_threadsafe(on_retract(payload["room_code"], payload["frame"]), loop)
+        finally:
+            pubsub.close()
+
+
+retractions = RetractionListener()
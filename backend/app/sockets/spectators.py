@@ -0,0 +1,211 @@
+import asyncio
+import uuid
+from collections import deque
+from dotenv import load_dotenv
+from starlette.responses import Response
+from app.core.metrics import SPECTATORS_OPEN, SPECTATOR_FRAMES_SKIPPED
+import os
+
+load_dotenv()
+
+# Frames each watched room keeps for spectators catching up (and for Last-Event-ID resumes)
+SPECTATOR_BUFFER = int(os.getenv("SPECTATOR_BUFFER", 256))
+# Seconds between keepalive comments on idle streams, so proxies don't cut them
+SPECTATOR_KEEPALIVE = float(os.getenv("SPECTATOR_KEEPALIVE", 15))
+
+KEEPALIVE = b": keepalive\n\n"
+
+
+def encode(event_id: str, frame: str) -> bytes:
+    """One server-sent event; a multi-line frame becomes several data lines."""
+    data = "".join(f"data: {line}\n" for line in frame.split("\n"))
+    return f"id: {event_id}\n{data}\n".encode()
+
+
+class Viewer:
+    """One spectator stream: its position in the room feed and the future it sleeps on."""
+
+    __slots__ = ("position", "waiter", "gone")
+
+    def __init__(self, position: int):
+        self.position = position
+        self.waiter: asyncio.Future | None = None
+        self.gone = False
+
+    def wake(self):
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    def leave(self):
+        """The peer disconnected: end the stream at its next wake-up."""
+        self.gone = True
+        self.wake()
+
+
+class RoomFeed:
+    """Frames broadcast in one room, encoded once and shared by all of its spectators.
+
+    A ring of the last SPECTATOR_BUFFER events: each viewer only holds its position in it,
+    so a broadcast costs one append plus a wake-up per waiting viewer, whatever its size. A
+    viewer that falls behind the ring skips to the oldest event still in it.
+    """
+
+    __slots__ = ("epoch", "events", "next_id", "viewers", "waiting", "closed")
+
+    def __init__(self):
+        # Event ids are "<epoch>.<n>": a Last-Event-ID from another feed (or worker) starts live
+        self.epoch = uuid.uuid4().hex[:8]
+        self.events: deque[bytes] = deque(maxlen=SPECTATOR_BUFFER)
+        self.next_id = 1  # id of the next event; the oldest kept is next_id - len(events)
+        self.viewers: set[Viewer] = set()
+        self.waiting: list[Viewer] = []
+        self.closed = False
+
+    def publish(self, frame: str):
+        self.events.append(encode(f"{self.epoch}.{self.next_id}", frame))
+        self.next_id += 1
+        self.wake_all()
+
+    def wake_all(self):
+        waiting, self.waiting = self.waiting, []
+        for viewer in waiting:
+            viewer.wake()
+
+    def pending(self, viewer: Viewer) -> bytes:
+        """Events the viewer hasn't been sent yet, as one chunk."""
+        oldest = self.next_id - len(self.events)
+        if viewer.position < oldest:
+            SPECTATOR_FRAMES_SKIPPED.inc(oldest - viewer.position)
+            viewer.position = oldest
+        if viewer.position >= self.next_id:
+            return b""
+        start = len(self.events) - (self.next_id - viewer.position)
+        viewer.position = self.next_id
+        if start == len(self.events) - 1:
+            return self.events[-1]
+        return b"".join([self.events[i] for i in range(start, len(self.events))])
+
+    async def stream(self, viewer: Viewer):
+        """Chunks for one spectator until the room closes or the peer goes away."""
+        loop = asyncio.get_running_loop()
+        while not viewer.gone:
+            chunk = self.pending(viewer)
+            if chunk:
+                yield chunk
+                continue
+            if self.closed:
+                return
+            viewer.waiter = loop.create_future()
+            self.waiting.append(viewer)
+            await viewer.waiter
+            viewer.waiter = None
+            if not viewer.gone and not self.closed and viewer.position >= self.next_id:
+                # Woken with nothing new: the keepalive tick
+                yield KEEPALIVE
+
+
+class SpectatorHub:
+    """Read-only room streams of this worker: room_code -> RoomFeed.
+
+    Fed by the room ConnectionManager's broadcasts, so spectators get the same frames as the
+    room sockets (chat lines and JSON control frames). A feed only exists while someone watches:
+    broadcasting to an unwatched room is a dict miss. Spectators hold no membership, presence
+    or database session, and don't count against max_users.
+    """
+
+    def __init__(self):
+        self.rooms: dict[str, RoomFeed] = {}
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return sum(len(feed.viewers) for feed in self.rooms.values())
+
+    def publish(self, room_code: str, frame: str):
+        feed = self.rooms.get(room_code)
+        if feed is not None:
+            feed.publish(frame)
+
+    def join(self, room_code: str, last_event_id: str | None = None) -> tuple[RoomFeed, Viewer]:
+        """Start watching: live from now, or right after last_event_id while the ring still has it."""
+        feed = self.rooms.get(room_code)
+        if feed is None:
+            feed = self.rooms[room_code] = RoomFeed()
+        position = feed.next_id
+        epoch, _, number = (last_event_id or "").partition(".")
+        if epoch == feed.epoch and number.isdigit() and int(number) < feed.next_id:
+            position = int(number) + 1
+        viewer = Viewer(position)
+        feed.viewers.add(viewer)
+        SPECTATORS_OPEN.inc()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._keepalive())
+        return feed, viewer
+
+    def leave(self, room_code: str, feed: RoomFeed, viewer: Viewer):
+        if viewer not in feed.viewers:
+            return
+        feed.viewers.discard(viewer)
+        SPECTATORS_OPEN.dec()
+        if not feed.viewers and self.rooms.get(room_code) is feed:
+            del self.rooms[room_code]
+
+    def close(self, room_code: str, frame: str | None = None):
+        """Send a last frame, then end every stream of the room once it has been delivered."""
+        feed = self.rooms.pop(room_code, None)
+        if feed is None:
+            return
+        if frame is not None:
+            feed.publish(frame)
+        feed.closed = True
+        feed.wake_all()
+
+    def close_all(self, frame: str | None = None):
+        for room_code in list(self.rooms):
+            self.close(room_code, frame)
+
+    async def _keepalive(self):
+        while self.rooms:
+            await asyncio.sleep(SPECTATOR_KEEPALIVE)
+            for feed in tuple(self.rooms.values()):
+                feed.wake_all()
+
+
+spectators = SpectatorHub()
+
+
+async def _disconnected(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+class SpectatorStream(Response):
+    """text/event-stream of a room's feed, written straight to the ASGI server.
+
+    Unlike StreamingResponse, the only task per spectator besides the request's own is the
+    one waiting for the disconnect.
+    """
+
+    media_type = "text/event-stream"
+
+    def __init__(self, room_code: str, last_event_id: str | None = None):
+        self.room_code = room_code
+        self.last_event_id = last_event_id
+        self.status_code = 200
+        self.background = None
+        # No body attribute: no Content-Length
+        self.init_headers({"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    async def __call__(self, scope, receive, send):
+        feed, viewer = spectators.join(self.room_code, self.last_event_id)
+        gone = asyncio.ensure_future(_disconnected(receive))
+        gone.add_done_callback(lambda _: viewer.leave())
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            async for chunk in feed.stream(viewer):
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        except OSError:
+            pass
+        finally:
+            gone.cancel()
+            spectators.leave(self.room_code, feed, viewer)
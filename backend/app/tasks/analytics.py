@@ -0,0 +1,15 @@
+from app.core.celery_app import celery_app
+from app.db.database import session_scope
+from app.services.analytics import AnalyticsService
+
+
+@celery_app.task(name="tasks.aggregate_usage")
+def aggregate_usage():
+    with session_scope() as db:
+        try:
+            result = AnalyticsService.aggregate(db)
+            print(f"[ANALYTICS] rollup rows touched: {result}")
+            return result
+        except Exception as e:
+            db.rollback()
+            print(f"[ANALYTICS ERROR] {str(e)}")
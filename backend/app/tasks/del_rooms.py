@@ -2,22 +2,30 @@ from datetime import datetime, timezone
 from app.core.celery_app import celery_app
 from app.db.database import SessionLocal
 from app.models import Room, RoomMember
+from app.services.room_cache import RoomCache
+from app.services.room_expiry import RoomExpiry
+
+CLEAN_BATCH = 500  # room ids per IN (...)
 
 @celery_app.task(name="tasks.clean_expired_rooms")
 def clean_expired_rooms():
     db = SessionLocal()
     try:
         now = datetime.now(timezone.utc)
-        expired_rooms = db.query(Room).filter(Room.expires_at <= now).all()
+        expired_rooms = db.query(Room.id, Room.code).filter(Room.expires_at <= now).all()
 
+        # Set-based deletes: messages are not touched, they expire with their time partition
+        # (tasks.clean_expired_messages) instead of being cascaded row by row
         deleted_count = 0
-        for room in expired_rooms:
-            # Primero eliminar los miembros si hay relación
-            db.query(RoomMember).filter(RoomMember.room_id == room.id).delete()
-            db.delete(room)
-            deleted_count += 1
+        codes = [room.code for room in expired_rooms]
+        for start in range(0, len(expired_rooms), CLEAN_BATCH):
+            room_ids = [room.id for room in expired_rooms[start:start + CLEAN_BATCH]]
+            db.query(RoomMember).filter(RoomMember.room_id.in_(room_ids)).delete(synchronize_session=False)
+            deleted_count += db.query(Room).filter(Room.id.in_(room_ids)).delete(synchronize_session=False)
 
         db.commit()
+        RoomCache.invalidate(*codes)
+        RoomExpiry.cancel(*codes)
 
         print(f"[CLEANER] {deleted_count} expired rooms deleted at {now}")
         return deleted_count
@@ -0,0 +1,33 @@
+import uuid
+from dotenv import load_dotenv
+from app.agents.compaction import MemoryCompaction
+from app.core.celery_app import celery_app
+from app.db.database import session_scope
+import os
+
+load_dotenv()
+
+MEMORY_COMPACT_BATCH = int(os.getenv("MEMORY_COMPACT_BATCH", 500))  # conversations queued per sweep
+
+
+@celery_app.task(name="tasks.compact_memory_sweep")
+def compact_memory_sweep():
+    """Queue one compaction per conversation with window summaries over budget."""
+    with session_scope() as db:
+        conversation_ids = MemoryCompaction.pending(db, MEMORY_COMPACT_BATCH)
+    for conversation_id in conversation_ids:
+        compact_conversation_memory.delay(str(conversation_id))
+    print(f"[MEMORY] {len(conversation_ids)} conversations queued for compaction")
+    return len(conversation_ids)
+
+
+@celery_app.task(name="tasks.compact_conversation_memory", bind=True, max_retries=3)
+def compact_conversation_memory(self, conversation_id: str):
+    with session_scope() as db:
+        try:
+            return MemoryCompaction.compact(db, uuid.UUID(conversation_id))
+        except Exception as e:
+            db.rollback()
+            print(f"[MEMORY ERROR] compaction of {conversation_id}: {e}")
+            # Merges already committed stay; the retry carries on from there
+            raise self.retry(exc=e, countdown=60)
@@ -0,0 +1,18 @@
+from app.core.celery_app import celery_app
+from app.db.database import session_scope
+from app.services.message_archive import MessageArchive
+
+
+@celery_app.task(name="tasks.clean_expired_messages")
+def clean_expired_messages():
+    """Archive room messages past retention and drop their partitions (and create the ones ahead)."""
+    with session_scope() as db:
+        try:
+            archived = MessageArchive.expire(db)
+        except Exception as e:
+            db.rollback()
+            print(f"[ARCHIVE ERROR] {e}")
+            raise
+    for path, count in archived:
+        print(f"[ARCHIVE] {count} messages archived to {path}")
+    return sum(count for _, count in archived)
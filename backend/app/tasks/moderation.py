@@ -0,0 +1,52 @@
+import uuid
+from dotenv import load_dotenv
+from app.core.celery_app import celery_app
+from app.db.database import session_scope
+from app.models.rooms import RoomMessage
+from app.services.moderation import ModerationService
+from app.services.rooms import room_message_writer
+import os
+
+load_dotenv()
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+MODERATION_MODEL = os.getenv("MODERATION_MODEL", "omni-moderation-latest")
+_client = None
+
+
+def classify(text: str) -> bool:
+    """Slow tier: OpenAI's moderation endpoint. Without a key nothing is flagged."""
+    global _client
+    if not OPENAI_API_KEY:
+        return False
+    if _client is None:
+        from openai import OpenAI
+        _client = OpenAI(api_key=OPENAI_API_KEY)
+    return _client.moderations.create(model=MODERATION_MODEL, input=text).results[0].flagged
+
+
+@celery_app.task(name="tasks.moderate_room_message", bind=True, max_retries=3)
+def moderate_room_message(self, room_code: str, message_id: str, line: str, text: str, retracted: bool = False):
+    if not retracted:
+        if not classify(text):
+            return False
+        # Sockets first: the message is already on screen, the stored row can follow
+        ModerationService.publish_retraction(room_code, message_id, line)
+
+    if self.request.is_eager:
+        # Eager mode runs in the web process, which holds the write-behind buffer itself
+        room_message_writer.flush()
+
+    with session_scope() as db:
+        deleted = db.query(RoomMessage).filter(RoomMessage.id == uuid.UUID(message_id)).delete()
+        db.commit()
+
+    if not deleted and not self.request.is_eager:
+        # Still buffered in the write-behind queue; try again once it had time to flush
+        # args=(): the first run was enqueued positionally, and retry() keeps request.args otherwise
+        raise self.retry(
+            args=(),
+            kwargs={"room_code": room_code, "message_id": message_id, "line": line, "text": text, "retracted": True},
+            countdown=room_message_writer.flush_interval * 2,
+        )
+    return True
@@ -0,0 +1,172 @@
+"""Out-of-process agent workers: turn throughput as worker processes are added, and redelivery on a crash.
+
+This process plays the web worker (AgentJobs) and serves fakeredis over TCP; agent workers
+are separate processes running app.agents.worker against the same Redis and SQLite file,
+with a fake chat model that sleeps --latency seconds per call (the LLM round trip). Also
+checks turns slower than AGENT_CLAIM_IDLE_MS are answered once (not reclaimed by another
+worker while they run) and jobs past their deadline are dropped without running.
+
+    cd backend && python -m benchmarks.agent_workers --workers 1 2 4 --turns 400
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from benchmarks import local
+
+
+def worker_process(concurrency: int, latency: float):
+    local.configure()
+    local.use_redis(os.environ["REDIS_URL"])
+    local.install_fake_llm(latency)
+
+    from app.agents import worker
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    worker.run(concurrency, stop)
+
+
+def start_workers(count: int, concurrency: int, latency: float) -> list:
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=worker_process, args=(concurrency, latency), daemon=True) for _ in range(count)]
+    for process in processes:
+        process.start()
+    return processes
+
+
+def stop_workers(processes: list):
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    for process in processes:
+        process.join(30)
+
+
+async def drive(conversations: list[tuple[str, str]], turns: int) -> tuple[float, list[float], int]:
+    """One turn in flight per conversation, like the chatbot socket's per-conversation lock."""
+    from app.agents.jobs import agent_jobs
+
+    agent_jobs.start()
+    latencies, errors = [], 0
+    per_conversation = turns // len(conversations)
+
+    async def chat(user_id: str, conversation_id: str):
+        nonlocal errors
+        for i in range(per_conversation):
+            started = time.perf_counter()
+            try:
+                await agent_jobs.run(conversation_id, user_id, f"hola {i}")
+                latencies.append(time.perf_counter() - started)
+            except Exception:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(chat(user_id, conversation_id) for user_id, conversation_id in conversations))
+    elapsed = time.perf_counter() - started
+    agent_jobs.stop()
+    return elapsed, sorted(latencies), errors
+
+
+async def crash(conversations: list[tuple[str, str]], concurrency: int, latency: float) -> int:
+    """Kill a worker mid-turn; the surviving one reclaims its pending jobs once they go idle."""
+    from app.agents.jobs import agent_jobs
+
+    agent_jobs.start()
+    doomed = start_workers(1, concurrency, latency)[0]
+    await asyncio.sleep(3)  # let it import and start reading
+    jobs = [asyncio.ensure_future(agent_jobs.run(conversation_id, user_id, "hola"))
+            for user_id, conversation_id in conversations[:concurrency * 2]]
+    await asyncio.sleep(latency / 2)
+    os.kill(doomed.pid, signal.SIGKILL)  # no chance to ack: its jobs stay pending
+    survivor = start_workers(1, concurrency, latency)
+    results = await asyncio.gather(*jobs, return_exceptions=True)
+    agent_jobs.stop()
+    stop_workers(survivor)
+    failed = [result for result in results if isinstance(result, BaseException)]
+    print(f"crash: killed a worker holding {concurrency} turns; {len(results) - len(failed)}/{len(results)} answered after redelivery")
+    return len(failed)
+
+
+async def slow_turns(conversations: list[tuple[str, str]], concurrency: int, latency: float) -> bool:
+    """Two workers whose turns outlast the claim idle time: each must still run (and be answered) once."""
+    from app.agents.jobs import AGENT_STREAM, AGENT_GROUP
+    from app.core.redis import get_redis
+
+    client = get_redis()
+    replies = "bench:slow-replies"
+    client.delete(replies)
+    processes = start_workers(2, concurrency, latency)
+    await asyncio.sleep(3)
+    fields = [
+        {"job_id": f"slow{i}", "conversation_id": conversation_id, "user_id": user_id, "input": "hola",
+         "reply_to": replies, "deadline": f"{time.time() + 60:.3f}"}
+        for i, (user_id, conversation_id) in enumerate(conversations[:concurrency])
+    ]
+    user_id, conversation_id = conversations[-1]
+    fields.append({"job_id": "expired", "conversation_id": conversation_id, "user_id": user_id, "input": "hola",
+                   "reply_to": replies, "deadline": f"{time.time() - 1:.3f}"})
+    for job in fields:
+        client.xadd(AGENT_STREAM, job)
+    deadline = time.monotonic() + latency * 4 + 10
+    while time.monotonic() < deadline and client.xlen(replies) < concurrency:
+        await asyncio.sleep(0.1)
+    # Long enough for a duplicate run to have been reclaimed and answered
+    await asyncio.sleep(latency * 2)
+    stop_workers(processes)
+    answered = [entry["job_id"] for _, entry in client.xrange(replies)]
+    pending = client.xpending(AGENT_STREAM, AGENT_GROUP)["pending"]
+    print(f"slow turns ({latency * 1000:.0f} ms, claim idle {os.environ['AGENT_CLAIM_IDLE_MS']} ms): "
+          f"{len(answered)} replies to {concurrency} jobs, {len(set(answered))} distinct; expired job "
+          f"{'answered' if 'expired' in answered else 'dropped'}; {pending} left pending")
+    return sorted(answered) == sorted(job["job_id"] for job in fields[:-1]) and pending == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=4, help="consumer threads per worker process")
+    parser.add_argument("--turns", type=int, default=400)
+    parser.add_argument("--conversations", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+
+    os.environ["REDIS_URL"] = local.serve_fake_redis(args.port)
+    os.environ["AGENT_MODE"] = "stream"
+    # Reclaim quickly in the crash scenario; inherited by the spawned workers
+    os.environ["AGENT_CLAIM_IDLE_MS"] = str(int(args.latency * 1000 * 3))
+    os.environ["AGENT_CLAIM_INTERVAL"] = "0.5"
+    local.configure()
+    local.setup()
+    local.use_redis(os.environ["REDIS_URL"])
+
+    users = local.create_users(args.conversations, prefix="agentjobs")
+    conversations = list(zip(
+        (user_id for user_id, _ in users),
+        local.create_conversations([user_id for user_id, _ in users]),
+    ))
+
+    baseline = None
+    for count in args.workers:
+        processes = start_workers(count, args.concurrency, args.latency)
+        time.sleep(3)  # imports and group setup, outside the timing
+        elapsed, latencies, errors = asyncio.run(drive(conversations, args.turns))
+        stop_workers(processes)
+        throughput = len(latencies) / elapsed
+        baseline = baseline or throughput
+        print(
+            f"{count} worker(s) x {args.concurrency} threads: {throughput:6.1f} turns/s "
+            f"({throughput / baseline:.1f}x)  p50 {latencies[len(latencies) // 2] * 1000:.0f} ms  "
+            f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.0f} ms  errors {errors}"
+        )
+
+    assert asyncio.run(crash(conversations, args.concurrency, args.latency)) == 0
+    assert asyncio.run(slow_turns(conversations, args.concurrency, args.latency * 6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Usage rollups: seed a few days of room and chatbot traffic, run the aggregation
+twice (full first window, then only new rows) and compare the /stats read against the
+equivalent GROUP BY over the raw tables. Also checks the rollup totals match.
+
+    cd backend && python -m benchmarks.analytics --messages 200000
+"""
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from benchmarks import local
+
+
+def seed(messages: int, start: datetime, span_hours: int, rng: random.Random):
+    from sqlalchemy import insert
+    from app.db.database import session_scope
+    from app.models.conversations import Conversation, Message
+    from app.models.rooms import Room, RoomMember, RoomMessage
+
+    def at():
+        return start + timedelta(seconds=rng.uniform(0, span_hours * 3600))
+
+    user_ids = [uuid.UUID(user_id) for user_id, _ in local.create_users(50, prefix=f"stats{rng.random()}")]
+    rooms = [{"id": uuid.uuid4(), "code": uuid.uuid4().hex[:8], "language": rng.choice(["en", "es", "fr"]),
+              "max_users": 2, "is_active": True, "created_at": at()} for _ in range(200)]
+    # One conversation per user and agent
+    pairs = rng.sample([(user_id, agent) for user_id in user_ids for agent in ("Dante", "Emma", None)], 120)
+    conversations = [{"id": uuid.uuid4(), "user_id": user_id, "agent_name": agent, "created_at": at()}
+                     for user_id, agent in pairs]
+
+    with session_scope() as db:
+        db.execute(insert(Room), rooms)
+        db.execute(insert(RoomMember), [
+            {"id": uuid.uuid4(), "room_id": room["id"], "user_id": rng.choice(user_ids), "joined_at": at()}
+            for room in rooms for _ in range(2)
+        ])
+        db.execute(insert(Conversation), conversations)
+        for offset in range(0, messages, 10_000):
+            batch = min(10_000, messages - offset)
+            db.execute(insert(RoomMessage), [
+                {"id": uuid.uuid4(), "room_id": rng.choice(rooms)["id"], "sender_name": rng.choice(user_ids),
+                 "content": "hola", "timestamp": at()}
+                for _ in range(batch)
+            ])
+            db.execute(insert(Message), [
+                {"id": uuid.uuid4(), "conversation_id": rng.choice(conversations)["id"],
+                 "sender": rng.choice(["human", "ai"]), "content": "hola", "created_at": at()}
+                for _ in range(batch)
+            ])
+        db.commit()
+
+
+def timed(label: str, fn):
+    started = time.perf_counter()
+    result = fn()
+    print(f"{label:<34} {(time.perf_counter() - started) * 1000:>9.1f} ms  {result}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Usage rollup benchmark")
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument("--hours", type=int, default=72)
+    args = parser.parse_args()
+
+    local.configure()
+    local.setup()
+
+    from sqlalchemy import func
+    from app.db.database import session_scope
+    from app.models.analytics import ChatActivityHourly, RoomActivityHourly
+    from app.models.conversations import Message
+    from app.models.rooms import Room, RoomMessage
+    from app.services import analytics
+    from app.services.analytics import AnalyticsService
+
+    rng = random.Random(3)
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    analytics.ANALYTICS_BACKFILL_HOURS = args.hours + 2
+    seed(args.messages, now - timedelta(hours=args.hours), args.hours - 1, rng)
+
+    with session_scope() as db:
+        timed("first run (whole window)", lambda: AnalyticsService.aggregate(db, now + timedelta(hours=1)))
+
+    seed(args.messages // 20, now + timedelta(hours=1), 1, rng)
+    with session_scope() as db:
+        timed(f"incremental run ({args.messages // 20} new)", lambda: AnalyticsService.aggregate(db, now + timedelta(hours=3)))
+        timed("incremental run (nothing new)", lambda: AnalyticsService.aggregate(db, now + timedelta(hours=3, minutes=5)))
+
+        since = now - timedelta(hours=args.hours + 2)
+        points = timed("read rollup (rooms)", lambda: len(AnalyticsService.room_series(db, since)))
+        timed("same from raw room_messages", lambda: len(
+            db.query(analytics._hour(db, RoomMessage.timestamp), Room.language, func.count())
+            .join(Room, Room.id == RoomMessage.room_id)
+            .group_by(analytics._hour(db, RoomMessage.timestamp), Room.language)
+            .all()
+        ))
+        timed("read rollup (chat)", lambda: len(AnalyticsService.chat_series(db, since)))
+
+        rolled = db.query(func.sum(RoomActivityHourly.messages)).scalar()
+        raw = db.query(func.count(RoomMessage.id)).scalar()
+        rolled_chat = db.query(func.sum(ChatActivityHourly.user_messages + ChatActivityHourly.agent_messages)).scalar()
+        raw_chat = db.query(func.count(Message.id)).scalar()
+        print(f"room messages rolled {rolled} / raw {raw}, chat messages rolled {rolled_chat} / raw {raw_chat}, {points} hourly points")
+        assert rolled == raw and rolled_chat == raw_chat
+
+    late_writes(now + timedelta(hours=3, minutes=10))
+
+
+def late_writes(stamped: datetime):
+    """Messages a write-behind queue holds through a database outage land after runs that passed their
+    stamp; the window stops at them until they are written, so they are counted."""
+    from sqlalchemy import create_engine, func
+    from sqlalchemy.orm import sessionmaker
+    from app.db.database import SessionLocal, session_scope
+    from app.db.write_behind import WriteBehindQueue
+    from app.models.analytics import RoomActivityHourly
+    from app.models.rooms import RoomMessage
+    from app.services.analytics import AnalyticsService
+
+    away = sessionmaker(bind=create_engine("sqlite:////nonexistent/away.db"))
+    writer = WriteBehindQueue(RoomMessage, session_factory=away, stamp="timestamp")
+    with session_scope() as db:
+        room_id, sender = db.query(RoomMessage.room_id, RoomMessage.sender_name).first()
+    for _ in range(100):
+        writer.put({"id": uuid.uuid4(), "room_id": room_id, "sender_name": sender, "content": "hola", "timestamp": stamped})
+    writer.flush()
+    held = WriteBehindQueue.held_since()
+    with session_scope() as db:
+        AnalyticsService.aggregate(db, stamped + timedelta(hours=2))
+
+    writer.session_factory = SessionLocal
+    writer.stop()
+    with session_scope() as db:
+        AnalyticsService.aggregate(db, stamped + timedelta(hours=2, minutes=5))
+        rolled = db.query(func.sum(RoomActivityHourly.messages)).scalar()
+        raw = db.query(func.count(RoomMessage.id)).scalar()
+    print(f"{writer.written} messages held through an outage: window held at {held:%H:%M}, "
+          f"room messages rolled {rolled} / raw {raw} once written, held now {WriteBehindQueue.held_since()}")
+    assert writer.written == 100 and held == stamped and rolled == raw
+
+
+if __name__ == "__main__":
+    main()
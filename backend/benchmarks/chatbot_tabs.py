@@ -0,0 +1,121 @@
+"""Many tabs per conversation on the chatbot socket.
+
+Each user opens several sockets on the same conversation and every tab sends tagged
+requests. Direct replies must reach only the tab that asked; every --fanout-every'th
+request asks for a fan-out and must reach all of the user's tabs. Reports turn
+throughput and latency and checks the registry is empty once the tabs close. A socket on
+another user's conversation, or on an unknown one, must be refused.
+
+    cd backend && python -m benchmarks.chatbot_tabs --users 50 --tabs 5 --requests 10
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from benchmarks import local
+
+
+async def tab(url: str, name: str, requests: int, fanout_every: int, ready: asyncio.Barrier, expected_fanout: int):
+    import websockets
+
+    latencies, direct, fanned, foreign = [], 0, 0, 0
+    async with websockets.connect(url) as ws:
+        await ready.wait()  # every tab of every user is registered before anyone talks
+        sent_at = {}
+        for i in range(requests):
+            request_id = f"{name}-{i}"
+            fanout = fanout_every and i % fanout_every == 0
+            sent_at[request_id] = time.perf_counter()
+            await ws.send(json.dumps({"type": "message", "id": request_id, "text": f"hola {i}", "fanout": bool(fanout)}))
+
+        mine = requests
+        while mine or fanned < expected_fanout:
+            frame = json.loads(await asyncio.wait_for(ws.recv(), 60))
+            if frame.get("type") != "reply":
+                continue
+            if frame["id"] in sent_at:
+                mine -= 1
+                latencies.append(time.perf_counter() - sent_at.pop(frame["id"]))
+                if "prompt" in frame:
+                    fanned += 1
+                else:
+                    direct += 1
+            elif "prompt" in frame:
+                fanned += 1  # a sibling tab's fan-out
+            else:
+                foreign += 1  # a direct reply meant for another socket: must never happen
+        await ready.wait()  # keep the socket until every tab has its fan-outs
+    return latencies, direct, fanned, foreign
+
+
+async def refused(url: str) -> bool:
+    import websockets
+
+    try:
+        async with websockets.connect(url) as ws:
+            await asyncio.wait_for(ws.recv(), 5)
+    except websockets.InvalidStatus:
+        return True  # closed before the handshake completed
+    except (websockets.ConnectionClosed, asyncio.TimeoutError):
+        pass
+    return False
+
+
+async def run(server, tokens: list[str], conversations: list[str], tabs: int, requests: int, fanout_every: int):
+    fanout_per_tab = len(range(0, requests, fanout_every)) if fanout_every else 0
+    ready = asyncio.Barrier(len(tokens) * tabs)
+    jobs = [
+        tab(f"{server.ws_url}/ai/ws/chat/{conversation}?token={token}", f"u{u}t{t}", requests, fanout_every,
+            ready, fanout_per_tab * tabs)
+        for u, (token, conversation) in enumerate(zip(tokens, conversations))
+        for t in range(tabs)
+    ]
+    started = time.perf_counter()
+    results = await asyncio.gather(*jobs)
+    return results, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--tabs", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=10, help="requests per tab")
+    parser.add_argument("--fanout-every", type=int, default=5, help="0 disables fan-out requests")
+    parser.add_argument("--port", type=int, default=8769)
+    args = parser.parse_args()
+
+    local.configure(pool_size=10, max_overflow=10)
+    local.setup()
+
+    users = local.create_users(args.users, prefix="tabs")
+    conversations = local.create_conversations([user_id for user_id, _ in users])
+
+    from app.sockets.chatbot_ws import manager
+
+    with local.Server(args.port) as server:
+        intruder = asyncio.run(refused(f"{server.ws_url}/ai/ws/chat/{conversations[0]}?token={users[1][1]}"))
+        unknown = asyncio.run(refused(f"{server.ws_url}/ai/ws/chat/{uuid.uuid4()}?token={users[0][1]}"))
+        assert intruder and unknown, (intruder, unknown)
+        print("another user's conversation and an unknown one: refused")
+        results, elapsed = asyncio.run(run(
+            server, [token for _, token in users], conversations, args.tabs, args.requests, args.fanout_every,
+        ))
+        time.sleep(0.5)
+        left = len(manager)
+
+    latencies = sorted(latency for result in results for latency in result[0])
+    direct = sum(result[1] for result in results)
+    fanned = sum(result[2] for result in results)
+    foreign = sum(result[3] for result in results)
+    turns = len(latencies)
+    print(
+        f"{args.users} users x {args.tabs} tabs: {turns} turns in {elapsed:.2f}s ({turns / elapsed:,.0f}/s), "
+        f"p50 {latencies[turns // 2] * 1000:.0f} ms p99 {latencies[int(turns * 0.99)] * 1000:.0f} ms"
+    )
+    print(f"direct replies {direct}, fan-out frames {fanned}, misrouted {foreign}, sockets left in registry {left}")
+    assert foreign == 0 and left == 0
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Diff two benchmark result files produced by benchmarks.run.
+
+    python -m benchmarks.compare before.json after.json
+"""
+import argparse
+import json
+
+
+def change(before, after) -> str:
+    if not before or after is None:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    print(f"{before['meta'].get('commit')} -> {after['meta'].get('commit')}")
+    print(f"{'scenario':<18} {'ops/s':>10} {'p50':>10} {'p99':>10} {'bytes/op':>10}")
+    for name, new in after["scenarios"].items():
+        old = before["scenarios"].get(name)
+        if not old:
+            print(f"{name:<18} (new)")
+            continue
+        print(
+            f"{name:<18} "
+            f"{change(old['throughput_per_sec'], new['throughput_per_sec']):>10} "
+            f"{change(old['latency_ms'].get('p50'), new['latency_ms'].get('p50')):>10} "
+            f"{change(old['latency_ms'].get('p99'), new['latency_ms'].get('p99')):>10} "
+            f"{change(old.get('allocations', {}).get('retained_bytes_per_op'), new.get('allocations', {}).get('retained_bytes_per_op')):>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Concurrency check and timing for POST /api/v1/conversations.
+
+Many clients ask for the same (user, agent) pairs at once, half of them through fresh
+guests (whose users row is created on the way). Every caller of a pair must get the
+same id and exactly one row per pair may exist. Then the cached path is timed.
+
+    cd backend && python -m benchmarks.conversation_upsert --users 50 --callers 8
+"""
+import argparse
+import asyncio
+import time
+from benchmarks import local
+
+AGENTS = ["Dante", "Emma", "Vergil"]
+
+
+async def hammer(server, tokens: list[str], callers: int, concurrency: int) -> dict:
+    import httpx
+
+    async with httpx.AsyncClient(base_url=server.http_url, timeout=60, limits=httpx.Limits(max_connections=concurrency)) as http:
+        async def ask(token, agent):
+            response = await http.post(
+                "/api/v1/conversations",
+                params={"agent_name": agent},
+                headers={"Authorization": f"Bearer {token}"},
+            )
+            response.raise_for_status()
+            return (token, agent), response.json()["conversation_id"]
+
+        jobs = [ask(token, agent) for token in tokens for agent in AGENTS for _ in range(callers)]
+        started = time.perf_counter()
+        answers = await asyncio.gather(*jobs)
+        elapsed = time.perf_counter() - started
+
+    ids: dict = {}
+    for pair, conversation_id in answers:
+        ids.setdefault(pair, set()).add(conversation_id)
+    return {"calls": len(jobs), "seconds": elapsed, "ids": ids}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Conversation get-or-create under concurrency")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--callers", type=int, default=8, help="concurrent calls per (user, agent) pair")
+    parser.add_argument("--concurrency", type=int, default=20, help="requests in flight")
+    parser.add_argument("--port", type=int, default=8769)
+    args = parser.parse_args()
+
+    local.configure(pool_size=10, max_overflow=20)
+    local.setup()
+
+    from sqlalchemy import func
+    from app.db.database import session_scope
+    from app.models.conversations import Conversation
+    from app.services.guests import GuestService
+
+    tokens = [token for _, token in local.create_users(args.users // 2, prefix="owner")]
+    tokens += [GuestService.issue(f"guest{i}")[0] for i in range(args.users - len(tokens))]
+
+    with local.Server(args.port) as server:
+        cold = asyncio.run(hammer(server, tokens, args.callers, args.concurrency))
+        warm = asyncio.run(hammer(server, tokens, args.callers, args.concurrency))
+
+    with session_scope() as db:
+        rows = db.query(func.count(Conversation.id)).scalar()
+        pairs = db.query(Conversation.user_id, Conversation.agent_name).distinct().count()
+
+    split = [pair for pair, ids in cold["ids"].items() if len(ids) != 1]
+    changed = [pair for pair in cold["ids"] if cold["ids"][pair] != warm["ids"][pair]]
+    print(f"cold: {cold['calls']} calls in {cold['seconds']:.2f}s ({cold['calls'] / cold['seconds']:.0f}/s)")
+    print(f"warm: {warm['calls']} calls in {warm['seconds']:.2f}s ({warm['calls'] / warm['seconds']:.0f}/s, served from the cache)")
+    print(f"rows {rows}, distinct pairs {pairs}, pairs with diverging ids {len(split)}, changed after warm-up {len(changed)}")
+    assert rows == pairs == len(tokens) * len(AGENTS) and not split and not changed
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""Graceful drain: SIGTERM to a web worker holding room sockets and agent turns in flight.
+
+The worker is a child process running uvicorn in its main thread (so it gets the real
+signal handling), against this process's SQLite file and fakeredis over TCP (its own
+process, so this one's socket load doesn't slow Redis down), with a fake chat model that sleeps --latency seconds. Once sockets are open, messages sent and turns
+started, it is sent SIGTERM and must:
+
+- send every room socket a reconnect frame and close it with 1012, and refuse new sockets
+  the same way while draining;
+- finish the agent turns in flight and deliver their replies ("finish": latency below
+  DRAIN_TURN_TIMEOUT), or give up on them with the fallback reply ("cancel": above it);
+- answer a prompt arriving mid-drain with a reconnect frame carrying its id;
+- leave every room message written and every membership in place, each seat held for
+  ROOM_SEAT_GRACE seconds (GRACE here) for its client to reconnect;
+- report shutdown_duration_seconds by phase.
+
+Then another worker starts: the room sockets of half the members reconnect and are admitted
+on their held seat, the other half never come back and leave their rooms once GRACE is over.
+
+    cd backend && python -m benchmarks.drain --sockets 200
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import re
+import signal
+import threading
+import time
+import uuid
+from benchmarks import local
+
+GRACE = 8.0  # ROOM_SEAT_GRACE
+
+
+def redis_process(port: int):
+    local.serve_fake_redis(port)
+    threading.Event().wait()
+
+
+def server_process(port: int, latency: float, metrics):
+    local.configure()
+    local.use_redis(os.environ["REDIS_URL"])
+    local.install_fake_llm(latency)
+
+    import uvicorn
+    from app.core.metrics import render
+    from main import app
+
+    # uvicorn re-raises the signal it caught once it has shut down; this keeps the process alive to report
+    signal.signal(signal.SIGTERM, lambda *_: None)
+    uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", backlog=4096)).run()
+    metrics.put(render())
+
+
+def seed(sockets: int, per_room: int) -> tuple[list, list]:
+    """Room sockets as (room_code, token) with an active membership each, and chatbot (conversation, token)."""
+    from sqlalchemy import insert, select
+    from app.db.database import session_scope
+    from app.models.rooms import Room, RoomMember
+
+    users = local.create_users(sockets, prefix=f"drain{uuid.uuid4().hex[:6]}")
+    codes = local.create_rooms(-(-sockets // per_room), capacity=per_room)
+    with session_scope() as db:
+        room_ids = dict(db.execute(select(Room.code, Room.id).where(Room.code.in_(codes))).all())
+        db.execute(insert(RoomMember), [
+            {"id": uuid.uuid4(), "room_id": room_ids[codes[i // per_room]], "user_id": uuid.UUID(user_id), "is_active": True}
+            for i, (user_id, _) in enumerate(users)
+        ])
+        local.count_seats(db, list(room_ids.values()))
+        db.commit()
+    rooms = [(codes[i // per_room], token) for i, (_, token) in enumerate(users)]
+    chatbots = list(zip(local.create_conversations([user_id for user_id, _ in users]), (token for _, token in users)))
+    return rooms, chatbots
+
+
+async def frames(ws) -> tuple[list[str], int | None]:
+    """Everything the server sends until it closes the socket, and the close code."""
+    import websockets
+
+    received = []
+    try:
+        while True:
+            received.append(await asyncio.wait_for(ws.recv(), timeout=60))
+    except websockets.ConnectionClosed as e:
+        return received, e.rcvd.code if e.rcvd else None
+
+
+def reconnects(received: list[str]) -> list[dict]:
+    return [frame for frame in map(parse, received) if frame.get("type") == "reconnect"]
+
+
+def parse(text: str) -> dict:
+    try:
+        frame = json.loads(text)
+    except ValueError:
+        return {}
+    return frame if isinstance(frame, dict) else {}
+
+
+async def start_server(port: int, latency: float):
+    import httpx
+
+    context = multiprocessing.get_context("spawn")
+    metrics = context.Queue()
+    process = context.Process(target=server_process, args=(port, latency, metrics))
+    process.start()
+    async with httpx.AsyncClient() as client:
+        for _ in range(300):
+            try:
+                await client.get(f"http://127.0.0.1:{port}/")
+                break
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    return process, metrics
+
+
+async def scenario(name: str, args, port: int, rooms: list, chatbots: list, latency: float, turn_timeout: float) -> dict:
+    import websockets
+    from app.sockets.chatbot_ws import AGENT_UNAVAILABLE
+
+    os.environ["DRAIN_TURN_TIMEOUT"] = str(turn_timeout)
+    process, metrics = await start_server(port, latency)
+    url = f"ws://127.0.0.1:{port}"
+
+    room_sockets = [await websockets.connect(f"{url}/ws/chat/{code}?token={token}") for code, token in rooms]
+    for i, ws in enumerate(room_sockets):
+        for m in range(args.messages):
+            await ws.send(f"mensaje {m} del socket {i}")
+    busy = [await websockets.connect(f"{url}/ai/ws/chat/{conversation}?token={token}")
+            for conversation, token in chatbots[:args.turns]]
+    idle = await websockets.connect(f"{url}/ai/ws/chat/{chatbots[-1][0]}?token={chatbots[-1][1]}")
+    for i, ws in enumerate(busy):
+        await ws.send(json.dumps({"type": "message", "id": f"turn{i}", "text": "hola"}))
+    # Room messages broadcast back (so they were queued for writing) and turns started
+    await asyncio.sleep(max(0.5, latency / 4))
+
+    collectors = [asyncio.ensure_future(frames(ws)) for ws in room_sockets + busy + [idle]]
+    started = time.perf_counter()
+    os.kill(process.pid, signal.SIGTERM)
+    await asyncio.sleep(0.1)
+
+    # Mid-drain (turns still running): a prompt on an open socket is handed back, a new socket is refused
+    await idle.send(json.dumps({"type": "message", "id": "late", "text": "hola"}))
+    code, token = rooms[0]
+    late, late_code = await frames(await websockets.connect(f"{url}/ws/chat/{code}?token={token}"))
+
+    results = await asyncio.gather(*collectors)
+    closed = time.perf_counter() - started
+    process.join(60)
+    text = metrics.get(timeout=10)
+
+    room_results, turn_results, (idle_frames, idle_code) = results[:len(rooms)], results[len(rooms):-1], results[-1]
+    assert late_code == 1012 and reconnects(late), (late, late_code)
+    assert all(code == 1012 and reconnects(received) for received, code in room_results)
+    assert idle_code == 1012 and any(frame.get("id") == "late" for frame in reconnects(idle_frames)), idle_frames
+    replies = []
+    for i, (received, code) in enumerate(turn_results):
+        reply = [frame for frame in map(parse, received) if frame.get("type") == "reply" and frame.get("id") == f"turn{i}"]
+        assert code == 1012 and len(reply) == 1 and reconnects(received), (received, code)
+        replies.append(reply[0]["text"])
+    unavailable = replies.count(AGENT_UNAVAILABLE)
+
+    total = re.search(r'shutdown_duration_seconds_sum\{phase="total"\} ([\d.e-]+)', text)
+    phases = dict(re.findall(r'shutdown_duration_seconds_sum\{phase="(\w+)"\} ([\d.e-]+)', text))
+    assert total, text
+    return {"name": name, "closed": closed, "replies": len(replies), "unavailable": unavailable,
+            "phases": {phase: float(seconds) for phase, seconds in phases.items()}}
+
+
+async def come_back(port: int, rooms: list) -> int:
+    """Another worker: the first half of the drained members reconnect; returns how many were admitted."""
+    import websockets
+
+    process, _ = await start_server(port, 0.0)
+
+    async def connect(code, token):
+        try:
+            return await websockets.connect(f"ws://127.0.0.1:{port}/ws/chat/{code}?token={token}")
+        except websockets.InvalidStatus:
+            return None
+
+    # All at once, as clients told to reconnect do; well within GRACE of the drain
+    sockets = [ws for ws in await asyncio.gather(*(connect(code, token) for code, token in rooms[:len(rooms) // 2])) if ws]
+    # The others' seats are released once GRACE is over, by this worker's room timer
+    await asyncio.sleep(GRACE + 2)
+    await asyncio.gather(*(ws.close() for ws in sockets))
+    os.kill(process.pid, signal.SIGTERM)
+    process.join(60)
+    return len(sockets)
+
+
+def held(codes: list[str]) -> tuple[int, int]:
+    """Active memberships of the rooms, and seats scheduled for release."""
+    from sqlalchemy import func
+    from app.core.redis import get_redis
+    from app.db.database import session_scope
+    from app.models.rooms import Room, RoomMember
+    from app.services.seat_release import SEAT_RELEASE_KEY
+
+    with session_scope() as db:
+        active = (db.query(func.count(RoomMember.id)).join(Room, Room.id == RoomMember.room_id)
+                  .filter(Room.code.in_(codes), RoomMember.is_active == True).scalar())
+    scheduled = sum(entry.split("|", 1)[0] in set(codes) for entry in get_redis().zrange(SEAT_RELEASE_KEY, 0, -1))
+    return active, scheduled
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sockets", type=int, default=200, help="room sockets (and users)")
+    parser.add_argument("--per-room", type=int, default=4)
+    parser.add_argument("--messages", type=int, default=5, help="messages sent per room socket")
+    parser.add_argument("--turns", type=int, default=20, help="agent turns in flight at SIGTERM")
+    parser.add_argument("--latency", type=float, default=2.0, help="fake LLM latency of the finish scenario")
+    parser.add_argument("--port", type=int, default=8791)
+    parser.add_argument("--redis-port", type=int, default=6391)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    context.Process(target=redis_process, args=(args.redis_port,), daemon=True).start()
+    os.environ["REDIS_URL"] = f"redis://127.0.0.1:{args.redis_port}"
+    os.environ["ROOM_SEAT_GRACE"] = str(GRACE)
+    local.configure()
+    local.setup()
+    local.use_redis(os.environ["REDIS_URL"])
+
+    from sqlalchemy import func
+    from app.db.database import session_scope
+    from app.models.rooms import RoomMessage
+
+    sent = 0
+    for name, latency, turn_timeout in (("finish", args.latency, args.latency * 3), ("cancel", args.latency * 3, args.latency / 2)):
+        rooms, chatbots = seed(args.sockets, args.per_room)
+        result = asyncio.run(scenario(name, args, args.port, rooms, chatbots, latency, turn_timeout))
+        sent += args.sockets * args.messages
+        with session_scope() as db:
+            written = db.query(func.count(RoomMessage.id)).scalar()
+        codes = sorted({code for code, _ in rooms})
+        active, scheduled = held(codes)
+        assert written == sent, (written, sent)
+        assert active == args.sockets and scheduled == args.sockets, (active, scheduled)
+        if name == "finish":
+            assert result["unavailable"] == 0, result
+        else:
+            assert result["unavailable"] == result["replies"], result
+        phases = "  ".join(f"{phase} {seconds:.2f}s" for phase, seconds in sorted(result["phases"].items()))
+        print(f"{name}: LLM {latency:.1f}s, turn deadline {turn_timeout:.1f}s: {args.sockets} room sockets and "
+              f"{result['replies']} turns ({result['unavailable']} given up) closed with 1012 in {result['closed']:.2f}s; "
+              f"{written:,} messages written, {active} memberships kept with their seat held\n    {phases}")
+
+    admitted = asyncio.run(come_back(args.port, rooms))
+    active, _ = held(codes)
+    print(f"another worker: {admitted}/{len(rooms) // 2} members reconnected on their seat, "
+          f"{len(rooms) - active}/{len(rooms) - len(rooms) // 2} who didn't came back released after {GRACE:.0f}s")
+    assert admitted == len(rooms) // 2 and active == len(rooms) // 2, (admitted, active)
+
+
+if __name__ == "__main__":
+    main()
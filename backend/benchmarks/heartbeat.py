@@ -0,0 +1,109 @@
+"""Heartbeat sweeps: room sockets answering pings, chatbot sockets busy on long turns, and a silent one.
+
+With a short WS_HEARTBEAT_INTERVAL and WS_IDLE_TIMEOUT, against an in-process uvicorn:
+
+- --sockets room sockets in --rooms rooms answer every ping; the time each sweep takes on the
+  event loop is reported, none of them may be reaped and every one stays in the room presence;
+- two chatbot tabs of one conversation send a prompt each while the fake model takes longer than
+  WS_IDLE_TIMEOUT per turn (the second waits on the conversation's turn lock): both get their reply;
+- a socket that never answers is closed with 1001.
+
+    cd backend && python -m benchmarks.heartbeat --sockets 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from benchmarks import local
+
+INTERVAL = 0.5
+IDLE = 2.0
+
+
+async def pong_forever(ws):
+    async for frame in ws:
+        if frame.startswith("{") and json.loads(frame).get("type") == "ping":
+            await ws.send(json.dumps({"type": "pong"}))
+
+
+async def run(server, args, users, codes, conversation_id):
+    import websockets
+    from app.services.presence import PresenceService
+    from app.sockets.heartbeat import tracker
+
+    durations = []
+    sweep = tracker.sweep
+
+    async def timed_sweep():
+        started = time.perf_counter()
+        try:
+            return await sweep()
+        finally:
+            durations.append(time.perf_counter() - started)
+
+    tracker.sweep = timed_sweep
+
+    room_users, (_, chat_token) = users[:-1], users[-1]
+    sockets, readers = [], []
+    for offset in range(0, len(room_users), 200):
+        batch = await asyncio.gather(*(
+            websockets.connect(f"{server.ws_url}/ws/chat/{codes[(offset + i) % len(codes)]}?token={token}")
+            for i, (_, token) in enumerate(room_users[offset:offset + 200])
+        ))
+        sockets += batch
+        readers += [asyncio.ensure_future(pong_forever(ws)) for ws in batch]
+
+    silent = await websockets.connect(f"{server.ws_url}/ws/chat/{codes[0]}?token={room_users[0][1]}")
+    tabs = [await websockets.connect(f"{server.ws_url}/ai/ws/chat/{conversation_id}?token={chat_token}") for _ in range(2)]
+
+    async def ask(ws, request_id):
+        await ws.send(json.dumps({"type": "message", "id": request_id, "text": "hola"}))
+        async for frame in ws:
+            if frame.startswith("{") and json.loads(frame).get("id") == request_id:
+                return time.perf_counter()
+
+    started = time.perf_counter()
+    answered = await asyncio.wait_for(asyncio.gather(ask(tabs[0], "first"), ask(tabs[1], "second")), args.latency * 4 + 10)
+    print(f"chatbot: two turns of {args.latency:.1f}s on one conversation (idle timeout {IDLE:.0f}s) answered after "
+          + ", ".join(f"{at - started:.1f}s" for at in answered))
+
+    await asyncio.sleep(IDLE + 2 * INTERVAL)
+    silent_closed = silent.close_code
+    reaped = sum(ws.close_code is not None for ws in sockets)
+    online = sum(await asyncio.gather(*(asyncio.to_thread(PresenceService.online_count, code) for code in codes)))
+    durations.sort()
+    print(f"{len(sockets):,} room sockets in {len(codes)} rooms, {len(durations)} sweeps: p50 "
+          f"{durations[len(durations) // 2] * 1000:.1f} ms  max {durations[-1] * 1000:.1f} ms; "
+          f"{reaped} reaped, {online:,} online; silent socket closed with {silent_closed}")
+
+    for reader in readers:
+        reader.cancel()
+    await asyncio.gather(*(ws.close() for ws in sockets + tabs))
+    assert silent_closed == 1001, silent_closed
+    assert reaped == 0 and online == len(sockets), (reaped, online)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sockets", type=int, default=2000)
+    parser.add_argument("--rooms", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=IDLE * 1.5, help="seconds per fake model call")
+    parser.add_argument("--port", type=int, default=8796)
+    args = parser.parse_args()
+
+    os.environ["WS_HEARTBEAT_INTERVAL"] = str(INTERVAL)
+    os.environ["WS_IDLE_TIMEOUT"] = str(IDLE)
+    local.configure(pool_size=5)
+    local.setup(llm_latency=args.latency)
+
+    users = local.create_users(args.sockets + 1, prefix="heartbeat")
+    codes = local.create_rooms(args.rooms, capacity=args.sockets)
+    local.seat([(codes[i % len(codes)], user_id) for i, (user_id, _) in enumerate(users[:-1])])
+    conversation_id = local.create_conversations([users[-1][0]])[0]
+    with local.Server(args.port) as server:
+        asyncio.run(run(server, args, users, codes, conversation_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""Local stand-ins used by the benchmark scripts: file-backed SQLite, fakeredis and an in-process uvicorn."""
+import os
+import tempfile
+import threading
+import time
+
+
+def configure(pool_size: int = 5, max_overflow: int = 10):
+    """Must run before anything under app/ is imported, since settings are read at import time."""
+    default_db = os.path.join(tempfile.gettempdir(), "onlinex-bench.sqlite")
+    if "DATABASE_URL" not in os.environ:
+        # WAL and shared-memory files too: a stale WAL would be replayed into the new database
+        for path in (default_db, f"{default_db}-wal", f"{default_db}-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{default_db}")
+    os.environ.setdefault("SECRET_KEY", "local-benchmark-secret")
+    os.environ.setdefault("ALGHORITHM", "HS256")
+    os.environ.setdefault("REDIS_URL", "redis://localhost:6379")
+    os.environ["DB_POOL_SIZE"] = str(pool_size)
+    os.environ["DB_MAX_OVERFLOW"] = str(max_overflow)
+
+
+def setup(llm_latency: float = 0.0):
+    import fakeredis
+    from app.core.redis import set_redis
+    from app.db.database import engine
+    from app.models import Base
+
+    server = fakeredis.FakeServer()
+    set_redis(
+        fakeredis.FakeRedis(server=server, decode_responses=True),
+        fakeredis.FakeRedis(server=server),
+    )
+    if engine.dialect.name == "sqlite":
+        # WAL lets the write-behind threads and request handlers write concurrently
+        with engine.connect() as connection:
+            connection.exec_driver_sql("PRAGMA journal_mode=WAL")
+    Base.metadata.create_all(engine)
+    install_fake_llm(llm_latency)
+
+
+def serve_fake_redis(port: int):
+    """fakeredis over TCP, so several processes can share one Redis (e.g. web + agent workers)."""
+    from fakeredis import TcpFakeServer
+    from fakeredis.commands_mixins.streams_mixin import StreamsCommandsMixin
+
+    # fakeredis answers XREADGROUP COUNT n BLOCK ms right away when nothing is there;
+    # make it wait like Redis does, or idle consumers spin
+    original = StreamsCommandsMixin._xreadgroup
+
+    def blocking_xreadgroup(self, consumer_name, group_params, count, noack, min_idle_time, first_pass):
+        return original(self, consumer_name, group_params, count, noack, min_idle_time, False) or None
+
+    StreamsCommandsMixin._xreadgroup = blocking_xreadgroup
+
+    server = TcpFakeServer(("127.0.0.1", port), server_type="redis")
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"redis://127.0.0.1:{port}"
+
+
+def use_redis(url: str):
+    """Point the shared clients at a real (or TCP fake) Redis instead of the in-process fake."""
+    import redis
+    from app.core.redis import set_redis
+
+    set_redis(redis.Redis.from_url(url, decode_responses=True), redis.Redis.from_url(url))
+
+
+def install_fake_llm(latency: float = 0.0):
+    """Pre-fill main_agent's LLM pool so every profile answers from a local fake model."""
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+    from app.agents import main_agent
+    from app.prompts.profiles import PROFILES
+
+    class SlowFakeChatModel(FakeListChatModel):
+        latency: float = 0.0
+
+        def _call(self, *args, **kwargs):
+            if self.latency:
+                time.sleep(self.latency)
+            return super()._call(*args, **kwargs)
+
+    for profile in PROFILES.values():
+        key = f"{profile['model']}:{profile['temperature']}"
+        main_agent.LLM_POOL[key] = SlowFakeChatModel(
+            responses=["Respuesta de prueba del agente local."],
+            latency=latency,
+        )
+    main_agent.AGENT_POOL.clear()
+
+
+def create_users(count: int, prefix: str = "bench") -> list[tuple[str, str]]:
+    """Insert registered users in one batch and return (user_id, token) pairs."""
+    import uuid
+    from sqlalchemy import insert
+    from app.db.database import session_scope
+    from app.models.user import User
+    from app.services.jwt import JWTService
+
+    rows = [
+        {"id": uuid.uuid4(), "username": f"{prefix}{i}", "type_user": "register", "is_active": True}
+        for i in range(count)
+    ]
+    with session_scope() as db:
+        db.execute(insert(User), rows)
+        db.commit()
+
+    return [
+        (str(row["id"]), JWTService.create_access_token({
+            "id": str(row["id"]),
+            "username": row["username"],
+            "type_user": "register",
+        }))
+        for row in rows
+    ]
+
+
+def create_rooms(count: int, capacity: int, language: str = "en") -> list[str]:
+    from datetime import datetime, timedelta, timezone
+    from sqlalchemy import insert
+    from app.db.database import session_scope
+    from app.models.rooms import Room
+    from app.services.rooms import RoomService
+
+    expires_at = datetime.now(timezone.utc) + timedelta(hours=24)
+    codes = [RoomService.generate_room_code() for _ in range(count)]
+    with session_scope() as db:
+        db.execute(insert(Room), [
+            {
+                "code": code,
+                "name": code,
+                "max_users": capacity,
+                "language": language,
+                "is_public": True,
+                "expires_at": expires_at,
+                "is_active": True,
+            }
+            for code in codes
+        ])
+        db.commit()
+    return codes
+
+
+def seat(members: list[tuple[str, str]]):
+    """Active memberships for (room_code, user_id) pairs, as /rooms/join leaves them; room sockets need one."""
+    import uuid
+    from datetime import datetime, timezone
+    from sqlalchemy import insert, select
+    from app.db.database import session_scope
+    from app.models.rooms import Room, RoomMember
+
+    joined = datetime.now(timezone.utc)
+    with session_scope() as db:
+        room_ids = dict(db.execute(select(Room.code, Room.id).where(Room.code.in_({code for code, _ in members}))).all())
+        db.execute(insert(RoomMember), [
+            {"id": uuid.uuid4(), "room_id": room_ids[code], "user_id": uuid.UUID(user_id),
+             "is_host": False, "is_active": True, "joined_at": joined}
+            for code, user_id in members
+        ])
+        count_seats(db, list(room_ids.values()))
+        db.commit()
+
+
+def count_seats(db, room_ids: list):
+    """Bring rooms.seats_taken in line with memberships inserted directly, past RoomService."""
+    from sqlalchemy import distinct, func, select, update
+    from app.models.rooms import Room, RoomMember
+
+    db.execute(
+        update(Room)
+        .where(Room.id.in_(room_ids))
+        .values(seats_taken=select(func.count(distinct(RoomMember.user_id)))
+                .where(RoomMember.room_id == Room.id, RoomMember.is_active == True)
+                .scalar_subquery()),
+        execution_options={"synchronize_session": False},
+    )
+
+
+def create_conversations(user_ids: list[str], agent_name: str = "default") -> list[str]:
+    import uuid
+    from sqlalchemy import insert
+    from app.db.database import session_scope
+    from app.models.conversations import Conversation
+
+    rows = [
+        {"id": uuid.uuid4(), "user_id": uuid.UUID(user_id), "agent_name": agent_name}
+        for user_id in user_ids
+    ]
+    with session_scope() as db:
+        db.execute(insert(Conversation), rows)
+        db.commit()
+    return [str(row["id"]) for row in rows]
+
+
+class Server:
+    """Runs the FastAPI app with uvicorn on a background thread."""
+
+    def __init__(self, port: int = 8765):
+        import uvicorn
+        from main import app
+
+        self.port = port
+        self.server = uvicorn.Server(uvicorn.Config(
+            app, host="127.0.0.1", port=port, log_level="warning", backlog=4096,
+        ))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def http_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def ws_url(self) -> str:
+        return f"ws://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(10)
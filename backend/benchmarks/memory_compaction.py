@@ -0,0 +1,119 @@
+"""Agent memory compaction: a conversation that keeps adding window summaries, compacted
+after every few windows, against one that is never compacted.
+
+Reports, as the conversation grows, the summaries stored, their total size and the time
+to assemble the prompt memory (MemoryService.recall) with a warm index and from scratch.
+Merges go through merge_summaries on the local fake model and the Celery tasks run in
+eager mode; a final sweep picks up the uncompacted conversation's backlog. Also checks the row bound and the rehydrate watermark.
+
+    cd backend && python -m benchmarks.memory_compaction --windows 2000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from benchmarks import local
+
+WORDS = ("viaje japon tren receta lasagna gluten maraton entrenamiento router wifi guitarra acordes "
+         "plantas riego entrevista python ahorro presupuesto alergia postres").split()
+
+
+def recall_ms(db, conversation_id, cold: bool, samples: int = 5) -> float:
+    """Cold: a process that has no index yet embeds every summary first."""
+    from app.agents.memory import MemoryService
+
+    durations = []
+    for _ in range(samples):
+        if cold:
+            MemoryService.invalidate(conversation_id)
+        started = time.perf_counter()
+        MemoryService.recall(db, conversation_id, "que me recomendaste para el viaje?")
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--windows", type=int, default=2000, help="window summaries added to each conversation")
+    parser.add_argument("--sweep-every", type=int, default=8, help="windows between compaction sweeps")
+    args = parser.parse_args()
+
+    os.environ["MEMORY_EMBEDDER"] = "hashing"
+    os.environ["MEMORY_INDEX_DIR"] = tempfile.mkdtemp(prefix="onlinex-memory-")
+    os.environ["CELERY_TASK_ALWAYS_EAGER"] = "1"
+    local.configure()
+    local.setup()
+
+    from sqlalchemy import func
+    from app.agents.compaction import MemoryCompaction
+    from app.db.database import session_scope
+    from app.models.conversations import AgentMemorySummary
+    from app.tasks.memory import compact_conversation_memory, compact_memory_sweep
+
+    rng = random.Random(5)
+    users = local.create_users(2, prefix="compaction")
+    compacted, plain = (uuid.UUID(c) for c in local.create_conversations([user_id for user_id, _ in users]))
+    start = datetime.now(timezone.utc) - timedelta(days=365)
+    checkpoints = {c for c in (100, 250, 500, 1000, 2000, 5000, 10000) if c <= args.windows} | {args.windows}
+    bound = MemoryCompaction.max_summaries()
+
+    def stored(db, conversation_id) -> tuple[int, int]:
+        count, size = (
+            db.query(func.count(AgentMemorySummary.id), func.coalesce(func.sum(func.length(AgentMemorySummary.summary)), 0))
+            .filter(AgentMemorySummary.conversation_id == conversation_id)
+            .one()
+        )
+        return count, size
+
+    print(f"bound: {bound} summaries per conversation (keep, fan-in, depth from MEMORY_COMPACT_*)")
+    print(f"{'':>8} | {'compacted':^38} | {'never compacted':^38}")
+    print(f"{'windows':>8} | {'rows':>6} {'chars':>9} {'warm ms':>9} {'cold ms':>9} | {'rows':>6} {'chars':>9} {'warm ms':>9} {'cold ms':>9}")
+    sweep_seconds = []
+    with session_scope() as db:
+        for window in range(1, args.windows + 1):
+            created_at = start + timedelta(minutes=10 * window)
+            for conversation_id in (compacted, plain):
+                text = " ".join(rng.choices(WORDS, k=40))[:480]
+                db.add(AgentMemorySummary(conversation_id=conversation_id, summary=text, created_at=created_at))
+            db.commit()
+
+            if window % args.sweep_every == 0:
+                started = time.perf_counter()
+                compact_conversation_memory.delay(str(compacted))
+                sweep_seconds.append(time.perf_counter() - started)
+
+            if window in checkpoints:
+                rows, chars = stored(db, compacted)
+                plain_rows, plain_chars = stored(db, plain)
+                print(f"{window:>8} | {rows:>6} {chars:>9} {recall_ms(db, compacted, False):>9.2f} {recall_ms(db, compacted, True):>9.2f} | "
+                      f"{plain_rows:>6} {plain_chars:>9} {recall_ms(db, plain, False):>9.2f} {recall_ms(db, plain, True):>9.2f}")
+                assert rows <= bound + args.sweep_every, rows
+
+        newest = db.query(func.max(AgentMemorySummary.created_at)).filter(AgentMemorySummary.conversation_id == compacted).scalar()
+        assert newest == start + timedelta(minutes=10 * args.windows), "rehydrate watermark moved"
+        levels = dict(
+            db.query(AgentMemorySummary.level, func.count(AgentMemorySummary.id))
+            .filter(AgentMemorySummary.conversation_id == compacted)
+            .group_by(AgentMemorySummary.level)
+            .all()
+        )
+    print(f"levels after the last compaction: {dict(sorted(levels.items()))}")
+    print(f"compaction task (fake LLM): p50 {statistics.median(sweep_seconds) * 1000:.1f} ms  "
+          f"max {max(sweep_seconds) * 1000:.1f} ms over {len(sweep_seconds)} runs")
+
+    # The periodic sweep finds the never-compacted conversation and starts on its backlog
+    started = time.perf_counter()
+    queued = compact_memory_sweep.delay().get()
+    elapsed = time.perf_counter() - started
+    with session_scope() as db:
+        rows, _ = stored(db, plain)
+    print(f"sweep: {queued} conversation(s) queued; backlog {args.windows} -> {rows} summaries in {elapsed:.2f}s "
+          f"(at most MEMORY_COMPACT_MAX_MERGES merges per run)")
+
+
+if __name__ == "__main__":
+    main()
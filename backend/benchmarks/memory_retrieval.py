@@ -0,0 +1,132 @@
+"""Long-term memory retrieval at 10k summaries in one conversation.
+
+Seeds synthetic AgentMemorySummary rows with the local hashing embedder, then times the
+cold index build, loading it back from the on-disk cache, a warm recall (count check,
+query embedding, top-k and reading the k texts), the bare NumPy search, and an
+incremental sync after a new summary lands. Also checks a planted summary is recalled
+for a related question, and compares prompt size against pasting every summary.
+
+    cd backend && python -m benchmarks.memory_retrieval --summaries 10000
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from benchmarks import local
+
+TOPICS = [
+    "viaje a japon y presupuesto para el tren bala",
+    "receta de lasagna vegetariana sin gluten",
+    "entrenamiento para correr una media maraton",
+    "problemas con el router wifi y la velocidad de internet",
+    "aprender guitarra acordes basicos y ritmo",
+    "cuidado de plantas de interior y riego en invierno",
+    "preparar una entrevista de trabajo como desarrollador python",
+    "ahorro mensual y fondo de emergencia",
+]
+FILLER = "el usuario pregunto sobre y el agente explico con detalle varios puntos importantes".split()
+
+
+def summary_text(rng: random.Random) -> str:
+    words = rng.choice(TOPICS).split() + rng.sample(FILLER, 6) + rng.choice(TOPICS).split()[:3]
+    rng.shuffle(words)
+    return " ".join(words)
+
+
+def timed(samples: int, fn) -> tuple[float, float]:
+    durations = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - started)
+    durations.sort()
+    return statistics.median(durations) * 1000, durations[int(len(durations) * 0.99) - 1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--summaries", type=int, default=10_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+
+    import os
+    os.environ["MEMORY_EMBEDDER"] = "hashing"
+    os.environ["MEMORY_INDEX_DIR"] = tempfile.mkdtemp(prefix="onlinex-memory-")
+    local.configure()
+    local.setup()
+
+    from sqlalchemy import insert
+    from app.agents import memory
+    from app.agents.memory import MemoryIndex, MemoryService, get_embedder
+    from app.db.database import session_scope
+    from app.models.conversations import AgentMemorySummary
+
+    rng = random.Random(11)
+    (user_id, _), = local.create_users(1, prefix="memory")
+    conversation_id = uuid.UUID(local.create_conversations([user_id])[0])
+    start = datetime.now(timezone.utc) - timedelta(days=30)
+    planted = "el usuario tiene alergia al mani y quiere evitarlo en las recetas de postres"
+    rows = [
+        {"id": uuid.uuid4(), "conversation_id": conversation_id, "summary": summary_text(rng),
+         "created_at": start + timedelta(seconds=i)}
+        for i in range(args.summaries - 1)
+    ]
+    rows.insert(rng.randrange(len(rows)), {"id": uuid.uuid4(), "conversation_id": conversation_id,
+                                           "summary": planted, "created_at": start - timedelta(seconds=1)})
+    with session_scope() as db:
+        for offset in range(0, len(rows), 5000):
+            db.execute(insert(AgentMemorySummary), rows[offset:offset + 5000])
+        db.commit()
+
+    queries = [rng.choice(TOPICS) for _ in range(args.queries)]
+    with session_scope() as db:
+        started = time.perf_counter()
+        index = MemoryService.index_for(db, conversation_id)
+        cold = (time.perf_counter() - started) * 1000
+        size = os.path.getsize(MemoryIndex.path(conversation_id))
+        print(f"cold build: {len(index)} summaries embedded and cached in {cold:.0f} ms "
+              f"({index.vectors.nbytes / 1024:.0f} KiB of vectors, {size / 1024:.0f} KiB on disk)")
+
+        MemoryService.clear()
+        p50, p99 = timed(20, lambda: (MemoryService.clear(), MemoryService.index_for(db, conversation_id)))
+        print(f"load from disk cache:       p50 {p50:6.2f} ms  p99 {p99:6.2f} ms")
+
+        query_iter = iter(queries * 2)
+        p50, p99 = timed(args.queries, lambda: MemoryService.recall(db, conversation_id, next(query_iter), args.top_k))
+        print(f"recall (warm, end to end):  p50 {p50:6.2f} ms  p99 {p99:6.2f} ms")
+
+        vectors = [get_embedder().embed_query(query) for query in queries]
+        vector_iter = iter(vectors * 2)
+        p50, p99 = timed(args.queries, lambda: index.search(next(vector_iter), args.top_k))
+        print(f"numpy top-{args.top_k} search only:    p50 {p50:6.3f} ms  p99 {p99:6.3f} ms")
+
+        def new_summary():
+            db.add(AgentMemorySummary(id=uuid.uuid4(), conversation_id=conversation_id,
+                                      summary=summary_text(rng), created_at=datetime.now(timezone.utc)))
+            db.commit()
+            MemoryService.index_for(db, conversation_id)
+
+        p50, p99 = timed(50, new_summary)
+        print(f"sync after a new summary:   p50 {p50:6.2f} ms  p99 {p99:6.2f} ms (insert + embed one; disk copy rewritten every MEMORY_INDEX_FLUSH)")
+
+        # A fresh process starts from the older disk copy and embeds only what came after it
+        MemoryService.clear()
+        stale = MemoryIndex.load(conversation_id, get_embedder().name)
+        index = MemoryService.index_for(db, conversation_id)
+        assert len(index) == db.query(AgentMemorySummary).filter_by(conversation_id=conversation_id).count()
+        print(f"cold process: {len(index) - len(stale)} summaries newer than the disk copy embedded on load")
+
+        recalled = MemoryService.recall(db, conversation_id, "que postres puedo hacer si soy alergico al mani?", args.top_k)
+        all_chars = sum(len(row["summary"]) for row in rows)
+        print(f"planted summary recalled: {planted in recalled}; prompt memory {sum(map(len, recalled))} chars "
+              f"vs {all_chars:,} chars for every summary")
+        assert planted in recalled
+    assert memory.MEMORY_EMBEDDER == "hashing"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Room message expiry: cost of deleting old messages before and after time partitioning.
+
+Seeds --days of expired rooms (24h each) holding --messages room messages on a database
+built with `alembic upgrade head`, then:
+
+- after: MessageArchive.expire() streams every period past retention to gzipped NDJSON and
+  drops its partition (Postgres) or range-deletes it (SQLite);
+- restore: the archives are loaded back, and must give back every row;
+- before: the old clean_expired_rooms, loading each expired room and deleting it with its
+  messages through the ORM cascade, over the same rooms and messages;
+- bulk set-based delete of the remaining expired rooms (the new clean_expired_rooms);
+- peak Python memory of archiving two days and the whole table (tracemalloc).
+
+    cd backend && python -m benchmarks.message_expiry --messages 500000
+    DATABASE_URL=postgresql://... python -m benchmarks.message_expiry   # against an empty database
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+from benchmarks import local
+
+
+def seed(args, rng: random.Random, now: datetime) -> int:
+    from sqlalchemy import insert
+    from app.db.database import session_scope
+    from app.models.rooms import Room, RoomMessage
+
+    first = now - timedelta(days=args.days)
+    span = (now - first) / args.rooms
+    rooms = [{"id": uuid.uuid4(), "code": uuid.uuid4().hex[:8], "language": "es", "max_users": 2, "is_active": False,
+              "created_at": first + span * i - timedelta(hours=24), "expires_at": first + span * i}
+             for i in range(args.rooms)]
+    sender = uuid.uuid4()
+    with session_scope() as db:
+        db.execute(insert(Room), rooms)
+        for offset in range(0, args.messages, 20_000):
+            batch = []
+            for _ in range(min(20_000, args.messages - offset)):
+                room = rng.choice(rooms)
+                batch.append({"id": uuid.uuid4(), "room_id": room["id"], "sender_name": sender,
+                              "content": f"mensaje {rng.randrange(10**6)} de prueba",
+                              "timestamp": room["created_at"] + timedelta(seconds=rng.uniform(0, 86_399))})
+            db.execute(insert(RoomMessage), batch)
+            db.commit()
+    return len(rooms)
+
+
+def legacy_clean(db, now: datetime) -> tuple[int, int]:
+    """clean_expired_rooms as it was: each room deleted with its messages by the ORM cascade
+    (one SELECT of the collection per room, then a DELETE per message)."""
+    from app.models.rooms import Room, RoomMember, RoomMessage
+
+    rooms = db.query(Room).filter(Room.expires_at <= now).all()
+    messages = 0
+    for room in rooms:
+        db.query(RoomMember).filter(RoomMember.room_id == room.id).delete()
+        for message in db.query(RoomMessage).filter(RoomMessage.room_id == room.id).all():
+            db.delete(message)
+            messages += 1
+        db.delete(room)
+    db.commit()
+    return len(rooms), messages
+
+
+def peak_memory(fn) -> float:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=500_000)
+    parser.add_argument("--rooms", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--retention", type=int, default=7)
+    parser.add_argument("--partition", choices=["day", "week"], default="day")
+    args = parser.parse_args()
+
+    os.environ["ROOM_MESSAGE_ARCHIVE_DIR"] = tempfile.mkdtemp(prefix="onlinex-archive-")
+    os.environ["ROOM_MESSAGE_RETENTION_DAYS"] = str(args.retention)
+    os.environ["ROOM_MESSAGE_PARTITION"] = args.partition
+    local.configure()
+
+    from alembic import command
+    from alembic.config import Config
+    from sqlalchemy import func, text
+    from app.db.database import engine, session_scope
+    from app.models.rooms import Room, RoomMessage
+    from app.services.message_archive import MessageArchive, MessagePartitions
+    from app.tasks.del_rooms import clean_expired_rooms
+
+    command.upgrade(Config(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")), "head")
+    local.setup()  # fakeredis for the room cache; the tables already exist
+    now = datetime.now(timezone.utc)
+    cutoff = MessagePartitions.cutoff(now)
+
+    with session_scope() as db:
+        partitioned = MessagePartitions.enabled(db)
+        if partitioned:
+            # A fresh database's first partition spans everything before the migration; seed into per-period ones
+            db.execute(text("DROP TABLE room_messages_legacy"))
+            db.commit()
+            MessagePartitions.cover(db, now - timedelta(days=args.days + 1), now + timedelta(days=1))
+    started = time.perf_counter()
+    rooms = seed(args, random.Random(5), now)
+    print(f"{engine.dialect.name}{' (partitioned)' if partitioned else ''}: seeded {rooms:,} rooms and "
+          f"{args.messages:,} messages over {args.days} days in {time.perf_counter() - started:.0f}s; "
+          f"retention {args.retention} days, cutoff {cutoff:%Y-%m-%d}")
+
+    with session_scope() as db:
+        old = db.query(func.count(RoomMessage.id)).filter(RoomMessage.timestamp < cutoff).scalar()
+
+        started = time.perf_counter()
+        archived = MessageArchive.expire(db, now)
+        after = time.perf_counter() - started
+        count = sum(rows for _, rows in archived)
+        size = sum(os.path.getsize(path) for path, _ in archived)
+        assert count == old, (count, old)
+        assert not db.query(RoomMessage.id).filter(RoomMessage.timestamp < cutoff).first()
+        print(f"\nafter:  {count:,} messages in {len(archived)} periods archived ({size / 2**20:.1f} MiB gzipped, "
+              f"{size / count:.0f} B/message) and {'dropped' if partitioned else 'range-deleted'} in {after:.2f}s "
+              f"({after / count * 1e6:.1f} us/message)")
+
+        if partitioned:
+            # The drop alone, without the archival pass in front of it
+            MessageArchive.restore(db, archived[0][0])
+            name, _, _ = MessagePartitions.partitions(db)[0]
+            started = time.perf_counter()
+            MessagePartitions.drop(db, name)
+            print(f"        dropping one partition: {(time.perf_counter() - started) * 1000:.1f} ms")
+
+        started = time.perf_counter()
+        restored = sum(MessageArchive.restore(db, path) for path, _ in archived)
+        elapsed = time.perf_counter() - started
+        assert restored == count == db.query(func.count(RoomMessage.id)).filter(RoomMessage.timestamp < cutoff).scalar()
+        print(f"restore: {restored:,} messages loaded back in {elapsed:.2f}s ({restored / elapsed:,.0f} rows/s)")
+
+        started = time.perf_counter()
+        rooms_deleted, deleted = legacy_clean(db, cutoff)
+        before = time.perf_counter() - started
+        print(f"before: {rooms_deleted:,} rooms and {deleted:,} messages deleted by the ORM cascade in {before:.2f}s "
+              f"({before / deleted * 1e6:.1f} us/message), {before / after:.0f}x the archive-and-drop time")
+
+        started = time.perf_counter()
+        remaining = db.query(func.count(Room.id)).filter(Room.expires_at <= now).scalar()
+        clean_expired_rooms()
+        elapsed = time.perf_counter() - started
+        print(f"bulk room delete: {remaining:,} expired rooms in {elapsed * 1000:.0f} ms (messages left to expire by time)")
+
+        # Memory: past one fetch batch (ROOM_MESSAGE_ARCHIVE_BATCH rows) the peak stays flat with the row count
+        path = os.path.join(tempfile.mkdtemp(), "probe.ndjson.gz")
+        peaks = []
+        for start in (now - timedelta(days=2), None):
+            window = db.query(func.count(RoomMessage.id))
+            rows = (window.filter(RoomMessage.timestamp >= start) if start else window).scalar()
+            peak = peak_memory(lambda: MessageArchive.write(MessageArchive.lines(MessageArchive.rows(db, start, now + timedelta(days=1))), path))
+            db.rollback()
+            peaks.append(f"{peak:.1f} MiB for {rows:,} rows")
+        print(f"archive memory: peak {', '.join(peaks)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Room message search: MessageSearch against LIKE scans on a multi-million-row room_messages.
+
+Seeds --messages rows (Zipf-distributed vocabulary) over --rooms rooms, one of which holds
+--big-room-share of all messages, through plain bulk inserts (on SQLite the FTS5 triggers
+index them as they land). Then times first pages and deep pages for rare, mid-frequency,
+common and two-word queries in a typical room and in the big one, next to the same query
+as content LIKE '%word%', and measures the write path (record_message + write-behind flush)
+with indexing on.
+
+    cd backend && python -m benchmarks.message_search --messages 2000000
+"""
+import argparse
+import random
+import statistics
+import string
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from benchmarks import local
+
+
+def vocabulary(rng: random.Random, size: int) -> list[str]:
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))))
+    return sorted(words)
+
+
+def seed(args, rng: random.Random, words: list[str], weights: list[float]) -> list:
+    from sqlalchemy import insert
+    from app.db.database import session_scope
+    from app.models.rooms import Room, RoomMessage
+
+    rooms = [{"id": uuid.uuid4(), "code": uuid.uuid4().hex[:8], "language": "es", "max_users": 2,
+              "is_active": True} for _ in range(args.rooms)]
+    big = rooms[0]["id"]
+    others = [room["id"] for room in rooms[1:]]
+    start = datetime.now(timezone.utc) - timedelta(days=30)
+    step = timedelta(days=30) / args.messages
+    sender = uuid.uuid4()
+
+    with session_scope() as db:
+        db.execute(insert(Room), rooms)
+        db.commit()
+        started = time.perf_counter()
+        for offset in range(0, args.messages, 20_000):
+            batch = min(20_000, args.messages - offset)
+            content = rng.choices(words, weights=weights, k=batch * 8)
+            db.execute(insert(RoomMessage), [
+                {"id": uuid.uuid4(), "sender_name": sender, "timestamp": start + step * (offset + i),
+                 "room_id": big if rng.random() < args.big_room_share else rng.choice(others),
+                 "content": " ".join(content[i * 8:i * 8 + 8])}
+                for i in range(batch)
+            ])
+            db.commit()
+        elapsed = time.perf_counter() - started
+    print(f"seeded {args.messages:,} messages in {elapsed:.0f}s ({args.messages / elapsed:,.0f} rows/s, FTS indexing included)")
+    return rooms
+
+
+def timed(fn, samples: int) -> float:
+    durations = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations) * 1000
+
+
+def like_page(db, room_id, words: list[str], limit: int):
+    from app.models.rooms import RoomMessage
+
+    query = db.query(RoomMessage.id, RoomMessage.content, RoomMessage.timestamp).filter(RoomMessage.room_id == room_id)
+    for word in words:
+        query = query.filter(RoomMessage.content.like(f"%{word}%"))
+    return query.order_by(RoomMessage.timestamp.desc(), RoomMessage.id.desc()).limit(limit + 1).all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=2_000_000)
+    parser.add_argument("--rooms", type=int, default=2000)
+    parser.add_argument("--big-room-share", type=float, default=0.1)
+    parser.add_argument("--vocabulary", type=int, default=20_000)
+    parser.add_argument("--samples", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    local.configure()
+    local.setup()
+
+    from sqlalchemy import func
+    from app.db.database import session_scope
+    from app.models.rooms import Room, RoomMessage
+    from app.services.message_search import MessageSearch
+    from app.services.rooms import RoomService, room_message_writer
+
+    rng = random.Random(7)
+    words = vocabulary(rng, args.vocabulary)
+    weights = [1 / rank for rank in range(1, len(words) + 1)]
+    rooms = seed(args, rng, words, weights)
+
+    queries = {
+        "rare": [words[5000]],
+        "mid": [words[100]],
+        "common": [words[2]],
+        "two words": [words[2], words[40]],
+    }
+    with session_scope() as db:
+        for label, room_id in (("typical room", rooms[1]["id"]), ("big room", rooms[0]["id"])):
+            room = db.query(Room).filter(Room.id == room_id).one()
+            size = db.query(func.count(RoomMessage.id)).filter(RoomMessage.room_id == room_id).scalar()
+            print(f"\n{label}: {size:,} messages")
+            print(f"{'query':>10} {'hits':>7} | {'search p1 ms':>12} {'page 5 ms':>10} | {'LIKE p1 ms':>10}")
+            for name, terms in queries.items():
+                text = " ".join(terms)
+                hits = 0
+                cursor, page5_cursor = None, None
+                for page in range(5):
+                    items, cursor = MessageSearch.search(db, room, text, cursor, args.limit)
+                    hits += len(items)
+                    if page == 3:
+                        page5_cursor = cursor
+                    if not cursor:
+                        break
+                first = timed(lambda: MessageSearch.search(db, room, text, None, args.limit), args.samples)
+                deep = timed(lambda: MessageSearch.search(db, room, text, page5_cursor, args.limit), args.samples) if page5_cursor else float("nan")
+                like = timed(lambda: like_page(db, room_id, terms, args.limit), args.samples)
+                shown = f"{hits}+" if cursor else str(hits)
+                print(f"{name:>10} {shown:>7} | {first:>12.2f} {deep:>10.2f} | {like:>10.2f}")
+
+    # Write path: the websocket handler's record_message and the write-behind flush, indexing on
+    room_id = rooms[1]["id"]
+    sender = uuid.uuid4()
+    texts = [" ".join(rng.choices(words, weights=weights, k=8)) for _ in range(20_000)]
+    started = time.perf_counter()
+    for text in texts:
+        RoomService.record_message(room_id, sender, text, "es")
+    room_message_writer.stop()  # joins the writer thread, which may hold a batch, then flushes the rest
+    elapsed = time.perf_counter() - started
+    with session_scope() as db:
+        room = db.query(Room).filter(Room.id == room_id).one()
+        found, _ = MessageSearch.search(db, room, texts[-1], None, args.limit)
+    assert any(item.content == texts[-1] for item in found)
+    print(f"\nwrite path: {len(texts):,} messages recorded and flushed in {elapsed:.2f}s "
+          f"({len(texts) / elapsed:,.0f} msg/s), searchable after the flush")
+
+
+if __name__ == "__main__":
+    main()
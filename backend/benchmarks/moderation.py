@@ -0,0 +1,129 @@
+"""Moderation cost per message.
+
+Inline tier: the Aho-Corasick matcher against a compiled regex alternation over the
+same wordlist. Async tier: room messages over a real socket with MODERATION_ASYNC=1
+and Celery in eager mode, using a local classifier that flags messages containing
+"flagme", so it reports delivery throughput and the time until the retract frame.
+
+    cd backend && python -m benchmarks.moderation --messages 20000
+"""
+import argparse
+import asyncio
+import os
+import random
+import re
+import time
+from benchmarks import local
+
+CLEAN_WORDS = "hola que tal como estas todo bien gracias nos vemos manana hello there how are you doing fine".split()
+
+
+def synthetic_messages(count: int, words: list[str], dirty_ratio: float = 0.1) -> list[str]:
+    rng = random.Random(7)
+    messages = []
+    for _ in range(count):
+        tokens = [rng.choice(CLEAN_WORDS) for _ in range(rng.randint(4, 20))]
+        if rng.random() < dirty_ratio:
+            tokens.insert(rng.randrange(len(tokens)), rng.choice(words).upper())
+        messages.append(" ".join(tokens))
+    return messages
+
+
+# Texts that get longer when lowercased ("İ" -> "i̇"): the offsets found in the folded text
+# must still point at the same characters
+WIDENING = (
+    ("İİ fuck", "İİ ****"),
+    ("İstanbul fuck İ", "İstanbul **** İ"),
+    ("FUCK İ FUCK", "**** İ ****"),
+)
+
+
+def inline(count: int):
+    from app.services.moderation import ModerationService, load_wordlist, normalize
+
+    for text, expected in WIDENING:
+        masked, _ = ModerationService.mask("en", text)
+        assert masked == expected, (text, masked)
+    print(f"inline: {len(WIDENING)} texts whose lowercase is longer masked at the right offsets")
+
+    for language in ("en", "es"):
+        words = load_wordlist(language)
+        messages = synthetic_messages(count, words)
+        ModerationService.matcher(language)  # built once per language, outside the timing
+
+        started = time.perf_counter()
+        masked = sum(1 for text in messages if ModerationService.mask(language, text)[1])
+        ac = time.perf_counter() - started
+
+        pattern = re.compile(r"\b(?:" + "|".join(re.escape(word) for word in words) + r")\b")
+        started = time.perf_counter()
+        matched = sum(1 for text in messages if pattern.search(normalize(text)))
+        regex = time.perf_counter() - started
+
+        print(
+            f"inline {language}: {len(words)} words, {masked}/{count} masked | "
+            f"aho-corasick {ac / count * 1e6:.1f} us/msg ({count / ac:,.0f} msg/s) | "
+            f"regex {regex / count * 1e6:.1f} us/msg ({matched} matched)"
+        )
+
+
+async def round_trip(server, count: int):
+    import websockets
+
+    code = local.create_rooms(1, capacity=2)[0]
+    (sender_id, sender_token), (reader_id, reader_token) = local.create_users(2, prefix="moderated")
+    local.seat([(code, sender_id), (code, reader_id)])
+    url = f"{server.ws_url}/ws/chat/{code}?token="
+
+    async with websockets.connect(url + reader_token) as reader, websockets.connect(url + sender_token) as sender:
+        await reader.recv()
+        sent_at = {}
+        started = time.perf_counter()
+        for i in range(count):
+            text = f"message {i} flagme" if i % 10 == 0 else f"message {i}"
+            sent_at[f"message {i}"] = time.perf_counter()
+            await sender.send(text)
+
+        delivered = retracted = 0
+        retract_latency = []
+        while delivered < count or retracted < count // 10:
+            frame = await asyncio.wait_for(reader.recv(), 30)
+            if frame.startswith('{"type": "retract"'):
+                retracted += 1
+                key = frame.split("message ", 1)[1].split(" ", 1)[0]
+                retract_latency.append(time.perf_counter() - sent_at[f"message {key}"])
+            elif not frame.startswith("{"):
+                delivered += 1
+        elapsed = time.perf_counter() - started
+
+    retract_latency.sort()
+    print(
+        f"async tier: {count / elapsed:,.0f} msg/s delivered with moderation on, {retracted} retracted, "
+        f"retract p50 {retract_latency[len(retract_latency) // 2] * 1000:.1f} ms "
+        f"p99 {retract_latency[int(len(retract_latency) * 0.99)] * 1000:.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Moderation benchmark")
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument("--socket-messages", type=int, default=1000)
+    parser.add_argument("--port", type=int, default=8768)
+    args = parser.parse_args()
+
+    local.configure()
+    os.environ["MODERATION_ASYNC"] = "1"
+    os.environ["CELERY_TASK_ALWAYS_EAGER"] = "1"
+    local.setup()
+
+    inline(args.messages)
+
+    from app.tasks import moderation
+
+    moderation.classify = lambda text: "flagme" in text
+    with local.Server(args.port) as server:
+        asyncio.run(round_trip(server, args.socket_messages))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Query-plan check for the hot filters.
+
+Builds a fresh database with `alembic upgrade head` (so the migrations themselves are
+exercised), then EXPLAINs the query shapes the routes, sockets and tasks actually run
+and fails if any of them scans a whole table instead of using an index.
+
+    cd backend && python -m benchmarks.query_plans
+    DATABASE_URL=postgresql://... python -m benchmarks.query_plans   # against an empty database
+
+On Postgres sequential scans are disabled for the session, since the planner prefers
+them on tables this small; the check is that an index *can* serve the query.
+"""
+import os
+import sys
+import uuid
+from datetime import datetime, timezone
+from sqlalchemy import text
+from benchmarks import local
+
+
+def hot_queries(db):
+    from app.models.conversations import AgentMemorySummary, Conversation
+    from app.models.rooms import Room, RoomMember, RoomMessage
+    from app.models.user import User
+
+    user_id, room_id, now = uuid.uuid4(), uuid.uuid4(), datetime.now(timezone.utc)
+    return {
+        # create_rooms / join_room / get_room: "already in another room"
+        "active membership by user": db.query(RoomMember).filter_by(user_id=user_id, is_active=True),
+        # join_room: "already in the room"
+        "membership by room and user": db.query(RoomMember).filter_by(room_id=room_id, user_id=user_id, is_active=True),
+        # add_member_to_room, leave_room host election
+        "members of a room": db.query(RoomMember).filter(RoomMember.room_id == room_id, RoomMember.is_active == True),
+        # /room/search/
+        "room search": db.query(Room).filter(
+            Room.language == "es", Room.is_public == True, Room.is_active == True, Room.expires_at > now,
+        ),
+        # RoomCache.get read-through
+        "room by code": db.query(Room).filter(Room.code == "abc12345"),
+        # clean_expired_rooms
+        "expired rooms": db.query(Room).filter(Room.expires_at <= now),
+        # room history in time order
+        "room messages by time": db.query(RoomMessage)
+            .filter(RoomMessage.room_id == room_id, RoomMessage.timestamp > now)
+            .order_by(RoomMessage.timestamp),
+        # MessageArchive.expire on unpartitioned databases: one period at a time
+        "messages of an expiry period": db.query(RoomMessage.id)
+            .filter(RoomMessage.timestamp >= now, RoomMessage.timestamp < now),
+        # ConversationService.get_or_create fallback
+        "conversation by user and agent": db.query(Conversation.id)
+            .filter(Conversation.user_id == user_id, Conversation.agent_name == "Dante"),
+        # MemoryService.index_for
+        "summaries of a conversation": db.query(AgentMemorySummary.id)
+            .filter(AgentMemorySummary.conversation_id == user_id)
+            .order_by(AgentMemorySummary.created_at),
+        # guests past their token window
+        "expired guests": db.query(User.id).filter(User.temp_expiration_date < now),
+    }
+
+
+def plan(db, query) -> list[str]:
+    dialect = db.get_bind().dialect
+    sql = str(query.statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+    if dialect.name == "sqlite":
+        return [row[-1] for row in db.execute(text("EXPLAIN QUERY PLAN " + sql))]
+    return [row[0] for row in db.execute(text("EXPLAIN " + sql))]
+
+
+def uses_index(dialect: str, lines: list[str]) -> bool:
+    if dialect == "sqlite":
+        # "SEARCH room_members USING INDEX ..." vs "SCAN room_members"
+        return all(not line.startswith("SCAN ") or "USING" in line for line in lines)
+    return not any("Seq Scan" in line for line in lines)
+
+
+def main():
+    local.configure()
+
+    from alembic import command
+    from alembic.config import Config
+    from app.db.database import session_scope
+
+    config = Config(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini"))
+    command.upgrade(config, "head")
+
+    failures = 0
+    with session_scope() as db:
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            db.execute(text("SET enable_seqscan = off"))
+        for label, query in hot_queries(db).items():
+            lines = plan(db, query)
+            ok = uses_index(dialect, lines)
+            failures += not ok
+            print(f"{'ok  ' if ok else 'SCAN'} {label:<32} {' | '.join(line.strip() for line in lines)}")
+
+    print(f"{failures} hot queries without an index")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
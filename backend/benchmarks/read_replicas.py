@@ -0,0 +1,160 @@
+"""Read replica routing: two SQLite files stand in for replicas of the primary database.
+
+Replication is a snapshot: the sqlite3 backup API copies the primary over a replica, which
+records when in a replica_status table, and DB_REPLICA_LAG_QUERY reads the time since then
+as its lag. Against the in-process server, checks that:
+
+- read-only routes (room search) are served by a replica, so a room created on the primary
+  is not found there until the next snapshot, and is once it lands;
+- the cold room lookup of a socket join falls back to the primary on a replica miss;
+- replicas lagging past DB_REPLICA_MAX_LAG are skipped for the primary, while the stats
+  routes (read_db(300)) keep using them; an unmeasurable replica is skipped too;
+- reads alternate between the replicas, and a read-only session refuses to write.
+
+Then times a read session on a replica against one on the primary.
+
+    cd backend && python -m benchmarks.read_replicas
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from benchmarks import local
+
+CHECK_INTERVAL = 0.2
+
+
+def replicate(primary: str, replica: str, lag: float = 0.0):
+    """Snapshot the primary onto the replica, as of `lag` seconds ago."""
+    source, target = sqlite3.connect(primary), sqlite3.connect(replica)
+    try:
+        source.backup(target)
+        target.execute("CREATE TABLE IF NOT EXISTS replica_status (replicated_at TEXT)")
+        target.execute("DELETE FROM replica_status")
+        replicated_at = datetime.now(timezone.utc) - timedelta(seconds=lag)
+        target.execute("INSERT INTO replica_status VALUES (?)", (replicated_at.strftime("%Y-%m-%d %H:%M:%S.%f"),))
+        target.commit()
+    finally:
+        source.close()
+        target.close()
+    # Past the check interval, so the next read sees the new lag
+    time.sleep(CHECK_INTERVAL * 1.5)
+
+
+def routed(target: str) -> float:
+    from app.core.metrics import DB_READ_SESSIONS
+
+    return DB_READ_SESSIONS.value(target=target)
+
+
+def timed(samples: int, fn) -> tuple[float, float]:
+    durations = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - started)
+    durations.sort()
+    return statistics.median(durations) * 1e6, durations[int(len(durations) * 0.99) - 1] * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=5000)
+    parser.add_argument("--port", type=int, default=8792)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="onlinex-replicas-")
+    replicas = [os.path.join(directory, f"replica{i}.sqlite") for i in range(2)]
+    os.environ["DATABASE_REPLICA_URLS"] = ",".join(f"sqlite:///{path}" for path in replicas)
+    os.environ["DB_REPLICA_LAG_QUERY"] = "SELECT (julianday('now') - julianday(replicated_at)) * 86400 FROM replica_status"
+    os.environ["DB_REPLICA_MAX_LAG"] = "5"
+    os.environ["DB_REPLICA_CHECK_INTERVAL"] = str(CHECK_INTERVAL)
+    local.configure()
+    local.setup()
+
+    import httpx
+    from sqlalchemy import text
+    from app.db.database import DATABASE_URL, read_router, session_scope
+    from app.models.rooms import Room
+    from app.services.room_cache import RoomCache
+
+    primary = DATABASE_URL.removeprefix("sqlite:///")
+    (_, host), (_, guest) = local.create_users(2, prefix="replica")
+    for replica in replicas:
+        replicate(primary, replica)
+
+    with local.Server(args.port) as server, httpx.Client(base_url=f"{server.http_url}/api/v1", timeout=30) as http:
+        def search(token: str) -> int:
+            return http.get("/room/search/", params={"language": "eo"}, headers={"Authorization": f"Bearer {token}"}).status_code
+
+        created = http.post("/rooms", json={"name": "replicas", "capacity": 4, "language": "eo"}, headers={"Authorization": f"Bearer {host}"})
+        assert created.status_code == 201, created.text
+        code = created.json()["code"]
+
+        before = routed("replica")
+        assert search(guest) == 404  # not on the replicas yet
+        for replica in replicas:
+            replicate(primary, replica)
+        assert search(guest) == 200
+        assert routed("replica") - before == 2
+        print("room search: served by the replicas (room missing until the next snapshot, found after)")
+
+        # A socket join's cold lookup: the replicas miss the room, the primary has it
+        with session_scope() as db:
+            db.add(Room(code="REPLICA2", name="late", max_users=2, language="eo", is_public=False, is_active=True,
+                        expires_at=datetime.now(timezone.utc) + timedelta(hours=1)))
+            db.commit()
+        RoomCache.invalidate("REPLICA2")
+        assert RoomCache.get("REPLICA2") is not None
+        print("cold room lookup: replica miss retried on the primary")
+
+        # Both replicas 30s behind: search falls back, the stats routes tolerate it
+        for replica in replicas:
+            replicate(primary, replica, lag=30)
+        fallback, replica_reads = routed("fallback"), routed("replica")
+        with session_scope() as db:
+            db.query(Room).filter(Room.code == code).update({"is_active": False})
+            db.commit()
+        RoomCache.invalidate(code)
+        assert search(guest) == 404  # the primary knows the room closed
+        stats = http.get("/stats/rooms", headers={"Authorization": f"Bearer {guest}"})
+        assert stats.status_code == 200, stats.text
+        assert routed("fallback") - fallback == 1 and routed("replica") - replica_reads == 1
+        print("replicas 30s behind: room search fell back to the primary, /stats (max_lag 300) stayed on a replica")
+
+    # One replica caught up, the other unmeasurable: every read goes to the first
+    replicate(primary, replicas[0])
+    with sqlite3.connect(replicas[1]) as broken:
+        broken.execute("DROP TABLE replica_status")
+    time.sleep(CHECK_INTERVAL * 1.5)
+    picks = [read_router.pick() for _ in range(100)]
+    assert picks.count(read_router.replicas[0]) == 100, picks
+    replicate(primary, replicas[1])
+    picks = [read_router.pick() for _ in range(100)]
+    assert picks.count(read_router.replicas[0]) == picks.count(read_router.replicas[1]) == 50
+    print("replica down: skipped; back up: reads alternate 50/50")
+
+    with session_scope(read_only=True) as db:
+        db.add(Room(code="NOPE", name="nope", max_users=2))
+        try:
+            db.commit()
+            raise AssertionError("a read-only session wrote")
+        except RuntimeError:
+            db.rollback()
+    print("read-only session: refuses to flush")
+
+    def read(read_only: bool):
+        with session_scope(read_only=read_only) as db:
+            db.execute(text("SELECT 1")).scalar()
+
+    p50, p99 = timed(args.samples, lambda: read(False))
+    print(f"\nsession + SELECT 1 on the primary:  p50 {p50:6.1f} us  p99 {p99:6.1f} us")
+    p50, p99 = timed(args.samples, lambda: read(True))
+    print(f"session + SELECT 1 on a replica:    p50 {p50:6.1f} us  p99 {p99:6.1f} us (routing and lag checks included)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Room capacity: many users racing for the seats of small rooms, against an in-process uvicorn.
+
+--users users try to join each of --rooms rooms of --capacity seats at once; exactly capacity
+of them must get in per room. Then one member opens several sockets (tabs) to a room: they
+show in the online count but take one seat, so the room still has the seats it had.
+
+    cd backend && python -m benchmarks.room_capacity --rooms 20 --capacity 5 --users 40
+"""
+import argparse
+import asyncio
+import time
+from benchmarks import local
+
+# Requests in flight; below the pool size, so every joiner gets a connection
+CONCURRENCY = 30
+
+
+async def run(server, args, codes, users):
+    import httpx
+    import websockets
+    from app.db.database import session_scope
+    from app.models.rooms import Room
+    from app.services.presence import PresenceService
+    from app.services.rooms import RoomService
+
+    limits = httpx.Limits(max_connections=CONCURRENCY)
+    async with httpx.AsyncClient(base_url=server.http_url, limits=limits, timeout=60) as client:
+        async def join(code, token):
+            response = await client.get("/api/v1/rooms/join", params={"room_code": code},
+                                        headers={"Authorization": f"Bearer {token}"})
+            return response.status_code
+
+        started = time.perf_counter()
+        statuses = await asyncio.gather(*(
+            join(code, users[room * args.users + i][1])
+            for room, code in enumerate(codes) for i in range(args.users)
+        ))
+        elapsed = time.perf_counter() - started
+    joined = [statuses[room * args.users:(room + 1) * args.users].count(200) for room in range(len(codes))]
+    full = statuses.count(403)
+    print(f"{len(statuses):,} joins for {len(codes)} rooms of {args.capacity} in {elapsed:.2f}s: "
+          f"{sum(joined)} seated (per room {min(joined)}-{max(joined)}), {full} told the room is full")
+    assert joined == [args.capacity] * len(codes), joined
+    assert full == len(statuses) - sum(joined)
+
+    # A seated user's tabs: online count goes up, seats don't
+    code = codes[0]
+    token = next(token for (user_id, token), status in zip(users, statuses) if status == 200)
+    tabs = [await websockets.connect(f"{server.ws_url}/ws/chat/{code}?token={token}") for _ in range(3)]
+    online = await asyncio.to_thread(PresenceService.online_count, code)
+    with session_scope() as db:
+        room_id = db.query(Room.id).filter(Room.code == code).scalar()
+        seats = RoomService.seats_taken(db, room_id)
+    print(f"one member with {len(tabs)} tabs open: {online} online, {seats} seats taken")
+    assert seats == args.capacity and online == len(tabs)
+    for tab in tabs:
+        await tab.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", type=int, default=20)
+    parser.add_argument("--capacity", type=int, default=5)
+    parser.add_argument("--users", type=int, default=40, help="users racing for each room")
+    parser.add_argument("--port", type=int, default=8797)
+    args = parser.parse_args()
+
+    local.configure(pool_size=20, max_overflow=40)
+    local.setup()
+    codes = local.create_rooms(args.rooms, capacity=args.capacity)
+    users = local.create_users(args.rooms * args.users, prefix="capacity")
+    with local.Server(args.port) as server:
+        asyncio.run(run(server, args, codes, users))
+
+
+if __name__ == "__main__":
+    main()
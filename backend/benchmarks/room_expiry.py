@@ -0,0 +1,95 @@
+"""Room expiry at scale: schedule N rooms, let them all fall due, and time the batched
+claim + deactivate path plus how late each batch fired. Also checks that a live
+socket of an expiring room receives the room_expired frame and is closed.
+
+    cd backend && python -m benchmarks.room_expiry --rooms 100000
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from benchmarks import local
+
+
+def schedule(codes: list[str], expires_at: datetime) -> float:
+    from app.services.room_expiry import RoomExpiry
+
+    started = time.perf_counter()
+    RoomExpiry.schedule_many([(code, expires_at) for code in codes])
+    return time.perf_counter() - started
+
+
+def drain(due_at: float) -> dict:
+    from app.services.room_expiry import RoomExpiry
+
+    started = time.perf_counter()
+    batches = deactivated = 0
+    while True:
+        claimed = RoomExpiry.claim_due()
+        if not claimed:
+            break
+        deactivated += RoomExpiry.deactivate(claimed)
+        batches += 1
+    elapsed = time.perf_counter() - started
+    return {
+        "deactivated": deactivated,
+        "batches": batches,
+        "seconds": round(elapsed, 3),
+        "rooms_per_sec": round(deactivated / elapsed, 1) if elapsed else 0,
+        "last_batch_late_ms": round((time.time() - due_at) * 1000, 1),
+    }
+
+
+async def live_socket_check(server) -> str:
+    import websockets
+    from app.services.room_cache import RoomCache
+    from app.services.room_expiry import RoomExpiry
+    from sqlalchemy import update
+    from app.db.database import session_scope
+    from app.models.rooms import Room
+
+    code = local.create_rooms(1, capacity=2)[0]
+    user_id, token = local.create_users(1, prefix="expiring")[0]
+    local.seat([(code, user_id)])
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=2)
+    with session_scope() as db:
+        db.execute(update(Room).where(Room.code == code).values(expires_at=expires_at))
+        db.commit()
+    RoomCache.invalidate(code)
+    RoomExpiry.schedule(code, expires_at)
+
+    async with websockets.connect(f"{server.ws_url}/ws/chat/{code}?token={token}") as ws:
+        frames = []
+        try:
+            while True:
+                frames.append(await asyncio.wait_for(ws.recv(), 10))
+        except websockets.ConnectionClosed as e:
+            late = time.time() - expires_at.timestamp()
+            return f"closed {e.rcvd.code if e.rcvd else None} {late * 1000:.0f}ms after expiry, frames {frames}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Room expiry benchmark")
+    parser.add_argument("--rooms", type=int, default=100_000)
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    local.configure()
+    local.setup()
+
+    print(f"creating {args.rooms} rooms...")
+    codes = []
+    for start in range(0, args.rooms, 10_000):
+        codes += local.create_rooms(min(10_000, args.rooms - start), capacity=2)
+
+    due = datetime.now(timezone.utc) + timedelta(seconds=1)
+    print(f"schedule: {args.rooms / schedule(codes, due):.0f} rooms/s")
+    time.sleep(max(0.0, due.timestamp() - time.time()))
+    print("drain:", drain(due.timestamp()))
+
+    with local.Server(args.port) as server:
+        print("live socket:", asyncio.run(live_socket_check(server)))
+
+
+if __name__ == "__main__":
+    main()
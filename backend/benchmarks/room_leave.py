@@ -0,0 +1,269 @@
+"""Simultaneous room leaves: host hand-off, room deactivation and membership events.
+
+Seeds --rooms rooms of --members members each (the first to join is the host), then
+against the in-process server:
+
+- all leave: every member of every room calls POST /rooms/{code}/leave at once; every room
+  must end inactive with no active member left;
+- one stays: all but the last member (host included) leave at once; the one left must be
+  the only active member and the host, the room still active, and its open socket must get
+  a "membership" frame per leave, the last naming it host; a socket of a member who left is
+  refused;
+- sockets close: every member has a room socket open (the host two tabs). With seats held for
+  GRACE seconds after a socket closes, the host closing a tab, or dropping its socket and
+  reconnecting right away, keeps the seat and the role; closing all but the last member's
+  sockets changes nothing until the grace period is over, then hands the host role to the
+  last one, and closing that one too closes the room;
+- before: the previous leave_room logic (three commits, unfiltered host pick) over the
+  same two scenarios, run from as many threads, for comparison.
+
+On SQLite writers are serialized by the database lock; point DATABASE_URL at Postgres to
+exercise the row locks (the seat count update on the room, SKIP LOCKED on the election).
+
+    cd backend && python -m benchmarks.room_leave --rooms 50 --members 6
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from benchmarks import local
+
+CONCURRENCY = 30
+GRACE = 1.0  # ROOM_SEAT_GRACE
+
+
+def seed(rooms: int, members: int) -> list[tuple[str, list[tuple[str, str]]]]:
+    """[(room_code, [(user_id, token), ...])], members in join order with the first one as host."""
+    from sqlalchemy import insert, select
+    from app.db.database import session_scope
+    from app.models.rooms import Room, RoomMember
+
+    users = local.create_users(rooms * members, prefix=f"leave{uuid.uuid4().hex[:6]}")
+    codes = local.create_rooms(rooms, capacity=members)
+    joined = datetime.now(timezone.utc) - timedelta(hours=1)
+    with session_scope() as db:
+        room_ids = dict(db.execute(select(Room.code, Room.id).where(Room.code.in_(codes))).all())
+        db.execute(insert(RoomMember), [
+            {"id": uuid.uuid4(), "room_id": room_ids[code], "user_id": uuid.UUID(users[r * members + m][0]),
+             "is_host": m == 0, "is_active": True, "joined_at": joined + timedelta(seconds=m)}
+            for r, code in enumerate(codes) for m in range(members)
+        ])
+        local.count_seats(db, list(room_ids.values()))
+        db.commit()
+    return [(code, users[r * members:(r + 1) * members]) for r, code in enumerate(codes)]
+
+
+def legacy_leave(room_code: str, user_id: str):
+    """leave_room as it was: three commits, and a "new host" picked among every row of the room."""
+    from app.db.database import session_scope
+    from app.models.rooms import Room, RoomMember
+
+    with session_scope() as db:
+        room = db.query(Room).filter(Room.code == room_code).first()
+        member = db.query(RoomMember).filter_by(room_id=room.id, user_id=uuid.UUID(user_id)).first()
+        member.is_active = False
+        db.commit()
+        if member.is_host:
+            new_host = db.query(RoomMember).filter(RoomMember.room_id == room.id).first()
+            if new_host:
+                new_host.is_host = True
+                db.commit()
+            else:
+                room.is_active = False
+                db.commit()
+
+
+def state(codes: list[str]) -> dict[str, tuple[bool, list[tuple[str, bool, bool]]]]:
+    """room_code -> (is_active, [(user_id, is_active, is_host)])"""
+    from app.db.database import session_scope
+    from app.models.rooms import Room, RoomMember
+
+    with session_scope() as db:
+        rooms = {room.id: room for room in db.query(Room).filter(Room.code.in_(codes))}
+        members = {}
+        for member in db.query(RoomMember).filter(RoomMember.room_id.in_(list(rooms))):
+            members.setdefault(rooms[member.room_id].code, []).append((str(member.user_id), member.is_active, member.is_host))
+    return {room.code: (room.is_active, members.get(room.code, [])) for room in rooms.values()}
+
+
+def check_all_left(codes: list[str]) -> int:
+    """Rooms left wrong: still active, or with an active member."""
+    return sum(1 for active, members in state(codes).values() if active or any(is_active for _, is_active, _ in members))
+
+
+def check_one_stays(rooms: list) -> int:
+    """Rooms left wrong: the stayer isn't the only active member and host, or the room was closed."""
+    wrong = 0
+    current = state([code for code, _ in rooms])
+    for code, users in rooms:
+        active, members = current[code]
+        stayer = users[-1][0]
+        hosts = [user_id for user_id, is_active, is_host in members if is_active and is_host]
+        alive = [user_id for user_id, is_active, _ in members if is_active]
+        wrong += not (active and alive == [stayer] and hosts == [stayer])
+    return wrong
+
+
+async def leave_all(server, leaves: list[tuple[str, str]]) -> tuple[list[float], list[dict]]:
+    import httpx
+
+    # Leaves are listed room by room, so each room's members still leave together; more at once
+    # would only queue on the connection pool (auth checks a connection out before the route runs)
+    async with httpx.AsyncClient(base_url=f"{server.http_url}/api/v1", timeout=60,
+                                 limits=httpx.Limits(max_connections=CONCURRENCY)) as http:
+        async def leave(code: str, token: str):
+            started = time.perf_counter()
+            response = await http.post(f"/rooms/{code}/leave", headers={"Authorization": f"Bearer {token}"})
+            assert response.status_code == 200, response.text
+            return time.perf_counter() - started, response.json()
+
+        results = await asyncio.gather(*(leave(code, token) for code, token in leaves))
+    return sorted(elapsed for elapsed, _ in results), [body for _, body in results]
+
+
+async def one_stays(server, rooms: list) -> tuple[list[float], int, int, int]:
+    """All but the last member of each room leave at once while the last one listens on its socket;
+    then those who left try to open a socket again, which needs a seat."""
+    import websockets
+
+    sockets = [await websockets.connect(f"{server.ws_url}/ws/chat/{code}?token={users[-1][1]}") for code, users in rooms]
+    latencies, _ = await leave_all(server, [(code, token) for code, users in rooms for _, token in users[:-1]])
+
+    wrong_events = 0
+    for (code, users), ws in zip(rooms, sockets):
+        events = []
+        deadline = time.monotonic() + 10
+        while len(events) < len(users) - 1 and time.monotonic() < deadline:
+            try:
+                frame = json.loads(await asyncio.wait_for(ws.recv(), timeout=deadline - time.monotonic()))
+            except (asyncio.TimeoutError, ValueError):
+                continue
+            if isinstance(frame, dict) and frame.get("type") == "membership":
+                events.append(frame)
+        left = {event["user_id"] for event in events}
+        wrong_events += not (left == {user_id for user_id, _ in users[:-1]} and events[-1]["host"] == users[-1][0]
+                             and all(event["room_active"] for event in events))
+    wrong = check_one_stays(rooms)
+
+    admitted = 0
+    for code, users in rooms:
+        # Refused before the handshake completes, like sockets for unknown rooms (403)
+        try:
+            ws = await websockets.connect(f"{server.ws_url}/ws/chat/{code}?token={users[0][1]}")
+        except websockets.InvalidStatus as e:
+            admitted += e.response.status_code != 403
+            continue
+        admitted += 1
+        await ws.close()
+
+    for ws in sockets:
+        await ws.close()
+    return latencies, wrong, wrong_events, admitted
+
+
+async def settle(check, timeout: float = 10) -> int:
+    """Rooms still wrong once the servers' socket handlers caught up, or at the deadline."""
+    deadline = time.monotonic() + timeout
+    wrong = await asyncio.to_thread(check)
+    while wrong and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+        wrong = await asyncio.to_thread(check)
+    return wrong
+
+
+async def sockets_close(server, rooms: list) -> dict[str, int]:
+    """Members' sockets close instead of calling the leave route; seats are held for GRACE seconds.
+
+    Returns the rooms left wrong per step."""
+    import websockets
+
+    async def open_socket(code, token):
+        return await websockets.connect(f"{server.ws_url}/ws/chat/{code}?token={token}")
+
+    codes = [code for code, _ in rooms]
+    sockets = [list(await asyncio.gather(*(open_socket(code, token) for _, token in users))) for code, users in rooms]
+    spares = await asyncio.gather(*(open_socket(code, users[0][1]) for code, users in rooms))
+
+    def untouched() -> int:
+        current = state(codes)
+        return sum(1 for code, users in rooms
+                   if not current[code][0] or (users[0][0], True, True) not in current[code][1]
+                   or sum(is_active for _, is_active, _ in current[code][1]) != len(users))
+
+    wrong = {}
+    # The host closes a spare tab, then drops its last socket and reconnects at once (a network blip)
+    await asyncio.gather(*(ws.close() for ws in spares))
+    await asyncio.gather(*(room[0].close() for room in sockets))
+    for room, (code, users) in zip(sockets, rooms):
+        room[0] = await open_socket(code, users[0][1])
+    await asyncio.sleep(GRACE + 1.5)
+    wrong["host kept"] = await asyncio.to_thread(untouched)
+
+    # All but the last member go: nothing changes within the grace period, then the last one is host
+    await asyncio.gather(*(ws.close() for room in sockets for ws in room[:-1]))
+    await asyncio.sleep(0.2)
+    wrong["held"] = await asyncio.to_thread(untouched)
+    wrong["handed over"] = await settle(lambda: check_one_stays(rooms), GRACE + 10)
+
+    await asyncio.gather(*(room[-1].close() for room in sockets))
+    wrong["closed"] = await settle(lambda: check_all_left(codes), GRACE + 10)
+    return wrong
+
+
+def percentiles(latencies: list[float]) -> str:
+    return f"p50 {latencies[len(latencies) // 2] * 1000:.0f} ms  p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.0f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", type=int, default=50)
+    parser.add_argument("--members", type=int, default=6)
+    parser.add_argument("--port", type=int, default=8793)
+    args = parser.parse_args()
+
+    os.environ["ROOM_SEAT_GRACE"] = str(GRACE)
+    local.configure(pool_size=20, max_overflow=40)
+    local.setup()
+
+    with local.Server(args.port) as server:
+        rooms = seed(args.rooms, args.members)
+        latencies, bodies = asyncio.run(leave_all(server, [(code, token) for code, users in rooms for _, token in users]))
+        wrong = check_all_left([code for code, _ in rooms])
+        closed = sum(not body["room_active"] for body in bodies)
+        print(f"all leave:  {len(latencies)} leaves across {args.rooms} rooms ({percentiles(latencies)}); "
+              f"{args.rooms - wrong}/{args.rooms} rooms closed with no active member ({closed} leaves saw the room empty)")
+        assert wrong == 0
+
+        rooms = seed(args.rooms, args.members)
+        latencies, wrong, wrong_events, admitted = asyncio.run(one_stays(server, rooms))
+        print(f"one stays:  {len(latencies)} leaves ({percentiles(latencies)}); {args.rooms - wrong}/{args.rooms} rooms "
+              f"with the stayer as sole active member and host; {args.rooms - wrong_events}/{args.rooms} sockets got every "
+              f"membership event; {admitted} sockets of members who left admitted")
+        assert wrong == 0 and wrong_events == 0 and admitted == 0
+
+        rooms = seed(args.rooms, args.members)
+        wrong = asyncio.run(sockets_close(server, rooms))
+        print(f"sockets close ({GRACE:.0f}s grace): {args.rooms - wrong['host kept']}/{args.rooms} hosts kept seat and role "
+              f"through a closed tab and a reconnect; {args.rooms - wrong['held']}/{args.rooms} rooms unchanged right "
+              f"after all but one closed, {args.rooms - wrong['handed over']}/{args.rooms} handed to the last open socket "
+              f"after the grace period; {args.rooms - wrong['closed']}/{args.rooms} closed after the last socket")
+        assert not any(wrong.values()), wrong
+
+    with ThreadPoolExecutor(max_workers=args.members * 4) as pool:
+        rooms = seed(args.rooms, args.members)
+        list(pool.map(lambda leave: legacy_leave(*leave), [(code, user_id) for code, users in rooms for user_id, _ in users]))
+        wrong = check_all_left([code for code, _ in rooms])
+        print(f"\nbefore, all leave: {wrong}/{args.rooms} rooms left active")
+
+        rooms = seed(args.rooms, args.members)
+        list(pool.map(lambda leave: legacy_leave(*leave), [(code, user_id) for code, users in rooms for user_id, _ in users[:-1]]))
+        wrong = check_one_stays(rooms)
+        print(f"before, one stays: {wrong}/{args.rooms} rooms without the stayer as host (the role went to a member who left)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+"""Local benchmark harness for the REST and websocket hot paths.
+
+Everything runs in-process: file-backed SQLite (or DATABASE_URL if set), fakeredis
+and a fake chat model, so no OpenAI key or Redis server is needed.
+
+    cd backend && python -m benchmarks.run --concurrency 20 --requests 500 --output bench.json
+    python -m benchmarks.compare before.json after.json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from benchmarks import local
+
+
+def percentiles(samples: list[float]) -> dict:
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def pick(fraction):
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 3)
+
+    return {
+        "mean": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50": pick(0.50),
+        "p90": pick(0.90),
+        "p99": pick(0.99),
+        "max": round(ordered[-1] * 1000, 3),
+    }
+
+
+def bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+class Scenario:
+    """prepare() builds fixtures for `count` operations, run() performs operation `i`.
+
+    Websocket scenarios keep one socket per worker, opened in start_worker()."""
+
+    name = ""
+
+    def prepare(self, count: int, concurrency: int):
+        pass
+
+    async def start_worker(self, server, worker: int):
+        return None
+
+    async def run(self, server, http, state, i: int):
+        raise NotImplementedError
+
+    async def stop_worker(self, state):
+        pass
+
+
+class LoginTemporal(Scenario):
+    name = "login_temporal"
+
+    async def run(self, server, http, state, i):
+        response = await http.post("/api/v1/login/temporal/", json={"temp_username": f"guest{i}"})
+        response.raise_for_status()
+
+
+class GuestJoin(Scenario):
+    """Guest login followed by the first call that needs a users row (lazy materialization)."""
+
+    name = "guest_join"
+
+    def prepare(self, count, concurrency):
+        self.codes = local.create_rooms(count, capacity=2)
+
+    async def run(self, server, http, state, i):
+        response = await http.post("/api/v1/login/temporal/", json={"temp_username": f"guest{i}"})
+        response.raise_for_status()
+        response = await http.get(
+            "/api/v1/rooms/join",
+            params={"room_code": self.codes[i]},
+            headers=bearer(response.json()["token"]),
+        )
+        response.raise_for_status()
+
+
+class RoomCreate(Scenario):
+    name = "room_create"
+
+    def prepare(self, count, concurrency):
+        self.tokens = [token for _, token in local.create_users(count, prefix="host")]
+
+    async def run(self, server, http, state, i):
+        response = await http.post(
+            "/api/v1/rooms",
+            json={"name": f"room{i}", "capacity": 2, "language": "en"},
+            headers=bearer(self.tokens[i]),
+        )
+        response.raise_for_status()
+
+
+class RoomJoin(Scenario):
+    name = "room_join"
+
+    def prepare(self, count, concurrency):
+        self.codes = local.create_rooms(count, capacity=2)
+        self.tokens = [token for _, token in local.create_users(count, prefix="joiner")]
+
+    async def run(self, server, http, state, i):
+        response = await http.get(
+            "/api/v1/rooms/join",
+            params={"room_code": self.codes[i]},
+            headers=bearer(self.tokens[i]),
+        )
+        response.raise_for_status()
+
+
+class RoomSearch(Scenario):
+    name = "room_search"
+
+    def prepare(self, count, concurrency):
+        local.create_rooms(50, capacity=10, language="es")
+        self.tokens = [token for _, token in local.create_users(count, prefix="seeker")]
+
+    async def run(self, server, http, state, i):
+        response = await http.get(
+            "/api/v1/room/search/",
+            params={"language": "es"},
+            headers=bearer(self.tokens[i]),
+        )
+        response.raise_for_status()
+
+
+class RoomSocketConnect(Scenario):
+    name = "ws_room_connect"
+
+    def prepare(self, count, concurrency):
+        self.codes = local.create_rooms(count, capacity=2)
+        users = local.create_users(count, prefix="visitor")
+        local.seat([(code, user_id) for code, (user_id, _) in zip(self.codes, users)])
+        self.tokens = [token for _, token in users]
+
+    async def run(self, server, http, state, i):
+        import websockets
+
+        url = f"{server.ws_url}/ws/chat/{self.codes[i]}?token={self.tokens[i]}"
+        async with websockets.connect(url) as ws:
+            await ws.recv()  # presence frame sent once the socket is registered
+
+
+class RoomSocketMessage(Scenario):
+    name = "ws_room_message"
+
+    def prepare(self, count, concurrency):
+        self.codes = local.create_rooms(concurrency, capacity=2)
+        users = local.create_users(concurrency, prefix="talker")
+        local.seat([(code, user_id) for code, (user_id, _) in zip(self.codes, users)])
+        self.tokens = [token for _, token in users]
+
+    async def start_worker(self, server, worker):
+        import websockets
+
+        ws = await websockets.connect(f"{server.ws_url}/ws/chat/{self.codes[worker]}?token={self.tokens[worker]}")
+        await ws.recv()
+        return ws
+
+    async def run(self, server, http, ws, i):
+        await ws.send(f"message {i}")
+        while not (await ws.recv()).endswith(f"message {i}"):
+            pass
+
+    async def stop_worker(self, ws):
+        await ws.close()
+
+
+class ChatbotTurn(Scenario):
+    name = "ws_chatbot_turn"
+
+    def prepare(self, count, concurrency):
+        users = local.create_users(concurrency, prefix="chatter")
+        self.tokens = [token for _, token in users]
+        self.conversations = local.create_conversations([user_id for user_id, _ in users])
+
+    async def start_worker(self, server, worker):
+        import websockets
+
+        return await websockets.connect(
+            f"{server.ws_url}/ai/ws/chat/{self.conversations[worker]}?token={self.tokens[worker]}"
+        )
+
+    async def run(self, server, http, ws, i):
+        await ws.send(f"pregunta {i}")
+        while (await ws.recv()).startswith("{"):
+            pass  # skip heartbeat frames
+
+    async def stop_worker(self, ws):
+        await ws.close()
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in (
+        LoginTemporal,
+        GuestJoin,
+        RoomCreate,
+        RoomJoin,
+        RoomSearch,
+        RoomSocketConnect,
+        RoomSocketMessage,
+        ChatbotTurn,
+    )
+}
+
+
+OPERATION_TIMEOUT = 30.0
+
+
+async def drive(scenario: Scenario, server, count: int, concurrency: int) -> dict:
+    import httpx
+
+    latencies = []
+    errors = []
+    indices = iter(range(count))
+
+    async with httpx.AsyncClient(
+        base_url=server.http_url,
+        limits=httpx.Limits(max_connections=concurrency),
+        timeout=60,
+    ) as http:
+        async def worker(number):
+            state = await scenario.start_worker(server, number)
+            try:
+                for i in indices:
+                    started = time.perf_counter()
+                    try:
+                        await asyncio.wait_for(scenario.run(server, http, state, i), OPERATION_TIMEOUT)
+                        latencies.append(time.perf_counter() - started)
+                    except Exception as e:
+                        errors.append(repr(e))
+            finally:
+                await scenario.stop_worker(state)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(number) for number in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "operations": count,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "seconds": round(elapsed, 3),
+        "throughput_per_sec": round(len(latencies) / elapsed, 2) if elapsed else 0,
+        "latency_ms": percentiles(latencies),
+    }
+
+
+def run_scenario(scenario_cls, server, count: int, concurrency: int, alloc_count: int) -> dict:
+    concurrency = min(concurrency, count)
+    scenario = scenario_cls()
+    scenario.prepare(count, concurrency)
+    result = asyncio.run(drive(scenario, server, count, concurrency))
+
+    if alloc_count:
+        # Separate, smaller pass: tracemalloc slows everything down and would skew latencies
+        alloc_count = min(alloc_count, count)
+        scenario = scenario_cls()
+        scenario.prepare(alloc_count, concurrency)
+        tracemalloc.start()
+        asyncio.run(drive(scenario, server, alloc_count, min(concurrency, alloc_count)))
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["allocations"] = {
+            "operations": alloc_count,
+            "retained_bytes_per_op": round(current / alloc_count),
+            "peak_bytes": peak,
+        }
+
+    return result
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local REST and websocket benchmarks")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=300, help="operations per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--alloc-requests", type=int, default=100, help="operations in the tracemalloc pass, 0 to skip")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds the fake chat model sleeps per call")
+    parser.add_argument("--pool-size", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+
+    local.configure(pool_size=args.pool_size)
+    local.setup(llm_latency=args.llm_latency)
+
+    from app.db.database import engine
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "database": engine.dialect.name,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "llm_latency": args.llm_latency,
+        },
+        "scenarios": {},
+    }
+
+    with local.Server(args.port) as server:
+        for name in args.scenarios:
+            result = run_scenario(SCENARIOS[name], server, args.requests, args.concurrency, args.alloc_requests)
+            results["scenarios"][name] = result
+            latency = result["latency_ms"]
+            print(
+                f"{name:<18} {result['throughput_per_sec']:>9.1f} ops/s  "
+                f"p50 {latency.get('p50', 0):>8.2f} ms  p99 {latency.get('p99', 0):>8.2f} ms  "
+                f"errors {result['errors']}",
+                file=sys.stderr,
+            )
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
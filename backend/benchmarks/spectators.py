@@ -0,0 +1,215 @@
+"""Spectator streams: --spectators server-sent event streams on one room of one web worker.
+
+The worker is a child process running uvicorn in its main thread, against this process's
+SQLite file, with its own in-process fakeredis. Against a room with one seat left:
+
+- opens the spectator streams (GET /spectate/{code}) and reports the worker's resident memory
+  per stream, with no database session open and no seat taken: a user still joins the room
+  after them;
+- that user's socket sends --messages chat lines, --interval apart; every stream must get
+  every line, in order, and the time from send to receipt is reported;
+- a stream dropped mid-way and reopened with its Last-Event-ID gets the lines it missed;
+- on SIGTERM every stream gets the reconnect frame and ends.
+
+    cd backend && python -m benchmarks.spectators --spectators 10000
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import re
+import resource
+import signal
+import time
+import uuid
+from benchmarks import local
+
+LINE = re.compile(rb"data: \w+: linea (\d+) ([\d.]+)\n")
+
+
+def raise_fd_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def server_process(port: int):
+    raise_fd_limit()
+    local.configure()
+    local.setup()
+
+    import uvicorn
+    from main import app
+
+    # uvicorn re-raises the signal it caught once it has shut down; this lets the process exit quietly
+    signal.signal(signal.SIGTERM, lambda *_: None)
+    uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", backlog=8192)).run()
+
+
+def rss_kib(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as status:
+        return int(next(line for line in status if line.startswith("VmRSS:")).split()[1])
+
+
+async def metric(port: int, name: str) -> float:
+    import httpx
+
+    async with httpx.AsyncClient() as client:
+        text = (await client.get(f"http://127.0.0.1:{port}/metrics")).text
+    found = re.search(rf"^{name}(?:{{[^}}]*}})? ([\d.e+-]+)$", text, re.M)
+    return float(found.group(1)) if found else 0.0
+
+
+class Spectator:
+    """A raw HTTP/1.1 client on one stream: counts the chat lines and the time each took to arrive."""
+
+    def __init__(self):
+        self.reader = self.writer = None
+        self.lines: list[int] = []
+        self.delays: list[float] = []
+        self.last_id: str | None = None
+        self.tail = b""
+        self.ended = False
+        self.reconnect = False
+
+    async def open(self, port: int, code: str, last_event_id: str | None = None):
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", port)
+        resume = f"Last-Event-ID: {last_event_id}\r\n" if last_event_id else ""
+        self.writer.write(f"GET /spectate/{code} HTTP/1.1\r\nHost: bench\r\nAccept: text/event-stream\r\n{resume}\r\n".encode())
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        assert head.startswith(b"HTTP/1.1 200"), head
+
+    async def read(self):
+        # Chunked transfer framing is left in the buffer; the patterns don't straddle it in practice
+        while True:
+            chunk = await self.reader.read(65536)
+            if not chunk:
+                break
+            now = time.time()
+            data = self.tail + chunk
+            for number, sent in LINE.findall(data):
+                self.lines.append(int(number))
+                self.delays.append(now - float(sent))
+            ids = re.findall(rb"^id: (\S+)$", data, re.M)
+            if ids:
+                self.last_id = ids[-1].decode()
+            self.reconnect = self.reconnect or b'"type": "reconnect"' in data
+            if data.endswith(b"0\r\n\r\n"):
+                break
+            self.tail = data[data.rfind(b"\n") + 1:]
+        self.ended = True
+
+    def close(self):
+        self.writer.close()
+
+
+async def run(args, port: int, pid: int):
+    import httpx
+    import websockets
+
+    (early_id, early), (_, joiner) = local.create_users(2, prefix=f"spect{uuid.uuid4().hex[:6]}")
+    code = local.create_rooms(1, capacity=2)[0]
+    local.seat([(code, early_id)])
+
+    async with httpx.AsyncClient() as client:
+        for _ in range(300):
+            try:
+                await client.get(f"http://127.0.0.1:{port}/")
+                break
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    api = f"http://127.0.0.1:{port}/api/v1"
+    ws_url = f"ws://127.0.0.1:{port}/ws/chat/{code}"
+
+    # One seat of two taken before the spectators arrive
+    first = await websockets.connect(f"{ws_url}?token={early}")
+    rss_before = rss_kib(pid)
+
+    spectators = [Spectator() for _ in range(args.spectators)]
+    started = time.perf_counter()
+    for batch in range(0, len(spectators), 500):
+        await asyncio.gather(*(spectator.open(port, code) for spectator in spectators[batch:batch + 500]))
+    opened = time.perf_counter() - started
+    readers = [asyncio.ensure_future(spectator.read()) for spectator in spectators]
+    await asyncio.sleep(1)
+    rss_after = rss_kib(pid)
+    open_streams = await metric(port, "spectators_open")
+    sessions = await metric(port, "db_sessions_open")
+    assert open_streams == args.spectators, open_streams
+    assert sessions == 0, sessions
+    print(f"{args.spectators:,} spectator streams opened in {opened:.1f}s; worker memory "
+          f"+{(rss_after - rss_before) / 1024:.1f} MiB ({(rss_after - rss_before) / args.spectators:.1f} KiB per stream), "
+          f"{sessions:.0f} db sessions open")
+
+    async with httpx.AsyncClient() as client:
+        joined = await client.get(f"{api}/rooms/join", params={"room_code": code}, headers={"Authorization": f"Bearer {joiner}"})
+    assert joined.status_code == 200, joined.text
+    print("room of 2 with 1 member and all the spectators: a second user still joins")
+    sender = await websockets.connect(f"{ws_url}?token={joiner}")
+
+    # One stream leaves partway through and comes back with its Last-Event-ID
+    dropout = Spectator()
+    await dropout.open(port, code)
+    dropout_reader = asyncio.ensure_future(dropout.read())
+
+    for i in range(args.messages):
+        await sender.send(f"linea {i} {time.time():.6f}")
+        if i == args.messages // 2:
+            await asyncio.sleep(args.interval)
+            dropout.close()
+            await dropout_reader
+            seen = len(dropout.lines)
+            resumed = Spectator()
+        await asyncio.sleep(args.interval)
+    await resumed.open(port, code, dropout.last_id)
+    resumed_reader = asyncio.ensure_future(resumed.read())
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline and any(len(spectator.lines) < args.messages for spectator in spectators):
+        await asyncio.sleep(0.1)
+    complete = sum(spectator.lines == list(range(args.messages)) for spectator in spectators)
+    delays = sorted(delay for spectator in spectators for delay in spectator.delays)
+    print(f"{args.messages} lines, {args.interval * 1000:.0f} ms apart: {complete:,}/{args.spectators:,} streams got "
+          f"every line in order; send to receipt p50 {delays[len(delays) // 2] * 1000:.0f} ms  "
+          f"p99 {delays[int(len(delays) * 0.99) - 1] * 1000:.0f} ms  max {delays[-1] * 1000:.0f} ms")
+    assert complete == args.spectators
+
+    await asyncio.sleep(0.5)
+    assert dropout.lines + resumed.lines == list(range(args.messages)), (dropout.lines, resumed.lines)
+    print(f"dropped after line {seen - 1}, reopened with Last-Event-ID {dropout.last_id}: got lines {seen}-{args.messages - 1}")
+
+    started = time.perf_counter()
+    os.kill(pid, signal.SIGTERM)
+    await asyncio.wait_for(asyncio.gather(*readers, resumed_reader), timeout=60)
+    ended = time.perf_counter() - started
+    reconnects = sum(spectator.reconnect for spectator in spectators + [resumed])
+    print(f"SIGTERM: {reconnects:,}/{args.spectators + 1:,} streams got the reconnect frame and ended in {ended:.2f}s")
+    assert reconnects == args.spectators + 1
+    for ws in (first, sender):
+        await ws.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--spectators", type=int, default=10000)
+    parser.add_argument("--messages", type=int, default=40)
+    parser.add_argument("--interval", type=float, default=0.25, help="seconds between chat lines")
+    parser.add_argument("--port", type=int, default=8794)
+    args = parser.parse_args()
+
+    raise_fd_limit()
+    local.configure()
+    local.setup()
+
+    context = multiprocessing.get_context("spawn")
+    process = context.Process(target=server_process, args=(args.port,))
+    process.start()
+    try:
+        asyncio.run(run(args, args.port, process.pid))
+    finally:
+        process.join(30)
+        if process.is_alive():
+            process.kill()
+
+
+if __name__ == "__main__":
+    main()
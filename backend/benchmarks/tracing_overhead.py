@@ -0,0 +1,84 @@
+"""Cost of the tracing hooks: per-span microbenchmark plus end-to-end runs with
+TRACING_ENABLED=0 and =1 (each in its own process, the flag is read at import).
+
+    cd backend && python -m benchmarks.tracing_overhead --requests 300 --concurrency 10
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def span_cost(iterations: int) -> dict:
+    from app.core import tracing
+
+    def loop(body):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            body()
+        return (time.perf_counter() - started) / iterations * 1e9
+
+    def bare():
+        pass
+
+    def traced():
+        with tracing.span("bench", "noop"):
+            pass
+
+    token = tracing.start_trace()
+    baseline = loop(bare)
+    inside_trace = loop(traced)
+    tracing.end_trace(token)
+    outside_trace = loop(traced)
+    return {
+        "baseline_ns": round(baseline, 1),
+        "span_in_trace_ns": round(inside_trace - baseline, 1),
+        "span_without_trace_ns": round(outside_trace - baseline, 1),
+    }
+
+
+def end_to_end(enabled: bool, args) -> dict:
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        output = f.name
+    env = {**os.environ, "TRACING_ENABLED": "1" if enabled else "0"}
+    subprocess.run(
+        [
+            sys.executable, "-m", "benchmarks.run",
+            "--scenarios", *args.scenarios,
+            "--requests", str(args.requests),
+            "--concurrency", str(args.concurrency),
+            "--alloc-requests", "0",
+            "--output", output,
+        ],
+        env=env,
+        check=True,
+    )
+    with open(output) as f:
+        results = json.load(f)["scenarios"]
+    os.unlink(output)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Overhead of request tracing")
+    parser.add_argument("--iterations", type=int, default=200_000)
+    parser.add_argument("--scenarios", nargs="+", default=["room_search", "ws_room_message", "ws_chatbot_turn"])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    print("span cost:", json.dumps(span_cost(args.iterations)))
+
+    off = end_to_end(False, args)
+    on = end_to_end(True, args)
+    for name in args.scenarios:
+        before, after = off[name]["throughput_per_sec"], on[name]["throughput_per_sec"]
+        overhead = (before - after) / before * 100 if before else 0
+        print(f"{name:<18} off {before:>9.1f} ops/s  on {after:>9.1f} ops/s  overhead {overhead:>6.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Write-behind queue under failures: a database outage, rows with bad data and a full queue.
+
+Room messages go through a WriteBehindQueue while statements to the database fail with
+OperationalError (as when the connection is lost or the database is locked):
+
+- outage: --rows rows are queued during --outage seconds of failures; once the database is
+  back every row must be written, none dropped, and the time to catch up is reported;
+- bad data: rows missing a required column (IntegrityError) or with a value that doesn't bind
+  are the only ones dropped;
+- full queue: with max_pending rows already waiting, rows past it are dropped, the rest written.
+
+    cd backend && python -m benchmarks.write_behind --rows 20000 --outage 3
+"""
+import argparse
+import time
+import uuid
+from datetime import datetime, timezone
+from benchmarks import local
+
+
+class Outage:
+    """Fails every statement on the engine while `down` is set."""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        from sqlalchemy.exc import OperationalError
+
+        self.down = False
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def fail(conn, cursor, statement, parameters, context, executemany):
+            if self.down and statement.lstrip().upper().startswith("INSERT"):
+                raise OperationalError(statement, None, Exception("database is unavailable"))
+
+
+def row(room_id) -> dict:
+    return {
+        "id": uuid.uuid4(),
+        "room_id": room_id,
+        "sender_name": uuid.UUID(int=0),
+        "content": "hola",
+        "timestamp": datetime.now(timezone.utc),
+    }
+
+
+def drain(writer, timeout: float = 120) -> float:
+    started = time.perf_counter()
+    deadline = time.monotonic() + timeout
+    while writer.pending() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    # The last batch may still be gathering or being written
+    time.sleep(writer.flush_interval * 2)
+    with writer._write_lock:
+        pass
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--outage", type=float, default=3.0, help="seconds the database refuses inserts")
+    args = parser.parse_args()
+
+    local.configure()
+    local.setup()
+    from app.db.database import engine
+    from app.db.write_behind import WriteBehindQueue
+    from app.models.rooms import RoomMessage
+
+    outage = Outage(engine)
+    room_id = uuid.uuid4()
+
+    writer = WriteBehindQueue(RoomMessage, batch_size=200, flush_interval=0.05)
+    outage.down = True
+    started = time.perf_counter()
+    for i in range(args.rows):
+        writer.put(row(room_id))
+        if i % 1000 == 999:
+            time.sleep(args.outage / (args.rows / 1000))
+    time.sleep(max(0.0, args.outage - (time.perf_counter() - started)))
+    outage.down = False
+    caught_up = drain(writer)
+    print(f"outage: {args.rows:,} rows queued over {args.outage:.1f}s of failures; written {writer.written:,}, "
+          f"dropped {writer.dropped}, caught up {caught_up:.2f}s after the database came back")
+    assert writer.written == args.rows and writer.dropped == 0
+    writer.stop()
+
+    writer = WriteBehindQueue(RoomMessage, batch_size=200, flush_interval=0.05)
+    for i in range(1000):
+        writer.put({**row(room_id), "sender_name": None} if i % 20 == 0 else row(room_id))
+    for _ in range(10):
+        writer.put({**row(room_id), "sender_name": "not a uuid"})
+    drain(writer)
+    print(f"bad data: 1,010 rows of which 50 miss a required column and 10 don't bind; written {writer.written:,}, dropped {writer.dropped}")
+    assert writer.written == 950 and writer.dropped == 60
+    writer.stop()
+
+    writer = WriteBehindQueue(RoomMessage, batch_size=200, flush_interval=0.05, max_pending=1000)
+    outage.down = True
+    for _ in range(5000):
+        writer.put(row(room_id))
+    time.sleep(1)
+    outage.down = False
+    drain(writer)
+    print(f"full queue: 5,000 rows into a queue of 1,000 during an outage; written {writer.written:,}, dropped {writer.dropped:,}")
+    assert writer.written == 1000 and writer.dropped == 4000
+    writer.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Room connection registry: memory per connection and add/remove/broadcast cost at 10k-100k sockets.
+
+Uses in-memory sockets (no network), so it measures the registry itself: the Connection
+record, plus its outbound queue and writer task while frames are in flight. The old list-per-room registry is
+measured alongside for reference. It also checks the edge cases the redesign fixes:
+double disconnect, sockets leaving mid-broadcast and a slow consumer filling its queue.
+
+    cd backend && python -m benchmarks.ws_connections --counts 10000 50000 100000
+"""
+import argparse
+import asyncio
+import gc
+import time
+import tracemalloc
+import uuid
+from benchmarks import local
+
+
+class MemorySocket:
+    """Stands in for a Starlette WebSocket; send_text can be made to block to mimic a stalled peer."""
+
+    __slots__ = ("sent", "closed", "stalled")
+
+    def __init__(self):
+        self.sent = 0
+        self.closed = None
+        self.stalled: asyncio.Event | None = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        if self.stalled is not None:
+            await self.stalled.wait()
+        self.sent += 1
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        self.closed = code
+
+
+class ListManager:
+    """The previous registry: a list per room, list.remove on disconnect."""
+
+    def __init__(self):
+        self.active_connections = {}
+
+    async def connect(self, websocket, room_code: str):
+        await websocket.accept()
+        self.active_connections.setdefault(room_code, []).append(websocket)
+
+    def disconnect(self, websocket, room_code: str):
+        self.active_connections[room_code].remove(websocket)
+        if not self.active_connections[room_code]:
+            del self.active_connections[room_code]
+
+
+def measure(label: str, count: int, fn):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    result = asyncio.get_event_loop().run_until_complete(fn())
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{label:<28} {count:>7} sockets  {(after - before) / count:>6.0f} B/conn retained  "
+        f"{(peak - before) / count:>6.0f} B/conn peak  {elapsed / count * 1e6:>5.1f} us/conn"
+    )
+    return result
+
+
+def run(count: int, per_room: int):
+    from app.sockets.connections import ConnectionManager
+
+    loop = asyncio.get_event_loop()
+    codes = [f"room{i // per_room}" for i in range(count)]
+    sockets = [MemorySocket() for _ in range(count)]
+    ids = [uuid.uuid4().hex for _ in range(count)]
+
+    old = ListManager()
+
+    async def connect_old():
+        for websocket, code in zip(sockets, codes):
+            await old.connect(websocket, code)
+
+    measure("list registry (before)", count, connect_old)
+    started = time.perf_counter()
+    for websocket, code in zip(reversed(sockets), reversed(codes)):
+        old.disconnect(websocket, code)
+    print(f"{'':<28} {'':>7}          disconnect {(time.perf_counter() - started) / count * 1e6:.2f} us")
+    del old
+
+    manager = ConnectionManager()
+
+    async def connect_new():
+        return [await manager.connect(websocket, code, connection_id, connection_id)
+                for websocket, code, connection_id in zip(sockets, codes, ids)]
+
+    connections = measure("dict + slots record (idle)", count, connect_new)
+
+    async def broadcast_all():
+        for code in dict.fromkeys(codes):
+            await manager.broadcast("hola", code)
+        await asyncio.sleep(0)  # let the writers drain once
+        await asyncio.sleep(0)
+
+    started = time.perf_counter()
+    loop.run_until_complete(broadcast_all())
+    delivered = sum(websocket.sent for websocket in sockets)
+    print(f"{'':<28} {'':>7}          broadcast+write {(time.perf_counter() - started) / count * 1e6:.2f} us/frame, {delivered}/{count} delivered")
+
+    async def enqueue_only():
+        for code in dict.fromkeys(codes):
+            await manager.broadcast("hola", code)
+
+    # Peak: every socket holding a queued frame and a writer task at once
+    measure("  broadcast to every room", count, enqueue_only)
+    loop.run_until_complete(asyncio.sleep(0))
+
+    async def disconnect_all():
+        for connection in connections:
+            await manager.disconnect(connection)
+
+    started = time.perf_counter()
+    loop.run_until_complete(disconnect_all())
+    print(f"{'':<28} {'':>7}          disconnect {(time.perf_counter() - started) / count * 1e6:.2f} us, {len(manager)} left, {len(manager._locks)} locks left")
+    loop.run_until_complete(asyncio.sleep(0))
+
+
+async def edge_cases():
+    from app.sockets import connections as registry
+    from app.sockets.connections import ConnectionManager
+
+    manager = ConnectionManager()
+
+    # Double disconnect is a no-op
+    connection = await manager.connect(MemorySocket(), "a", "one")
+    await manager.disconnect(connection)
+    await manager.disconnect(connection)
+    assert len(manager) == 0 and "a" not in manager.rooms
+
+    # Sockets leaving while a broadcast is iterating the room
+    members = [await manager.connect(MemorySocket(), "b", f"m{i}") for i in range(100)]
+
+    async def leave_half():
+        for connection in members[::2]:
+            await manager.disconnect(connection)
+
+    await asyncio.gather(manager.broadcast("x", "b"), leave_half(), manager.broadcast("y", "b"))
+    assert len(manager.connections("b")) == 50
+
+    # A stalled peer fills its queue and is dropped; the others keep receiving
+    stalled = MemorySocket()
+    stalled.stalled = asyncio.Event()
+    slow = await manager.connect(stalled, "b", "slow")
+    for i in range(registry.WS_SEND_QUEUE + 2):
+        await manager.broadcast(f"frame {i}", "b")
+        await asyncio.sleep(0)  # senders yield between messages, giving writers their turn
+    await asyncio.sleep(0.01)
+    assert "slow" not in manager.rooms["b"] and stalled.closed == 1013
+    assert all(connection.websocket.sent >= registry.WS_SEND_QUEUE for connection in members[1::2])
+    await manager.disconnect(slow)
+
+    # Expiry: the last frame is written before the close
+    await manager.close_room("b")
+    await asyncio.sleep(0.01)
+    assert all(connection.websocket.closed == 4000 for connection in members[1::2])
+    print("edge cases ok: double disconnect, leave during broadcast, slow consumer dropped, close after last frame")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--counts", type=int, nargs="+", default=[10_000, 50_000, 100_000])
+    parser.add_argument("--per-room", type=int, default=2)
+    args = parser.parse_args()
+
+    local.configure()
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    asyncio.get_event_loop().run_until_complete(edge_cases())
+    for count in args.counts:
+        run(count, args.per_room)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Soak test: thousands of open room sockets on one worker with a deliberately small DB pool.
+
+    cd backend && python -m benchmarks.ws_soak --sockets 2000 --pool-size 2
+"""
+import argparse
+import asyncio
+import json
+import time
+from benchmarks import local
+
+
+async def soak(server, users, codes, per_room: int, ramp: int, hold: float) -> dict:
+    import websockets
+    from app.core.metrics import DB_SESSIONS_OPEN, WS_OPEN
+    from app.db.database import engine
+
+    peak = {"db_sessions": 0, "pool_checked_out": 0}
+
+    async def sample():
+        while True:
+            peak["db_sessions"] = max(peak["db_sessions"], DB_SESSIONS_OPEN.value())
+            peak["pool_checked_out"] = max(peak["pool_checked_out"], engine.pool.checkedout())
+            await asyncio.sleep(0.01)
+
+    async def chat(index: int, token: str):
+        room_code = codes[index // per_room]
+        ws = await websockets.connect(f"{server.ws_url}/ws/chat/{room_code}?token={token}")
+        await ws.send(f"hello from {index}")
+        while not (await ws.recv()).endswith(f"hello from {index}"):
+            pass
+        return ws
+
+    sampler = asyncio.create_task(sample())
+    sockets = []
+    started = time.perf_counter()
+    for offset in range(0, len(users), ramp):
+        batch = users[offset:offset + ramp]
+        sockets += await asyncio.gather(*(chat(offset + i, token) for i, (_, token) in enumerate(batch)))
+    connect_seconds = time.perf_counter() - started
+
+    await asyncio.sleep(hold)
+    result = {
+        "sockets_open": WS_OPEN.value(endpoint="room"),
+        "db_sessions_while_open": DB_SESSIONS_OPEN.value(),
+        "peak_db_sessions": peak["db_sessions"],
+        "peak_pool_checked_out": peak["pool_checked_out"],
+        "connect_and_echo_seconds": round(connect_seconds, 3),
+    }
+
+    await asyncio.gather(*(ws.close() for ws in sockets))
+    sampler.cancel()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sockets", type=int, default=2000)
+    parser.add_argument("--per-room", type=int, default=2)
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--ramp", type=int, default=100, help="sockets opened concurrently per step")
+    parser.add_argument("--hold", type=float, default=2.0, help="seconds to keep every socket open")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    local.configure(pool_size=args.pool_size, max_overflow=0)
+    local.setup()
+
+    from app.db.database import session_scope
+    from app.models.rooms import RoomMessage
+    from app.services.rooms import room_message_writer
+
+    users = local.create_users(args.sockets)
+    codes = local.create_rooms(-(-args.sockets // args.per_room), args.per_room)
+    local.seat([(codes[i // args.per_room], user_id) for i, (user_id, _) in enumerate(users)])
+
+    with local.Server(args.port) as server:
+        result = asyncio.run(soak(server, users, codes, args.per_room, args.ramp, args.hold))
+
+    room_message_writer.flush()
+    with session_scope() as db:
+        result["messages_persisted"] = db.query(RoomMessage).count()
+    result.update(pool_size=args.pool_size, max_overflow=0)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
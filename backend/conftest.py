@@ -0,0 +1,9 @@
+"""Tests run against the benchmark stand-ins: file-backed SQLite, fakeredis and a fake LLM."""
+import os
+import tempfile
+from benchmarks import local
+
+# A database of their own, so they can run next to a benchmark
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='onlinex-tests-'), 'tests.sqlite')}")
+local.configure(pool_size=20, max_overflow=40)
+local.setup()
@@ -1,16 +1,52 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
-from app.sockets.chat_ws import ws_chat
+from fastapi.responses import PlainTextResponse
+from app.core.metrics import render as render_metrics
+from app.core.tracing import TimingMiddleware, profiler
+from app.sockets.chat_ws import ws_chat, manager as room_manager
+from app.sockets.expiry import room_timers
+from app.sockets.retractions import retractions
+from app.agents.jobs import AGENT_MODE, agent_jobs
 from app.routes.register import register
 from app.routes.login import login
 from app.routes.rooms import rooms
 from app.routes.complementary_routes import services
-from app.sockets.chatbot_ws import chatbot_ws
+from app.routes.analytics import analytics
+from app.sockets.chatbot_ws import chatbot_ws, manager as chatbot_manager
+from app.sockets.drain import drain
+import os
+
+load_dotenv()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Room expiry: closes local sockets at expires_at and deactivates due rooms in batches
+    room_timers.start(on_expire=room_manager.close_room)
+    # Async moderation retractions (published by Celery), membership and presence events reach the sockets of every worker
+    retractions.start(on_retract=lambda room_code, frame: room_manager.broadcast(frame, room_code))
+    # Out-of-process agents: listen on this worker's reply stream
+    if AGENT_MODE == "stream":
+        agent_jobs.start()
+    # Graceful shutdown: starts on SIGTERM, ahead of the server closing the sockets
+    drain.start(rooms=room_manager, chatbots=chatbot_manager)
+    yield
+    await drain.drain()
+    if AGENT_MODE == "stream":
+        agent_jobs.stop()
+    retractions.stop()
+    await room_timers.stop()
+    # Writes queued after the drain's flush (turns that finished late)
+    drain.flush()
+
 
 app = FastAPI(
     title="OnLinex",
     description="Beta OnLinex",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # CORS CONFIG
@@ -28,6 +64,9 @@ app.add_middleware(
     allow_headers=["*"],     # Authorization, Content-Type, etc.
 )
 
+# Request histogram + Server-Timing header (TRACING_ENABLED=0 turns it into a pass-through)
+app.add_middleware(TimingMiddleware)
+
 # ROUTERS
 app.include_router(ws_chat, tags=["chat"])
 app.include_router(chatbot_ws, prefix="/ai", tags=["chatbot"])
@@ -35,3 +74,21 @@ app.include_router(register, prefix="/api/v1", tags=["register"])
 app.include_router(login, prefix="/api/v1", tags=["login"])
 app.include_router(rooms, prefix="/api/v1", tags=["rooms"])
 app.include_router(services, prefix="/api/v1", tags=["services"])
+app.include_router(analytics, prefix="/api/v1", tags=["analytics"])
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    return render_metrics()
+
+
+# Opt-in sampling profiler: PROFILER_ENABLED=1, then fetch collapsed stacks for flamegraph.pl / speedscope
+if os.getenv("PROFILER_ENABLED") == "1":
+    profiler.start()
+
+    @app.get("/debug/profile", response_class=PlainTextResponse, include_in_schema=False)
+    def profile(reset: bool = False):
+        stacks = profiler.collapsed()
+        if reset:
+            profiler.reset()
+        return stacks
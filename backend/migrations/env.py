@@ -0,0 +1,66 @@
+from logging.config import fileConfig
+import re
+from alembic import context
+from sqlalchemy import create_engine, pool
+from dotenv import load_dotenv
+from app.models import Base
+import os
+
+load_dotenv()
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+if not DATABASE_URL:
+    raise ValueError("DATABASE_URL environment variable is not set")
+
+target_metadata = Base.metadata
+
+# Created by raw DDL, not the models: FTS5 tables (and their shadow tables) and the
+# partitions of room_messages (migration 0006, app.services.message_archive)
+UNMODELED_TABLES = re.compile(r"room_messages_(fts.*|p\d{8}|default|legacy)")
+
+
+def include_object(obj, name, type_, reflected, compare_to, dialect_name=None):
+    if type_ == "table" and UNMODELED_TABLES.fullmatch(name):
+        return False
+    # Indexes declared for one backend only (info={"dialect": ...}, see RoomMessage)
+    if type_ == "index" and obj.info.get("dialect", dialect_name) != dialect_name:
+        return False
+    return True
+
+
+def run_migrations_offline():
+    """`alembic upgrade head --sql`: print the DDL instead of running it."""
+    context.configure(
+        url=DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    engine = create_engine(DATABASE_URL, poolclass=pool.NullPool)
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            # SQLite can't ALTER most things in place; batch mode rebuilds the table
+            render_as_batch=connection.dialect.name == "sqlite",
+            # and reflects the UUID columns back as NUMERIC, which autogenerate reads as a change
+            compare_type=connection.dialect.name != "sqlite",
+            include_object=lambda *args: include_object(*args, dialect_name=connection.dialect.name),
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
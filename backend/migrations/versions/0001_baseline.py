@@ -0,0 +1,97 @@
+"""baseline: the schema as the models defined it before migrations were introduced
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+
+A database created before migrations is stamped with this revision; what was added to the
+models since then comes in 0001a.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", UUID(as_uuid=True), primary_key=True),
+        sa.Column("username", sa.String(), nullable=True),
+        sa.Column("hashed_password", sa.String(), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("type_user", sa.String(), nullable=True),
+        sa.Column("temp_expiration_date", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_users_username", "users", ["username"])
+
+    op.create_table(
+        "conversations",
+        sa.Column("id", UUID(as_uuid=True), primary_key=True),
+        sa.Column("user_id", UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("agent_name", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+
+    op.create_table(
+        "messages",
+        sa.Column("id", UUID(as_uuid=True), primary_key=True),
+        sa.Column("conversation_id", UUID(as_uuid=True), sa.ForeignKey("conversations.id", ondelete="CASCADE"), nullable=True),
+        sa.Column("sender", sa.String(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+
+    op.create_table(
+        "agent_memory_summaries",
+        sa.Column("id", UUID(as_uuid=True), primary_key=True),
+        sa.Column("conversation_id", UUID(as_uuid=True), sa.ForeignKey("conversations.id", ondelete="CASCADE"), nullable=True),
+        sa.Column("summary", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+
+    op.create_table(
+        "rooms",
+        sa.Column("id", UUID(as_uuid=True), primary_key=True),
+        sa.Column("name", sa.String(), nullable=True),
+        sa.Column("code", sa.String(), nullable=True),
+        sa.Column("is_public", sa.Boolean(), nullable=True),
+        sa.Column("max_users", sa.Integer(), nullable=True),
+        sa.Column("language", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+    )
+    op.create_index("ix_rooms_code", "rooms", ["code"], unique=True)
+
+    op.create_table(
+        "room_members",
+        sa.Column("id", UUID(as_uuid=True), primary_key=True),
+        sa.Column("room_id", UUID(as_uuid=True), sa.ForeignKey("rooms.id", ondelete="CASCADE"), nullable=True),
+        sa.Column("user_id", UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("is_host", sa.Boolean(), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+    )
+
+    op.create_table(
+        "room_messages",
+        sa.Column("id", UUID(as_uuid=True), primary_key=True),
+        sa.Column("room_id", UUID(as_uuid=True), sa.ForeignKey("rooms.id", ondelete="CASCADE"), nullable=True),
+        sa.Column("sender_name", UUID(as_uuid=True), nullable=False),
+        sa.Column("content", sa.String(), nullable=False),
+        sa.Column("timestamp", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+
+
+def downgrade():
+    for table in (
+        "room_messages", "room_members", "rooms",
+        "agent_memory_summaries", "messages", "conversations", "users",
+    ):
+        op.drop_table(table)
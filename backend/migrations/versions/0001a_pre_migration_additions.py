@@ -0,0 +1,114 @@
+"""what the models gained between the baseline and the first migrations
+
+Revision ID: 0001a
+Revises: 0001
+Create Date: 2026-10-19
+
+- room_members.joined_at (host hand-off order), indexed
+- uq_conversations_user_agent: one conversation per user and agent, for get-or-create's
+  ON CONFLICT. Duplicates left by the old lookup-then-insert are merged first: the oldest
+  conversation of each (user_id, agent_name) keeps the messages and summaries of the others.
+- created_at/timestamp indexes on conversations, messages, rooms and room_messages, and
+  messages (conversation_id, created_at, id) for history pages
+- the hourly analytics rollups and their watermarks
+
+Every step checks first: databases migrated before this revision was split out of 0001
+already have all of it.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001a"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("ix_room_members_joined_at", "room_members", ["joined_at"]),
+    ("ix_conversations_created_at", "conversations", ["created_at"]),
+    ("ix_messages_created_at", "messages", ["created_at"]),
+    ("ix_messages_conversation_created", "messages", ["conversation_id", "created_at", "id"]),
+    ("ix_rooms_created_at", "rooms", ["created_at"]),
+    ("ix_room_messages_timestamp", "room_messages", ["timestamp"]),
+)
+ROLLUPS = ("room_activity_hourly", "chat_activity_hourly", "aggregation_watermarks")
+
+
+def merge_duplicate_conversations(bind):
+    rows = bind.execute(sa.text(
+        "SELECT c.id, c.user_id, c.agent_name FROM conversations AS c "
+        "JOIN (SELECT user_id, agent_name FROM conversations WHERE agent_name IS NOT NULL "
+        "      GROUP BY user_id, agent_name HAVING COUNT(*) > 1) AS d "
+        "ON c.user_id = d.user_id AND c.agent_name = d.agent_name "
+        "ORDER BY c.user_id, c.agent_name, c.created_at, c.id"
+    )).all()
+    keep = {}
+    for conversation_id, user_id, agent_name in rows:
+        kept = keep.setdefault((user_id, agent_name), conversation_id)
+        if kept == conversation_id:
+            continue
+        params = {"kept": kept, "duplicate": conversation_id}
+        for table in ("messages", "agent_memory_summaries"):
+            bind.execute(sa.text(f"UPDATE {table} SET conversation_id = :kept WHERE conversation_id = :duplicate"), params)
+        bind.execute(sa.text("DELETE FROM conversations WHERE id = :duplicate"), params)
+    return len(rows) - len(keep)
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if "joined_at" not in {column["name"] for column in inspector.get_columns("room_members")}:
+        with op.batch_alter_table("room_members") as batch:
+            batch.add_column(sa.Column("joined_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True))
+
+    existing = {
+        index["name"]
+        for table in {table for _, table, _ in INDEXES} | {"conversations"}
+        for index in inspector.get_indexes(table)
+    }
+    for name, table, columns in INDEXES:
+        if name not in existing:
+            op.create_index(name, table, columns)
+
+    if "uq_conversations_user_agent" not in existing:
+        merged = merge_duplicate_conversations(bind)
+        if merged:
+            print(f"[MIGRATION] merged {merged} duplicate conversations into the oldest of their user and agent")
+        op.create_index("uq_conversations_user_agent", "conversations", ["user_id", "agent_name"], unique=True)
+
+    tables = set(inspector.get_table_names())
+    if "room_activity_hourly" not in tables:
+        op.create_table(
+            "room_activity_hourly",
+            sa.Column("hour", sa.DateTime(timezone=True), primary_key=True),
+            sa.Column("language", sa.String(), primary_key=True),
+            sa.Column("rooms_created", sa.Integer(), nullable=False),
+            sa.Column("joins", sa.Integer(), nullable=False),
+            sa.Column("messages", sa.Integer(), nullable=False),
+        )
+    if "chat_activity_hourly" not in tables:
+        op.create_table(
+            "chat_activity_hourly",
+            sa.Column("hour", sa.DateTime(timezone=True), primary_key=True),
+            sa.Column("profile", sa.String(), primary_key=True),
+            sa.Column("conversations_started", sa.Integer(), nullable=False),
+            sa.Column("user_messages", sa.Integer(), nullable=False),
+            sa.Column("agent_messages", sa.Integer(), nullable=False),
+        )
+    if "aggregation_watermarks" not in tables:
+        op.create_table(
+            "aggregation_watermarks",
+            sa.Column("name", sa.String(), primary_key=True),
+            sa.Column("processed_until", sa.DateTime(timezone=True), nullable=False),
+        )
+
+
+def downgrade():
+    for table in reversed(ROLLUPS):
+        op.drop_table(table)
+    op.drop_index("uq_conversations_user_agent", table_name="conversations")
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+    with op.batch_alter_table("room_members") as batch:
+        batch.drop_column("joined_at")
@@ -0,0 +1,40 @@
+"""indexes for the hot filters in the routes, sockets and maintenance tasks
+
+Revision ID: 0002
+Revises: 0001a
+Create Date: 2026-10-19
+
+- room_members (user_id, is_active): "already in another room" on create/join/search
+- room_members (room_id, is_active): member counts, host election, presence checks
+- rooms (language, is_public, is_active, expires_at): /room/search/
+- rooms (expires_at): clean_expired_rooms and the expiry backfill
+- room_messages (room_id, timestamp): a room's history in time order
+- users (temp_expiration_date): purging guests whose token window has passed
+
+conversations (user_id, agent_name) is already covered by uq_conversations_user_agent.
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001a"
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("ix_room_members_user_active", "room_members", ["user_id", "is_active"]),
+    ("ix_room_members_room_active", "room_members", ["room_id", "is_active"]),
+    ("ix_rooms_search", "rooms", ["language", "is_public", "is_active", "expires_at"]),
+    ("ix_rooms_expires_at", "rooms", ["expires_at"]),
+    ("ix_room_messages_room_timestamp", "room_messages", ["room_id", "timestamp"]),
+    ("ix_users_temp_expiration_date", "users", ["temp_expiration_date"]),
+)
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
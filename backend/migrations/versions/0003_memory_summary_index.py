@@ -0,0 +1,24 @@
+"""index agent_memory_summaries by conversation for memory retrieval
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_agent_memory_summaries_conversation_created",
+        "agent_memory_summaries",
+        ["conversation_id", "created_at"],
+    )
+
+
+def downgrade():
+    op.drop_index("ix_agent_memory_summaries_conversation_created", table_name="agent_memory_summaries")
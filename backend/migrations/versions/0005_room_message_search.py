@@ -0,0 +1,72 @@
+"""full-text search over room_messages
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+
+Postgres: search_vector tsvector column, backfilled from content with each room's language
+config, and a GIN index on (room_id, search_vector) (needs the btree_gin extension, trusted
+since Postgres 13). New rows get their vector from the INSERT (app.services.message_search).
+The backfill is a single UPDATE over room_messages: on a large table, run it off-peak.
+
+SQLite (local runs): an external-content FTS5 table kept in sync by triggers, built from the
+existing rows. search_vector is added too so both schemas match the model, and stays NULL.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+# Frozen copy of app.services.message_search.SEARCH_CONFIGS
+SEARCH_CONFIGS = {
+    "da": "danish", "de": "german", "en": "english", "es": "spanish", "fi": "finnish", "fr": "french",
+    "hu": "hungarian", "it": "italian", "nl": "dutch", "no": "norwegian", "pt": "portuguese",
+    "ro": "romanian", "ru": "russian", "sv": "swedish", "tr": "turkish",
+}
+
+SQLITE_FTS = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS room_messages_fts USING fts5("
+    "content, room_id, content='room_messages', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS room_messages_fts_insert AFTER INSERT ON room_messages BEGIN "
+    "INSERT INTO room_messages_fts(rowid, content, room_id) VALUES (new.rowid, new.content, new.room_id); END",
+    "CREATE TRIGGER IF NOT EXISTS room_messages_fts_delete AFTER DELETE ON room_messages BEGIN "
+    "INSERT INTO room_messages_fts(room_messages_fts, rowid, content, room_id) VALUES ('delete', old.rowid, old.content, old.room_id); END",
+    "CREATE TRIGGER IF NOT EXISTS room_messages_fts_update AFTER UPDATE OF content ON room_messages BEGIN "
+    "INSERT INTO room_messages_fts(room_messages_fts, rowid, content, room_id) VALUES ('delete', old.rowid, old.content, old.room_id); "
+    "INSERT INTO room_messages_fts(rowid, content, room_id) VALUES (new.rowid, new.content, new.room_id); END",
+    "INSERT INTO room_messages_fts(room_messages_fts) VALUES ('rebuild')",
+)
+
+
+def upgrade():
+    with op.batch_alter_table("room_messages") as batch:
+        batch.add_column(sa.Column("search_vector", postgresql.TSVECTOR().with_variant(sa.Text(), "sqlite"), nullable=True))
+
+    if op.get_bind().dialect.name == "postgresql":
+        cases = " ".join(f"WHEN '{code}' THEN '{config}'" for code, config in SEARCH_CONFIGS.items())
+        op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+        op.execute(
+            "UPDATE room_messages AS m "
+            f"SET search_vector = to_tsvector((CASE lower(left(r.language, 2)) {cases} ELSE 'simple' END)::regconfig, m.content) "
+            "FROM rooms AS r WHERE r.id = m.room_id"
+        )
+        op.create_index("ix_room_messages_search", "room_messages", ["room_id", "search_vector"], postgresql_using="gin")
+    else:
+        for statement in SQLITE_FTS:
+            op.execute(statement)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_index("ix_room_messages_search", table_name="room_messages")
+    else:
+        for name in ("room_messages_fts_insert", "room_messages_fts_delete", "room_messages_fts_update"):
+            op.execute(f"DROP TRIGGER IF EXISTS {name}")
+        op.execute("DROP TABLE IF EXISTS room_messages_fts")
+
+    with op.batch_alter_table("room_messages") as batch:
+        batch.drop_column("search_vector")
@@ -0,0 +1,126 @@
+"""time-partitioned room_messages
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+
+Postgres: room_messages becomes a table partitioned by RANGE (timestamp), so messages past
+retention are dropped a partition at a time (app.services.message_archive) instead of row
+by row. Nothing is copied: the existing table is attached as the first partition, covering
+everything before tomorrow (UTC), and daily partitions for the next days plus a DEFAULT
+partition are created next to it; the archival task keeps creating partitions ahead.
+Attaching builds the new (id, timestamp) primary key over the existing rows and locks the
+table while it does: run it in a quiet window.
+
+Both backends: the primary key becomes (id, timestamp), since a partitioned table's keys
+must include the partition column, and the room_id foreign key is dropped: messages outlive
+their room until their partition expires, and archives can be restored after it is gone.
+SQLite rebuilds the table, so the FTS5 triggers are recreated and the index rebuilt.
+"""
+import warnings
+from datetime import datetime, timedelta, timezone
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+# Daily partitions created after the attached one; later ones come from the archival task
+PARTITIONS_AHEAD = 3
+NAMING = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+INDEXES = (
+    'CREATE INDEX ix_room_messages_timestamp ON room_messages ("timestamp")',
+    'CREATE INDEX ix_room_messages_room_timestamp ON room_messages (room_id, "timestamp")',
+    "CREATE INDEX ix_room_messages_search ON room_messages USING gin (room_id, search_vector)",
+)
+
+# Frozen copy of migration 0005's FTS5 triggers: rebuilding the table drops them
+SQLITE_FTS = (
+    "CREATE TRIGGER IF NOT EXISTS room_messages_fts_insert AFTER INSERT ON room_messages BEGIN "
+    "INSERT INTO room_messages_fts(rowid, content, room_id) VALUES (new.rowid, new.content, new.room_id); END",
+    "CREATE TRIGGER IF NOT EXISTS room_messages_fts_delete AFTER DELETE ON room_messages BEGIN "
+    "INSERT INTO room_messages_fts(room_messages_fts, rowid, content, room_id) VALUES ('delete', old.rowid, old.content, old.room_id); END",
+    "CREATE TRIGGER IF NOT EXISTS room_messages_fts_update AFTER UPDATE OF content ON room_messages BEGIN "
+    "INSERT INTO room_messages_fts(room_messages_fts, rowid, content, room_id) VALUES ('delete', old.rowid, old.content, old.room_id); "
+    "INSERT INTO room_messages_fts(rowid, content, room_id) VALUES (new.rowid, new.content, new.room_id); END",
+    "INSERT INTO room_messages_fts(room_messages_fts) VALUES ('rebuild')",
+)
+
+
+def upgrade():
+    op.execute('UPDATE room_messages SET "timestamp" = CURRENT_TIMESTAMP WHERE "timestamp" IS NULL')
+    if op.get_bind().dialect.name != "postgresql":
+        # Batch mode warns that the new key differs from the reflected one, which is the point
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", "Table '_alembic_tmp_room_messages' specifies columns")
+            with op.batch_alter_table("room_messages", recreate="always", naming_convention=NAMING) as batch:
+                batch.drop_constraint("fk_room_messages_room_id_rooms", type_="foreignkey")
+                batch.alter_column("timestamp", existing_type=sa.DateTime(timezone=True), nullable=False)
+                batch.create_primary_key("pk_room_messages", ["id", "timestamp"])
+        for statement in SQLITE_FTS:
+            op.execute(statement)
+        return
+
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    cutover = today + timedelta(days=1)
+
+    op.execute("ALTER TABLE room_messages RENAME TO room_messages_legacy")
+    for index in ("ix_room_messages_timestamp", "ix_room_messages_room_timestamp", "ix_room_messages_search"):
+        op.execute(f"ALTER INDEX {index} RENAME TO {index}_legacy")
+    op.execute("ALTER TABLE room_messages_legacy DROP CONSTRAINT room_messages_room_id_fkey")
+    op.execute('ALTER TABLE room_messages_legacy ALTER COLUMN "timestamp" SET NOT NULL')
+    op.execute(
+        "ALTER TABLE room_messages_legacy DROP CONSTRAINT room_messages_pkey, "
+        'ADD CONSTRAINT room_messages_legacy_pkey PRIMARY KEY (id, "timestamp")'
+    )
+    # A matching CHECK lets ATTACH skip its own validation scan
+    op.execute(f"ALTER TABLE room_messages_legacy ADD CONSTRAINT room_messages_legacy_bound CHECK (\"timestamp\" < '{cutover.isoformat()}')")
+
+    op.execute('CREATE TABLE room_messages (LIKE room_messages_legacy INCLUDING DEFAULTS) PARTITION BY RANGE ("timestamp")')
+    op.execute('ALTER TABLE room_messages ADD CONSTRAINT room_messages_pkey PRIMARY KEY (id, "timestamp")')
+    for statement in INDEXES:
+        op.execute(statement)
+    # The legacy indexes match the new ones, so they are attached rather than rebuilt
+    op.execute(f"ALTER TABLE room_messages ATTACH PARTITION room_messages_legacy FOR VALUES FROM (MINVALUE) TO ('{cutover.isoformat()}')")
+    op.execute("ALTER TABLE room_messages_legacy DROP CONSTRAINT room_messages_legacy_bound")
+    op.execute("CREATE TABLE room_messages_default PARTITION OF room_messages DEFAULT")
+    for day in range(PARTITIONS_AHEAD):
+        start, end = cutover + timedelta(days=day), cutover + timedelta(days=day + 1)
+        op.execute(
+            f"CREATE TABLE room_messages_p{start:%Y%m%d} PARTITION OF room_messages "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", "Table '_alembic_tmp_room_messages' specifies columns")
+            with op.batch_alter_table("room_messages", recreate="always", naming_convention=NAMING) as batch:
+                batch.create_foreign_key("fk_room_messages_room_id_rooms", "rooms", ["room_id"], ["id"], ondelete="CASCADE")
+                batch.alter_column("timestamp", existing_type=sa.DateTime(timezone=True), nullable=True)
+                batch.create_primary_key("pk_room_messages", ["id"])
+        for statement in SQLITE_FTS:
+            op.execute(statement)
+        return
+
+    # Back to one plain table: every partition still attached is copied into it
+    op.execute("ALTER TABLE room_messages RENAME TO room_messages_partitioned")
+    for index in ("ix_room_messages_timestamp", "ix_room_messages_room_timestamp", "ix_room_messages_search"):
+        op.execute(f"ALTER INDEX {index} RENAME TO {index}_partitioned")
+    op.execute("ALTER TABLE room_messages_partitioned RENAME CONSTRAINT room_messages_pkey TO room_messages_partitioned_pkey")
+    op.execute("CREATE TABLE room_messages (LIKE room_messages_partitioned INCLUDING DEFAULTS)")
+    op.execute("INSERT INTO room_messages SELECT * FROM room_messages_partitioned")
+    op.execute("DROP TABLE room_messages_partitioned")
+    op.execute('ALTER TABLE room_messages ALTER COLUMN "timestamp" DROP NOT NULL')
+    op.execute("ALTER TABLE room_messages ADD CONSTRAINT room_messages_pkey PRIMARY KEY (id)")
+    # Messages of rooms deleted since the upgrade can't satisfy the foreign key again
+    op.execute("DELETE FROM room_messages AS m WHERE room_id IS NOT NULL AND NOT EXISTS (SELECT 1 FROM rooms AS r WHERE r.id = m.room_id)")
+    op.execute(
+        "ALTER TABLE room_messages ADD CONSTRAINT room_messages_room_id_fkey "
+        "FOREIGN KEY (room_id) REFERENCES rooms (id) ON DELETE CASCADE"
+    )
+    for statement in INDEXES:
+        op.execute(statement)
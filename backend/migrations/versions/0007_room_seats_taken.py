@@ -0,0 +1,32 @@
+"""seat count on rooms for capacity checks
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+
+rooms.seats_taken is the number of users with an active membership, kept in the same
+transaction as every join, leave and expiry, so capacity checks read one row instead of
+counting room_members. Existing rooms are filled in from their active memberships.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("rooms") as batch:
+        batch.add_column(sa.Column("seats_taken", sa.Integer(), nullable=False, server_default="0"))
+    op.execute(
+        "UPDATE rooms SET seats_taken = ("
+        "SELECT COUNT(DISTINCT user_id) FROM room_members "
+        "WHERE room_members.room_id = rooms.id AND room_members.is_active = true)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table("rooms") as batch:
+        batch.drop_column("seats_taken")
@@ -0,0 +1,61 @@
+"""ConversationService.get_or_create: one row and one id per (user, agent), however many callers race."""
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks import local
+
+AGENTS = ["Dante", "Emma"]
+CALLERS = 8
+
+
+def get_or_create(user_id: str, agent: str) -> uuid.UUID:
+    from app.db.database import session_scope
+    from app.models.user import User
+    from app.services.conversations import ConversationService
+
+    with session_scope() as db:
+        return ConversationService.get_or_create(db, db.get(User, uuid.UUID(user_id)), agent)
+
+
+def rows(user_ids: list[str]) -> dict[tuple[str, str], int]:
+    from sqlalchemy import func
+    from app.db.database import session_scope
+    from app.models.conversations import Conversation
+
+    with session_scope() as db:
+        return {
+            (str(user_id), agent): count
+            for user_id, agent, count in db.query(Conversation.user_id, Conversation.agent_name, func.count())
+            .filter(Conversation.user_id.in_([uuid.UUID(user_id) for user_id in user_ids]))
+            .group_by(Conversation.user_id, Conversation.agent_name)
+        }
+
+
+def test_concurrent_callers_share_one_conversation():
+    user_ids = [user_id for user_id, _ in local.create_users(10, prefix=f"conv{uuid.uuid4().hex[:6]}")]
+    pairs = [(user_id, agent) for user_id in user_ids for agent in AGENTS]
+
+    with ThreadPoolExecutor(16) as pool:
+        ids = list(pool.map(lambda pair: get_or_create(*pair), [pair for pair in pairs for _ in range(CALLERS)]))
+
+    by_pair: dict = {}
+    for pair, conversation_id in zip([pair for pair in pairs for _ in range(CALLERS)], ids):
+        by_pair.setdefault(pair, set()).add(conversation_id)
+    assert all(len(conversation_ids) == 1 for conversation_ids in by_pair.values())
+    assert rows(user_ids) == {pair: 1 for pair in pairs}
+
+
+def test_cached_mapping_skips_the_database():
+    from app.core.redis import get_redis
+    from app.models.user import User
+    from app.services.conversations import ConversationService
+
+    user_id, _ = local.create_users(1, prefix=f"conv{uuid.uuid4().hex[:6]}")[0]
+    conversation_id = get_or_create(user_id, "Dante")
+
+    # A hit never touches the session
+    assert ConversationService.get_or_create(None, User(id=uuid.UUID(user_id)), "Dante") == conversation_id
+
+    # Without the mapping the insert conflicts and the existing row is returned
+    get_redis().delete(ConversationService._key(uuid.UUID(user_id), "Dante"))
+    assert get_or_create(user_id, "Dante") == conversation_id
+    assert rows([user_id]) == {(user_id, "Dante"): 1}
@@ -0,0 +1,83 @@
+"""Graceful drain (app.sockets.drain): room sockets are told to reconnect and closed with 1012,
+new sockets are refused the same way, memberships stay with their seats held, and members who
+reconnect elsewhere within ROOM_SEAT_GRACE keep them while the others leave."""
+import asyncio
+import time
+import uuid
+import websockets
+from benchmarks import local
+from benchmarks.drain import frames, reconnects
+
+PORT = 8841
+
+
+async def drain_with_sockets(server, members: list[tuple[str, str]]) -> tuple[list, tuple]:
+    """Open a socket per (room_code, token), drain the server; their frames and close codes, and a late socket's."""
+    from app.sockets.drain import drain
+
+    sockets = [await websockets.connect(f"{server.ws_url}/ws/chat/{code}?token={token}") for code, token in members]
+    for ws in sockets:
+        await asyncio.wait_for(ws.recv(), 10)  # presence
+    received = asyncio.gather(*(frames(ws) for ws in sockets))
+
+    # The drain runs on the server's loop, as on SIGTERM
+    started = asyncio.run_coroutine_threadsafe(drain.drain(), drain._abandon.get_loop())
+    while not drain.draining:
+        await asyncio.sleep(0.01)
+    late = await frames(await websockets.connect(f"{server.ws_url}/ws/chat/{members[0][0]}?token={members[0][1]}"))
+    await asyncio.wrap_future(started)
+    return await received, late
+
+
+def memberships(codes: list[str]) -> dict[str, bool]:
+    from app.db.database import session_scope
+    from app.models.rooms import Room, RoomMember
+
+    with session_scope() as db:
+        return {
+            str(user_id): active
+            for user_id, active in db.query(RoomMember.user_id, RoomMember.is_active)
+            .join(Room, Room.id == RoomMember.room_id)
+            .filter(Room.code.in_(codes))
+        }
+
+
+def held(codes: list[str]) -> set[str]:
+    from app.core.redis import get_redis
+    from app.services.seat_release import SEAT_RELEASE_KEY
+
+    return {entry.split("|", 1)[1] for entry in get_redis().zrange(SEAT_RELEASE_KEY, 0, -1) if entry.split("|", 1)[0] in codes}
+
+
+def test_drain_holds_seats_for_reconnects():
+    from app.services.presence import PresenceService
+    from app.services.seat_release import ROOM_SEAT_GRACE, SeatRelease
+
+    users = local.create_users(6, prefix=f"drain{uuid.uuid4().hex[:6]}")
+    codes = local.create_rooms(2, capacity=3)
+    local.seat([(codes[i % 2], user_id) for i, (user_id, _) in enumerate(users)])
+    members = [(codes[i % 2], token) for i, (_, token) in enumerate(users)]
+
+    with local.Server(PORT) as server:
+        received, (late_frames, late_code) = asyncio.run(drain_with_sockets(server, members))
+
+    assert all(code == 1012 and reconnects(frames) for frames, code in received)
+    assert late_code == 1012 and reconnects(late_frames)
+    assert all(PresenceService.online_count(code) == 0 for code in codes)
+    # Nobody left: every membership is in place, its seat held
+    assert memberships(codes) == {user_id: True for user_id, _ in users}
+    assert held(codes) == {user_id for user_id, _ in users}
+
+    # Another worker: the first member of each room comes back, the others don't
+    async def come_back(server):
+        sockets = [await websockets.connect(f"{server.ws_url}/ws/chat/{code}?token={token}") for code, token in members[:2]]
+        for ws in sockets:
+            await asyncio.wait_for(ws.recv(), 10)  # presence: they are online again
+        released = await asyncio.to_thread(SeatRelease.release_due, time.time() + ROOM_SEAT_GRACE + 1)
+        for ws in sockets:
+            await ws.close()
+        return released
+
+    with local.Server(PORT + 1) as server:
+        assert asyncio.run(come_back(server)) == 4
+    assert memberships(codes) == {user_id: i < 2 for i, (user_id, _) in enumerate(users)}
@@ -0,0 +1,44 @@
+"""Migrations and the hot query shapes: a database built by `alembic upgrade head` matches the
+models, and every query in benchmarks.query_plans is served by an index."""
+import os
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from benchmarks.query_plans import hot_queries, plan, uses_index
+
+
+def alembic(url: str, run):
+    """Run an alembic command against url: env.py migrates whatever DATABASE_URL names."""
+    from alembic.config import Config
+
+    tests_url = os.environ["DATABASE_URL"]
+    os.environ["DATABASE_URL"] = url
+    try:
+        run(Config(os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")))
+    finally:
+        os.environ["DATABASE_URL"] = tests_url
+
+
+@pytest.fixture(scope="module")
+def migrated(tmp_path_factory):
+    from alembic import command
+
+    url = f"sqlite:///{tmp_path_factory.mktemp('migrated') / 'migrated.sqlite'}"
+    alembic(url, lambda config: command.upgrade(config, "head"))
+    engine = create_engine(url)
+    yield engine
+    engine.dispose()
+
+
+def test_migrations_match_the_models(migrated):
+    from alembic import command
+
+    # Raises when autogenerate would find something to add
+    alembic(str(migrated.url), command.check)
+
+
+@pytest.mark.parametrize("label", list(hot_queries(Session()).keys()))
+def test_hot_query_uses_an_index(migrated, label):
+    with Session(migrated) as db:
+        lines = plan(db, hot_queries(db)[label])
+        assert uses_index("sqlite", lines), lines
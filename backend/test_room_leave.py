@@ -0,0 +1,130 @@
+"""Leaving a room: RoomService.leave runs in one transaction with the host role handed to the
+longest-standing active member and an empty room closed, and a member whose last socket closes
+keeps the seat for ROOM_SEAT_GRACE seconds before leaving the same way (SeatRelease)."""
+import asyncio
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import websockets
+from benchmarks import local
+from benchmarks.room_leave import seed, state
+
+PORT = 8851
+
+
+def leave(room_code: str, user_id: str) -> dict | None:
+    from app.db.database import session_scope
+    from app.models.rooms import Room
+    from app.services.rooms import RoomService
+
+    with session_scope() as db:
+        room_id = db.query(Room.id).filter(Room.code == room_code).scalar()
+        return RoomService.leave(db, room_id, uuid.UUID(user_id))
+
+
+def seats(room_code: str) -> int:
+    from app.db.database import session_scope
+    from app.models.rooms import Room
+
+    with session_scope() as db:
+        return db.query(Room.seats_taken).filter(Room.code == room_code).scalar()
+
+
+def seated(room_code: str) -> list[tuple[str, bool]]:
+    """(user_id, is_host) of the active members."""
+    _, members = state([room_code])[room_code]
+    return sorted((user_id, is_host) for user_id, is_active, is_host in members if is_active)
+
+
+def test_simultaneous_leaves_close_every_room():
+    rooms = seed(3, 5)
+    with ThreadPoolExecutor(15) as pool:
+        results = list(pool.map(lambda leaving: leave(*leaving), [(code, user_id) for code, users in rooms for user_id, _ in users]))
+
+    assert None not in results
+    assert sum(not result["room_active"] for result in results) == len(rooms)
+    for code, (active, members) in state([code for code, _ in rooms]).items():
+        assert not active and not any(is_active or is_host for _, is_active, is_host in members)
+        assert seats(code) == 0
+
+
+def test_all_but_one_leave_at_once():
+    rooms = seed(3, 5)
+    with ThreadPoolExecutor(12) as pool:
+        list(pool.map(lambda leaving: leave(*leaving), [(code, user_id) for code, users in rooms for user_id, _ in users[:-1]]))
+
+    for code, users in rooms:
+        assert state([code])[code][0] and seated(code) == [(users[-1][0], True)]
+        assert seats(code) == 1
+
+
+def test_host_role_goes_to_the_longest_standing_member():
+    (code, users), = seed(1, 4)
+    host, first, second, _ = (user_id for user_id, _ in users)
+
+    assert leave(code, second) == {"was_host": False, "host": host, "room_active": True}
+    assert leave(code, host) == {"was_host": True, "host": first, "room_active": True}
+    assert leave(code, second) is None
+    assert seats(code) == 2
+
+
+def test_seat_is_held_through_a_closed_socket():
+    from app.services.seat_release import ROOM_SEAT_GRACE, SeatRelease
+
+    (code, users), = seed(1, 2)
+    (host, host_token), (member, member_token) = users
+
+    async def close(ws):
+        """Close the host's socket and wait for the server to hold its seat."""
+        from app.core.redis import get_redis
+        from app.services.seat_release import SEAT_RELEASE_KEY
+
+        await ws.close()
+        while get_redis().zscore(SEAT_RELEASE_KEY, f"{code}|{host}") is None:
+            await asyncio.sleep(0.01)
+
+    def after_grace():
+        # Other tests' held seats may come due too
+        SeatRelease.release_due(time.time() + ROOM_SEAT_GRACE + 1)
+
+    async def scenario(server):
+        from app.core.redis import get_redis
+        from app.services.rooms import ROOM_EVENTS_CHANNEL
+
+        # The server relays membership events once its listener has subscribed
+        while not get_redis().pubsub_numsub(ROOM_EVENTS_CHANNEL)[0][1]:
+            await asyncio.sleep(0.01)
+        url = f"{server.ws_url}/ws/chat/{code}"
+        listener = await websockets.connect(f"{url}?token={member_token}")
+
+        # A network blip: the host's socket closes and comes back before the grace period is over
+        ws = await websockets.connect(f"{url}?token={host_token}")
+        await close(ws)
+        ws = await websockets.connect(f"{url}?token={host_token}")
+        await asyncio.to_thread(after_grace)
+        assert seated(code) == sorted([(host, True), (member, False)])
+
+        # Gone for good: the seat and the host role go once it is over
+        await close(ws)
+        await asyncio.to_thread(SeatRelease.release_due)
+        assert seated(code) == sorted([(host, True), (member, False)])
+        await asyncio.to_thread(after_grace)
+        frames = []
+        while not any(frame.get("type") == "membership" for frame in frames):
+            text = await asyncio.wait_for(listener.recv(), 10)
+            frames.append(json.loads(text) if text.startswith("{") else {})
+        await listener.close()
+
+        with pytest.raises(websockets.InvalidStatus) as refused:
+            await websockets.connect(f"{url}?token={host_token}")
+        return frames[-1], refused.value.response.status_code
+
+    with local.Server(PORT) as server:
+        event, status = asyncio.run(scenario(server))
+
+    assert event["event"] == "left" and event["user_id"] == host and event["host"] == member
+    assert status == 403
+    assert state([code])[code][0] and seated(code) == [(member, True)]
+    assert seats(code) == 1
@@ -40,6 +40,8 @@ import { Badge } from "@/components/ui/badge"
 import { Separator } from "@/components/ui/separator"
 import { cn } from "@/lib/utils"
 import { resolveWsBaseUrl } from "@/lib/ws-url"
+import { parseControlFrame } from "@/lib/ws-frames"
+import { MAX_RECONNECT_ATTEMPTS, reconnectDelay, retryAfterOf, shouldReconnect } from "@/lib/ws-reconnect"
 
 const TYPING_INTERVAL_MS = 18
 const TYPING_STEP = 3
@@ -129,6 +131,9 @@ export function AiChat({
   const [messages, setMessages] = useState<ChatMessage[]>([])
 
   const wsRef = useRef<WebSocket | null>(null)
+  // Prompts sent and not answered yet (id -> text), and those a restarting server handed back
+  const pendingRef = useRef(new Map<string, string>())
+  const resendRef = useRef(new Set<string>())
   const messagesEndRef = useRef<HTMLDivElement | null>(null)
 
   const initialSelectedProfile = isProfileId(defaultAgentName)
@@ -217,46 +222,118 @@ export function AiChat({
     url.searchParams.set("token", accessToken)
     url.searchParams.set("token_type", tokenType)
 
-    const ws = new WebSocket(url.toString())
-    wsRef.current = ws
+    const pending = pendingRef.current
+    const resend = resendRef.current
+    let disposed = false
+    let attempt = 0
+    let retryAfter: number | undefined
+    let timer: number | undefined
+
+    const connect = () => {
+      const ws = new WebSocket(url.toString())
+      wsRef.current = ws
+
+      ws.onopen = () => {
+        attempt = 0
+        retryAfter = undefined
+        setIsConnecting(false)
+        setIsConnected(true)
+        setConnectionError(null)
+        // Prompts the previous worker handed back unanswered, sent again under the same id
+        for (const requestId of resend) {
+          const text = pending.get(requestId)
+          if (text !== undefined) {
+            ws.send(JSON.stringify({ type: "message", id: requestId, text, fanout: true }))
+          }
+        }
+        resend.clear()
+      }
 
-    ws.onopen = () => {
-      setIsConnecting(false)
-      setIsConnected(true)
-      setConnectionError(null)
-    }
+      ws.onmessage = (event) => {
+        const frame = parseControlFrame(event.data)
+        if (frame) {
+          if (frame.type === "ping") {
+            ws.send(JSON.stringify({ type: "pong" }))
+          } else if (frame.type === "reconnect") {
+            // The server is restarting and closes with 1012 next; a frame with an id hands back a prompt
+            retryAfter = retryAfterOf(frame)
+            if (frame.id !== undefined && frame.id !== null) {
+              resend.add(String(frame.id))
+            }
+          } else if (frame.type === "reply" && typeof frame.text === "string") {
+            const requestId = String(frame.id)
+            const replyText = frame.text
+            const prompt = typeof frame.prompt === "string" ? frame.prompt : null
+            pending.delete(requestId)
+            setMessages((prev) => {
+              const next = [...prev]
+              // Replies to prompts typed in another tab of the same conversation carry the prompt
+              if (prompt !== null && !prev.some((msg) => msg.id === requestId)) {
+                next.push({
+                  id: requestId,
+                  role: "user",
+                  text: prompt,
+                  displayText: prompt,
+                  timestamp: new Date(),
+                })
+              }
+              next.push({
+                id: crypto.randomUUID(),
+                role: "assistant",
+                text: replyText,
+                displayText: "",
+                timestamp: new Date(),
+              })
+              return next
+            })
+          }
+          return
+        }
 
-    ws.onmessage = (event) => {
-      setMessages((prev) => [
-        ...prev,
-        {
-          id: crypto.randomUUID(),
-          role: "assistant",
-          text: event.data,
-          displayText: "",
-          timestamp: new Date(),
-        },
-      ])
-    }
+        setMessages((prev) => [
+          ...prev,
+          {
+            id: crypto.randomUUID(),
+            role: "assistant",
+            text: event.data,
+            displayText: "",
+            timestamp: new Date(),
+          },
+        ])
+      }
 
-    ws.onerror = () => {
-      setConnectionError("No pudimos conectar con la IA. Intenta nuevamente.")
-    }
+      ws.onerror = () => {
+        setConnectionError("No pudimos conectar con la IA. Intenta nuevamente.")
+      }
 
-    ws.onclose = (event) => {
-      setIsConnecting(false)
-      setIsConnected(false)
-      if (event.code === 1008) {
-        setConnectionError("Tu sesion expiro o no tienes permisos para este chat.")
-        onUnauthorized?.()
-      } else {
-        setConnectionError("La conexion con la IA se cerro.")
+      ws.onclose = (event) => {
+        if (disposed) return
+        setIsConnected(false)
+        if (event.code === 1008) {
+          setIsConnecting(false)
+          setConnectionError("Tu sesion expiro o no tienes permisos para este chat.")
+          onUnauthorized?.()
+        } else if (shouldReconnect(event.code) && attempt < MAX_RECONNECT_ATTEMPTS) {
+          setIsConnecting(true)
+          setConnectionError("Reconectando con la IA...")
+          timer = window.setTimeout(connect, reconnectDelay(attempt, retryAfter))
+          attempt += 1
+        } else {
+          setIsConnecting(false)
+          setConnectionError("La conexion con la IA se cerro.")
+        }
       }
     }
 
+    connect()
+
     return () => {
-      ws.close()
+      disposed = true
+      window.clearTimeout(timer)
+      wsRef.current?.close()
       wsRef.current = null
+      pending.clear()
+      resend.clear()
     }
   }, [conversationId, accessToken, tokenType, onUnauthorized])
 
@@ -335,7 +412,11 @@ export function AiChat({
     }
 
     setMessages((prev) => [...prev, userMessage])
-    wsRef.current.send(values.content)
+    pendingRef.current.set(userMessage.id, values.content)
+    // Tagged with the message id; fanout also shows the exchange in the user's other tabs
+    wsRef.current.send(
+      JSON.stringify({ type: "message", id: userMessage.id, text: values.content, fanout: true })
+    )
     messageForm.reset({ content: "" })
   }
 
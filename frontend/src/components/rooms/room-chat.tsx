@@ -10,6 +10,8 @@ import { Badge } from "@/components/ui/badge"
 import { Separator } from "@/components/ui/separator"
 import { cn } from "@/lib/utils"
 import { resolveWsBaseUrl } from "@/lib/ws-url"
+import { parseControlFrame } from "@/lib/ws-frames"
+import { MAX_RECONNECT_ATTEMPTS, reconnectDelay, retryAfterOf, shouldReconnect } from "@/lib/ws-reconnect"
 
 const messageSchema = z.object({
   content: z.string().min(1, "Escribe un mensaje"),
@@ -35,6 +37,7 @@ export function RoomChat({ roomCode, accessToken, tokenType, className }: RoomCh
   const [messages, setMessages] = useState<ChatMessage[]>([])
   const [connectionError, setConnectionError] = useState<string | null>(null)
   const [isConnected, setIsConnected] = useState(false)
+  const [onlineCount, setOnlineCount] = useState<number | null>(null)
   const form = useForm<MessageFormValues>({
     resolver: zodResolver(messageSchema),
     defaultValues: { content: "" },
@@ -53,41 +56,84 @@ export function RoomChat({ roomCode, accessToken, tokenType, className }: RoomCh
     url.searchParams.set("token", accessToken)
     url.searchParams.set("token_type", tokenType)
 
-    const ws = new WebSocket(url.toString())
-    wsRef.current = ws
+    let disposed = false
+    let attempt = 0
+    let retryAfter: number | undefined
+    let timer: number | undefined
 
-    ws.onopen = () => {
-      setIsConnected(true)
-      setConnectionError(null)
-    }
+    const connect = () => {
+      const ws = new WebSocket(url.toString())
+      wsRef.current = ws
 
-    ws.onmessage = (event) => {
-      setMessages((prev) => [
-        ...prev,
-        {
-          id: crypto.randomUUID(),
-          text: event.data,
-          timestamp: new Date(),
-          sender: "Usuario", // This could be enhanced to show actual sender
-        },
-      ])
-    }
+      ws.onopen = () => {
+        attempt = 0
+        retryAfter = undefined
+        setIsConnected(true)
+        setConnectionError(null)
+      }
 
-    ws.onerror = () => {
-      setConnectionError("No pudimos conectar con el chat. Revisa tu conexion o intenta de nuevo.")
-    }
+      ws.onmessage = (event) => {
+        const frame = parseControlFrame(event.data)
+        if (frame) {
+          if (frame.type === "ping") {
+            ws.send(JSON.stringify({ type: "pong" }))
+          } else if (frame.type === "presence" && typeof frame.online === "number") {
+            setOnlineCount(frame.online)
+          } else if (frame.type === "reconnect") {
+            // The server is restarting and closes with 1012 next; onclose reconnects after retry_after
+            retryAfter = retryAfterOf(frame)
+          } else if (frame.type === "retract" && typeof frame.line === "string") {
+            // Flagged by the background moderation after delivery: hide the latest copy of that line
+            const line = frame.line
+            setMessages((prev) => {
+              const index = prev.map((message) => message.text).lastIndexOf(line)
+              if (index === -1) return prev
+              const next = [...prev]
+              next[index] = { ...next[index], text: "[mensaje eliminado por moderacion]" }
+              return next
+            })
+          }
+          return
+        }
 
-    ws.onclose = (event) => {
-      setIsConnected(false)
-      if (event.code === 1008) {
-        setConnectionError("Tu sesion expiro o no tienes permisos para esta sala.")
-      } else {
-        setConnectionError("La conexion con el chat se cerro.")
+        setMessages((prev) => [
+          ...prev,
+          {
+            id: crypto.randomUUID(),
+            text: event.data,
+            timestamp: new Date(),
+            sender: "Usuario", // This could be enhanced to show actual sender
+          },
+        ])
+      }
+
+      ws.onerror = () => {
+        setConnectionError("No pudimos conectar con el chat. Revisa tu conexion o intenta de nuevo.")
+      }
+
+      ws.onclose = (event) => {
+        if (disposed) return
+        setIsConnected(false)
+        if (event.code === 1008) {
+          setConnectionError("Tu sesion expiro o no tienes permisos para esta sala.")
+        } else if (event.code === 4000) {
+          setConnectionError("La sala expiro.")
+        } else if (shouldReconnect(event.code) && attempt < MAX_RECONNECT_ATTEMPTS) {
+          setConnectionError("Reconectando con el chat...")
+          timer = window.setTimeout(connect, reconnectDelay(attempt, retryAfter))
+          attempt += 1
+        } else {
+          setConnectionError("La conexion con el chat se cerro.")
+        }
       }
     }
 
+    connect()
+
     return () => {
-      ws.close()
+      disposed = true
+      window.clearTimeout(timer)
+      wsRef.current?.close()
       wsRef.current = null
     }
   }, [roomCode, accessToken, tokenType])
@@ -143,7 +189,7 @@ export function RoomChat({ roomCode, accessToken, tokenType, className }: RoomCh
               </Badge>
               <Badge variant="outline" className="text-xs">
                 <Users className="mr-1 h-3 w-3" />
-                OnLinex Rooms
+                {onlineCount !== null ? `${onlineCount} en linea` : "OnLinex Rooms"}
               </Badge>
             </div>
           </div>
@@ -0,0 +1,18 @@
+export interface ControlFrame {
+  type: string
+  [key: string]: unknown
+}
+
+// Chat lines are plain text; server control frames are JSON objects with a "type".
+export function parseControlFrame(data: unknown): ControlFrame | null {
+  if (typeof data !== "string" || !data.startsWith("{")) {
+    return null
+  }
+
+  try {
+    const parsed = JSON.parse(data)
+    return parsed && typeof parsed.type === "string" ? (parsed as ControlFrame) : null
+  } catch {
+    return null
+  }
+}
@@ -0,0 +1,22 @@
+// Close codes after which the socket is reopened: 1012 is a worker restarting (it sends a
+// "reconnect" frame first), 1013 a client that fell behind, 1001 an idle socket reaped, 1006 a dropped connection.
+const RECONNECT_CLOSE_CODES = new Set([1001, 1006, 1011, 1012, 1013])
+
+const BASE_DELAY_MS = 500
+const MAX_DELAY_MS = 15_000
+export const MAX_RECONNECT_ATTEMPTS = 8
+
+export function shouldReconnect(code: number) {
+  return RECONNECT_CLOSE_CODES.has(code)
+}
+
+// Exponential backoff with jitter, starting from the server's retry_after hint (seconds) when it sent one
+export function reconnectDelay(attempt: number, retryAfterSeconds?: number) {
+  const base = retryAfterSeconds !== undefined ? retryAfterSeconds * 1000 : BASE_DELAY_MS
+  const delay = Math.min(MAX_DELAY_MS, base * 2 ** attempt)
+  return delay / 2 + Math.random() * (delay / 2)
+}
+
+export function retryAfterOf(frame: { retry_after?: unknown }) {
+  return typeof frame.retry_after === "number" && frame.retry_after >= 0 ? frame.retry_after : undefined
+}